@@ -0,0 +1,141 @@
+import os
+import json
+import tempfile
+
+from numeric_columns import parse_number
+
+
+def _key(signature) -> list:
+    """文件签名转换为可以写入 JSON、与读回结果直接比较的形式。"""
+    return [None if s is None else list(s) for s in signature]
+
+
+def record_profit(record: dict) -> float:
+    """记录的盈亏（行情价格 - 结算价），数据格式错误时按 0 计。"""
+    try:
+        return float(record.get('行情价格', '0') or 0) - float(record.get('结算价', '0') or 0)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+class TableAggregates:
+    """
+    数据表的物化汇总（data/<表名>.aggregates.json）：各商品、各货商的盈亏，
+    各货商的入库条数，以及库存价值（未卖出记录的结算价之和）。
+
+    记录增删改时按差量更新，不必重新扫描全表。保存时记下 CSV 的文件签名，
+    重新打开时签名一致即可直接使用，无需解析 CSV；不一致时重新统计。
+    """
+    # 汇总名 → 分组列
+    GROUPS = {'profit_by_product': '商品名称', 'profit_by_supplier': '货商姓名'}
+
+    def __init__(self, csv_path: str):
+        self.path = os.path.splitext(csv_path)[0] + ".aggregates.json"
+        self.clear()
+
+    def clear(self):
+        """丢弃汇总，标记为无效。"""
+        self.valid = False
+        # 与汇总一致的 CSV 文件签名；按差量修改后为 None
+        self.key = None
+        self.rows = 0
+        self.stock_value = 0.0
+        # 汇总名 → {分组值: [条数, 盈亏]}
+        self.groups = {name: {} for name in self.GROUPS}
+
+    def rebuild(self, records):
+        """由全部记录重新统计。"""
+        self.clear()
+        for r in records:
+            self._apply(r, 1)
+        self.valid = True
+
+    def _apply(self, record: dict, sign: int):
+        self.rows += sign
+        if record.get('出库状态') != '卖出':
+            self.stock_value += sign * parse_number(record.get('结算价'))[0]
+        profit = record_profit(record)
+        for name, column in self.GROUPS.items():
+            groups = self.groups[name]
+            value = record.get(column, '')
+            g = groups.get(value)
+            if g is None:
+                g = groups[value] = [0, 0.0]
+            g[0] += sign
+            g[1] += sign * profit
+            if g[0] <= 0:
+                del groups[value]
+
+    def matches(self, signature) -> bool:
+        """汇总有效，且与文件签名为 signature 时的磁盘数据一致。"""
+        return self.valid and self.key is not None and self.key == _key(signature)
+
+    def apply_changes(self, changes):
+        """按记录级变更（change_events.RecordChange）更新；遇到整表变化时标记为无效。"""
+        if not self.valid:
+            return
+        for c in changes:
+            if c.kind == 'reset':
+                self.clear()
+                return
+            if c.old is not None:
+                self._apply(c.old, -1)
+            if c.new is not None:
+                self._apply(c.new, 1)
+        self.key = None
+
+    def summary(self) -> dict:
+        """与 cross_table.summarize_table 相同结构的汇总（不含表名和错误信息）。"""
+        by_product = {k: g[1] for k, g in self.groups['profit_by_product'].items()}
+        return {
+            'rows': self.rows,
+            'stock_value': self.stock_value,
+            'profit': sum(by_product.values()),
+            'profit_by_product': by_product,
+            'profit_by_supplier': {k: g[1] for k, g in self.groups['profit_by_supplier'].items()},
+            'inbound_by_supplier': {k: g[0] for k, g in self.groups['profit_by_supplier'].items()},
+        }
+
+    def load(self, key) -> bool:
+        """读取保存的汇总；文件不存在、损坏或签名与 key 不一致时返回 False。"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('key') != _key(key):
+                return False
+            self.clear()
+            self.rows = data['rows']
+            self.stock_value = data['stock_value']
+            for name in self.GROUPS:
+                self.groups[name] = {k: list(g) for k, g in data['groups'][name]}
+        except (OSError, ValueError, KeyError, TypeError):
+            self.clear()
+            return False
+        self.key = _key(key)
+        self.valid = True
+        return True
+
+    def save(self, key):
+        """以 CSV 文件签名 key 保存汇总（临时文件 + os.replace）。"""
+        data = {
+            'key': _key(key),
+            'rows': self.rows,
+            'stock_value': self.stock_value,
+            # 用列表保存，保留各分组的顺序
+            'groups': {name: [[k, g] for k, g in groups.items()] for name, groups in self.groups.items()},
+        }
+        fd, temp_name = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_name, self.path)
+        except Exception:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+        self.key = _key(key)
+
+    def rename(self, new_csv_path: str):
+        new_path = os.path.splitext(new_csv_path)[0] + ".aggregates.json"
+        if os.path.exists(self.path) and not os.path.exists(new_path):
+            os.rename(self.path, new_path)
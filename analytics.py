@@ -0,0 +1,118 @@
+from array import array
+from datetime import date
+
+from numeric_columns import NumericColumns, mask_and, parse_number
+
+# 可以分组的列
+GROUP_COLUMNS = ['商品名称', '货商姓名', '出库档口', '颜色/配置']
+# 时间分段：入库时间按记录统计，出库时间按出库事件统计
+TIME_FIELDS = ['入库时间', '出库时间']
+TIME_UNITS = {'day': '日', 'week': '周', 'month': '月'}
+# 按记录统计时可以汇总的列：金额/数量列及盈亏（行情价格 - 结算价）
+RECORD_MEASURES = NumericColumns.COLUMNS + ['利润']
+# 按出库事件统计时可以汇总的列：出库数量、出库金额（出库数量 × 单价）
+EVENT_MEASURES = ['出库数量', '出库金额']
+FUNCS = {'sum': '合计', 'avg': '平均'}
+# 事件行从所属记录取的分组列（出库档口取事件本身的）
+_RECORD_GROUP_COLUMNS = ['商品名称', '货商姓名', '颜色/配置']
+
+
+def time_bucket(value: str, unit: str) -> str:
+    """把 'YYYY-MM-DD[ 时:分[:秒]]' 归入日（YYYY-MM-DD）、周（YYYY-Www）或月（YYYY-MM），无法识别时为“未知”。"""
+    try:
+        d = date.fromisoformat((value or '').split(' ')[0])
+    except ValueError:
+        return '未知'
+    if unit == 'day':
+        return d.isoformat()
+    if unit == 'week':
+        year, week, _ = d.isocalendar()
+        return f"{year}-W{week:02d}"
+    return d.isoformat()[:7]
+
+
+def outbound_rows(events, lookup) -> list[dict]:
+    """
+    把出库事件与所属记录拼成统计用的行：商品名称、货商姓名、颜色/配置取自记录，
+    出库档口、出库时间、出库数量取自事件，出库金额为出库数量 × 单价。
+    lookup(单号) 返回记录，找不到记录的事件跳过。
+    """
+    rows = []
+    for e in events:
+        r = lookup(e.get('单号', ''))
+        if r is None:
+            continue
+        row = {c: r.get(c, '') for c in _RECORD_GROUP_COLUMNS}
+        row['出库档口'] = e.get('出库档口', '')
+        row['出库时间'] = e.get('出库时间', '')
+        row['出库数量'] = e.get('出库数量', '')
+        qty, qty_ok, _ = parse_number(e.get('出库数量'))
+        price, price_ok, _ = parse_number(e.get('单价'))
+        row['出库金额'] = qty * price if qty_ok and price_ok else 'x'
+        rows.append(row)
+    return rows
+
+
+def _measure(numeric: NumericColumns, column: str):
+    """返回 (数值数组, 可用掩码)；利润由行情价格、结算价两列算出。"""
+    if column == '利润':
+        market, settle = numeric.values['行情价格'], numeric.values['结算价']
+        ok = mask_and(numeric.ok['行情价格'], numeric.ok['结算价'])
+        return array('d', map(float.__sub__, market, settle)), ok
+    return numeric.values[column], numeric.ok[column]
+
+
+def group_by(rows, numeric: NumericColumns, group_cols=(), time_field=None, unit='month',
+             measures=(), funcs=('sum',)) -> tuple[list, list]:
+    """
+    分组统计：rows 与 numeric 按位置对应（numeric 为 rows 的金额/数量列式数据）。
+    先遍历一次行算出各行的分组编号，再逐列在类型化数组上按编号累加，
+    不再逐行解析字符串。按编号累加比按组排序后分段求和、逐组掩码求和都快
+    （见 group_by_report.py），耗时主要在计算分组编号。无法解析的值不计入合计和平均。
+    返回 (列名, 数据行)，数据行按时段、分组值排序。
+    """
+    group_cols = list(group_cols)
+    keys = {}
+    gids = array('l')
+    buckets = {}  # 时间字符串 → 时段，同一天的记录很多，只换算一次
+    for r in rows:
+        key = tuple(r.get(c, '') for c in group_cols)
+        if time_field:
+            value = r.get(time_field, '')
+            bucket = buckets.get(value)
+            if bucket is None:
+                bucket = buckets[value] = time_bucket(value, unit)
+            key = (bucket,) + key
+        gid = keys.get(key)
+        if gid is None:
+            gid = keys[key] = len(keys)
+        gids.append(gid)
+
+    n = len(keys)
+    counts = [0] * n
+    for g in gids:
+        counts[g] += 1
+    totals = []
+    for column in measures:
+        values, ok = _measure(numeric, column)
+        sums = [0.0] * n
+        used = [0] * n
+        for g, v, good in zip(gids, values, ok):
+            if good:
+                sums[g] += v
+                used[g] += 1
+        totals.append((sums, used))
+
+    cols = ([f"{time_field[:2]}{TIME_UNITS[unit]}"] if time_field else []) + group_cols + ['条数']
+    cols += [f"{column}{FUNCS[f]}" for column in measures for f in funcs]
+    data = []
+    for key, gid in sorted(keys.items()):
+        row = list(key) + [str(counts[gid])]
+        for sums, used in totals:
+            for f in funcs:
+                if f == 'avg':
+                    row.append(f"{sums[gid] / used[gid]:.2f}" if used[gid] else "")
+                else:
+                    row.append(f"{sums[gid]:.2f}")
+        data.append(tuple(row))
+    return cols, data
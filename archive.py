@@ -0,0 +1,166 @@
+import os
+import re
+import csv
+
+from time_index import parse_timestamp
+
+# 已关闭（可以归档）的出库状态
+CLOSED_STATUSES = ('全部出库', '卖出')
+
+_MONTH = re.compile(r'^\d{4}-\d{2}$')
+
+
+def record_date(record: dict) -> str:
+    """记录入库时间的日期部分（YYYY-MM-DD），用于按日期范围筛选。"""
+    return (record.get('入库时间') or '').split(' ')[0]
+
+
+def in_date_range(record: dict, start: str | None = None, end: str | None = None) -> bool:
+    """入库日期是否在 [start, end] 内；start、end 为 YYYY-MM-DD，None 表示不限。"""
+    d = record_date(record)
+    if start and d < start:
+        return False
+    if end and d > end:
+        return False
+    return True
+
+
+def is_closed(record: dict) -> bool:
+    return record.get('出库状态', '') in CLOSED_STATUSES
+
+
+def records_in_range(model, start: str | None = None, end: str | None = None,
+                     by_time: bool = False) -> list[dict]:
+    """
+    model 当前表中入库日期在 [start, end] 内的记录：主表中的记录，
+    加上与范围重叠的归档分区；范围不涉及归档月份（或模型没有归档）时不读取归档文件。
+    by_time 为 True 时按入库时间降序返回。模型有入库时间索引时，日期范围和排序都走索引。
+    """
+    in_order = False
+    if hasattr(model, 'records_by_time') and (start or end or by_time):
+        recs = model.records_by_time(start, end)
+        in_order = True
+    else:
+        recs = model.get_all_records()
+        if start or end:
+            recs = [r for r in recs if in_date_range(r, start, end)]
+    if hasattr(model, 'archived_months') and model.archived_months(start, end):
+        recs = recs + list(model.iter_archived(start, end))
+        in_order = False
+    if by_time and not in_order:
+        recs = sorted(recs, key=lambda r: parse_timestamp(r.get('入库时间')), reverse=True)
+    return recs
+
+
+class ArchiveStore:
+    """
+    数据表的冷数据分区：data/<表名>/archive/<YYYY-MM>.csv，按入库时间的月份存放已归档的记录。
+
+    查询时只读取与日期范围重叠的月份；读取过的分区按文件签名缓存，未变化时不重复解析。
+    入库时间无法识别的记录放在 undated.csv，只在不限日期的查询中读取。
+    """
+    UNDATED = "undated"
+
+    def __init__(self, data_dir: str, table_name: str, header: list):
+        self.dir = os.path.join(data_dir, table_name, 'archive')
+        self.header = list(header)
+        self._cache = {}  # 月份 → (文件签名, 记录列表)
+
+    @classmethod
+    def month_of(cls, record: dict) -> str:
+        month = record_date(record)[:7]
+        return month if _MONTH.match(month) else cls.UNDATED
+
+    def _path(self, month: str) -> str:
+        return os.path.join(self.dir, f"{month}.csv")
+
+    def months(self) -> list[str]:
+        """已有的分区，按月份升序；undated 排在最后。"""
+        try:
+            names = [n[:-4] for n in os.listdir(self.dir) if n.endswith('.csv')]
+        except FileNotFoundError:
+            return []
+        return sorted(n for n in names if _MONTH.match(n)) + [n for n in names if n == self.UNDATED]
+
+    def months_in_range(self, start: str | None = None, end: str | None = None) -> list[str]:
+        """与 [start, end] 重叠的分区。"""
+        result = []
+        for m in self.months():
+            if m == self.UNDATED:
+                if not start and not end:
+                    result.append(m)
+            elif (not start or m >= start[:7]) and (not end or m <= end[:7]):
+                result.append(m)
+        return result
+
+    def append(self, records: list[dict]) -> dict:
+        """
+        按月份把记录追加到对应分区，分区不存在时先写表头。
+        返回 {月份: 追加前的文件大小（新建分区为 None）}，供 rollback 撤销。
+        """
+        groups = {}
+        for r in records:
+            groups.setdefault(self.month_of(r), []).append(r)
+        rows = {m: [{k: '' if r.get(k) is None else str(r.get(k)) for k in self.header} for r in rs]
+                for m, rs in groups.items()}
+        # 先检查编码，避免只写入一部分分区
+        for rs in rows.values():
+            for row in rs:
+                for v in row.values():
+                    v.encode("gb2312")
+        os.makedirs(self.dir, exist_ok=True)
+        sizes = {}
+        try:
+            for m, rs in rows.items():
+                path = self._path(m)
+                sizes[m] = os.path.getsize(path) if os.path.exists(path) else None
+                with open(path, 'a', newline='', encoding="gb2312") as f:
+                    writer = csv.DictWriter(f, fieldnames=self.header)
+                    if sizes[m] is None:
+                        writer.writeheader()
+                    writer.writerows(rs)
+        except Exception:
+            self.rollback(sizes)
+            raise
+        return sizes
+
+    def rollback(self, sizes: dict):
+        """撤销 append 追加的内容：截断到原大小，新建的分区直接删除。"""
+        for m, size in sizes.items():
+            path = self._path(m)
+            if size is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+            self._cache.pop(m, None)
+
+    def read(self, month: str) -> list[dict]:
+        """读取一个分区的全部记录；返回的记录请勿直接修改。"""
+        path = self._path(month)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return []
+        signature = (st.st_size, st.st_mtime_ns, st.st_ino)
+        cached = self._cache.get(month)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(path, 'r', newline='', encoding="gb2312") as f:
+            records = [{k: row.get(k) or '' for k in self.header} for row in csv.DictReader(f)]
+        self._cache[month] = (signature, records)
+        return records
+
+    def iter_range(self, start: str | None = None, end: str | None = None):
+        """逐条产出入库日期在 [start, end] 内的归档记录，只读取重叠的分区。"""
+        for m in self.months_in_range(start, end):
+            for r in self.read(m):
+                if in_date_range(r, start, end):
+                    yield r
+
+    def rename(self, data_dir: str, new_table: str):
+        old_root = os.path.dirname(self.dir)
+        new_root = os.path.join(data_dir, new_table)
+        if os.path.isdir(old_root) and not os.path.exists(new_root):
+            os.rename(old_root, new_root)
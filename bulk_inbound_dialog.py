@@ -310,6 +310,7 @@ class BulkInboundDialog(tk.Toplevel):
         success_count = 0
         error_count = 0
         error_messages = []
+        rows = []
         
         for item_id in self.row_frames:
             # 获取行数据
@@ -369,13 +370,13 @@ class BulkInboundDialog(tk.Toplevel):
                 '颜色/配置': color
             }
             
-            # 调用控制器处理入库
-            success = self.controller.handle_inbound_registration(data)
-            if success:
-                success_count += 1
-            else:
-                error_messages.append(f"商品'{product_name}'提交失败")
-                error_count += 1
+            rows.append(data)
+        
+        # 所有行一次写入，界面只刷新一次
+        if rows:
+            success_count, batch_errors = self.controller.handle_inbound_batch(rows)
+            error_count += len(batch_errors)
+            error_messages.extend(batch_errors)
         
         # 显示结果
         if error_count > 0 and success_count == 0:
@@ -0,0 +1,32 @@
+from collections import namedtuple
+
+# 一条记录级变更：kind 为 'inserted' / 'updated' / 'deleted'，order 为单号，
+# old、new 为变更前后的记录（新增时 old 为 None，删除时 new 为 None）
+RecordChange = namedtuple('RecordChange', 'kind order old new')
+
+# 整表变化（切换表、批量改单号、归档、涉及重复单号的修改等）：无法逐行描述，监听方应整体重新加载
+RESET = RecordChange('reset', None, None, None)
+
+
+class ChangeBus:
+    """
+    记录变更的发布/订阅。修改成功后，模型在发起修改的线程中同步调用各监听函数，
+    参数为本次修改产生的 RecordChange 列表（一次批量修改只通知一次）。
+    """
+
+    def __init__(self):
+        self._listeners = []
+
+    def subscribe(self, listener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def emit(self, changes: list):
+        if not changes:
+            return
+        for listener in list(self._listeners):
+            listener(changes)
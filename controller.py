@@ -1,6 +1,11 @@
-import time
-from model import InventoryModel
+import queue
+from model import InventoryModel, profit_by_records, count_by_records
+from archive import in_date_range, records_in_range
+from cross_table import summarize_tables, merge_summaries
+from analytics import EVENT_MEASURES, group_by, outbound_rows
+from numeric_columns import NumericColumns
 from settings_model import SettingsModel
+from order_number import OrderNumberGenerator, find_duplicate_orders
 
 class InventoryController:
     def __init__(self, model: InventoryModel, settings_model: SettingsModel, root=None):
@@ -8,11 +13,50 @@ class InventoryController:
         self.settings_model = settings_model
         self.view = None
         self.root = None
+        self.order_numbers = None
+        # 已通过 after_idle 安排、尚未执行的列表刷新
+        self._refresh_scheduled = False
+        # 后台写入失败的通知：写入线程放入队列，界面在主线程中定时取出
+        self.write_errors = queue.Queue()
+        if hasattr(model, 'on_write_error'):
+            model.on_write_error = self.write_errors.put
+        # 自上次刷新以来的记录级变更，刷新时据此只修补受影响的行；
+        # 数据库存储没有变更通知，始终整体重绘
+        self._pending_changes = []
+        self._painted_generation = None
+        if hasattr(model, 'changes'):
+            model.changes.subscribe(self._pending_changes_received)
+
+    def write_status(self) -> tuple[str, str]:
+        """当前表的写入状态 (idle/pending/writing/error, 错误信息)。"""
+        if hasattr(self.model, 'write_status'):
+            return self.model.write_status()
+        return 'idle', ''
+
+    def flush_writes(self) -> bool:
+        """立即写入未落盘的修改，返回是否成功。"""
+        if hasattr(self.model, 'flush'):
+            return self.model.flush()
+        return True
 
     def generate_order_number(self) -> str:
-        return str(int(time.time() * 1000))
+        # 首次使用时才占用实例号
+        if self.order_numbers is None:
+            self.order_numbers = OrderNumberGenerator(self.model.data_dir)
+        return self.order_numbers.next()
 
-    def handle_inbound_registration(self, info: dict) -> bool:
+    def find_duplicate_orders(self) -> dict:
+        """检查当前表中的重复单号，返回 {单号: 出现次数}。"""
+        return find_duplicate_orders(self.model.get_all_records())
+
+    def repair_duplicate_orders(self) -> list[tuple[str, str]] | None:
+        """为当前表中重复的单号重新编号，返回 [(旧单号, 新单号), ...]，失败时返回 None。"""
+        changes = self.model.reassign_duplicate_orders(self.generate_order_number)
+        if changes:
+            self.refresh_inventory_list()
+        return changes
+
+    def _build_inbound_record(self, info: dict, order: str) -> dict:
         # 自动计算结算价 = 买价 + 佣金
         try:
             buy = float(info.get('买价', '0'))
@@ -26,7 +70,7 @@ class InventoryController:
             unit_price = 0.0
         
         record = {
-            '单号': self.generate_order_number(),
+            '单号': order,
             '货商姓名': info.get('货商姓名', ''),
             '入库时间': info.get('入库时间', ''),
             '数字条码': info.get('数字条码', ''),
@@ -52,20 +96,49 @@ class InventoryController:
             '备注': '',
             '出库记录': ''
         }
+        return record
+
+    def handle_inbound_registration(self, info: dict) -> bool:
+        record = self._build_inbound_record(info, self.generate_order_number())
         success = self.model.add_record(record)
         if success:
             self.refresh_inventory_list()
         return success
 
+    def handle_inbound_batch(self, rows: list[dict]) -> tuple[int, list[str]]:
+        """
+        批量入库：先校验全部行，再一次性写入所有合格记录，最后只刷新一次界面。
+        返回 (成功条数, 失败原因列表)。
+        """
+        records = []
+        errors = []
+        for info in rows:
+            name = info.get('商品名称', '')
+            if not name:
+                errors.append("商品名称不能为空")
+                continue
+            try:
+                float(info.get('买价', ''))
+                float(info.get('佣金', '0') or 0)
+                int(info.get('商品数量', ''))
+            except (ValueError, TypeError) as e:
+                errors.append(f"商品'{name}'的数值格式错误: {e}")
+                continue
+            records.append(self._build_inbound_record(info, self.generate_order_number()))
+
+        if not records:
+            return 0, errors
+        if not self.model.add_records(records):
+            detail = self.model.last_error if hasattr(self.model, 'last_error') else ""
+            msg = f"数据库写入失败: {detail}" if detail else "数据库写入失败"
+            return 0, errors + [msg] * len(records)
+        self.refresh_inventory_list()
+        return len(records), errors
+
     def handle_outbound_registration(self, order: str, info: dict) -> bool:
-        updated = {
-            '出库状态': '卖出',
-            '出库档口': info.get('出库档口', ''),
-            '快递单号': info.get('快递单号', ''),
-            '快递价格': info.get('快递价格', ''),
-            '利润': ''
-        }
-        success = self.model.update_record(order, updated)
+        # 卖出同样记录出库事件，按出库时间/档口统计时不会漏掉
+        success = self.model.full_outbound(order, info.get('快递单号', ''), info.get('出库档口', ''), '卖出',
+                                           {'快递价格': info.get('快递价格', '')})
         if success:
             self.refresh_inventory_list()
         return success
@@ -79,45 +152,54 @@ class InventoryController:
             self.refresh_inventory_list()
         return success
 
+    def handle_full_outbound(self, order: str, tracking_number: str, counter: str) -> bool:
+        """
+        剩余数量全部出库，同样记录出库事件
+        """
+        success = self.model.full_outbound(order, tracking_number, counter)
+        if success:
+            self.refresh_inventory_list()
+        return success
+
+    def _recalculate_prices(self, original_record: dict, updated_fields: dict):
+        """
+        修改时重新计算结算价、单价、剩余价值，结果写入 updated_fields。
+        数据格式错误时抛出 ValueError / TypeError。
+        """
+        # 获取买价和佣金（优先使用更新字段，否则使用原值）
+        buy = float(updated_fields.get('买价', original_record.get('买价', '0')))
+        comm = float(updated_fields.get('佣金', original_record.get('佣金', '0')))
+        quantity = int(updated_fields.get('商品数量', original_record.get('商品数量', '1')))
+
+        # 计算结算价和单价
+        settlement_price = buy + comm
+        unit_price = settlement_price / max(quantity, 1)
+
+        updated_fields['结算价'] = f"{settlement_price:.2f}"
+        updated_fields['单价'] = f"{unit_price:.2f}"
+
+        # 如果修改了商品数量，需要重新计算剩余数量和剩余价值
+        if '商品数量' in updated_fields:
+            # 如果剩余数量为空，设置为新的商品数量
+            remaining_qty = int(original_record.get('剩余数量', '') or original_record.get('商品数量', '0'))
+            if not original_record.get('剩余数量', ''):
+                remaining_qty = quantity
+            updated_fields['剩余数量'] = str(remaining_qty)
+            updated_fields['剩余价值'] = f"{remaining_qty * unit_price:.2f}"
+        else:
+            # 如果没有修改商品数量，只更新剩余价值
+            remaining_qty = int(original_record.get('剩余数量', '') or original_record.get('商品数量', '0'))
+            updated_fields['剩余价值'] = f"{remaining_qty * unit_price:.2f}"
+
     def handle_modify(self, order: str, updated_fields: dict) -> tuple[bool, str]:
-        # 获取原记录
-        records = self.model.get_all_records()
-        original_record = None
-        for r in records:
-            if r['单号'] == order:
-                original_record = r
-                break
+        # 通过单号索引获取原记录
+        original_record = self.model.get_record(order)
         
         if not original_record:
             return False, "原始记录未找到"
         
-        # 修改时重新计算结算价、单价、剩余价值
         try:
-            # 获取买价和佣金（优先使用更新字段，否则使用原值）
-            buy = float(updated_fields.get('买价', original_record.get('买价', '0')))
-            comm = float(updated_fields.get('佣金', original_record.get('佣金', '0')))
-            quantity = int(updated_fields.get('商品数量', original_record.get('商品数量', '1')))
-            
-            # 计算结算价和单价
-            settlement_price = buy + comm
-            unit_price = settlement_price / max(quantity, 1)
-            
-            updated_fields['结算价'] = f"{settlement_price:.2f}"
-            updated_fields['单价'] = f"{unit_price:.2f}"
-            
-            # 如果修改了商品数量，需要重新计算剩余数量和剩余价值
-            if '商品数量' in updated_fields:
-                # 如果剩余数量为空，设置为新的商品数量
-                remaining_qty = int(original_record.get('剩余数量', '') or original_record.get('商品数量', '0'))
-                if not original_record.get('剩余数量', ''):
-                    remaining_qty = quantity
-                updated_fields['剩余数量'] = str(remaining_qty)
-                updated_fields['剩余价值'] = f"{remaining_qty * unit_price:.2f}"
-            else:
-                # 如果没有修改商品数量，只更新剩余价值
-                remaining_qty = int(original_record.get('剩余数量', '') or original_record.get('商品数量', '0'))
-                updated_fields['剩余价值'] = f"{remaining_qty * unit_price:.2f}"
-                
+            self._recalculate_prices(original_record, updated_fields)
         except (ValueError, TypeError) as e:
             updated_fields['结算价'] = ''
             updated_fields['单价'] = ''
@@ -131,6 +213,35 @@ class InventoryController:
         msg = f"数据库更新失败: {detail}" if detail else "数据库更新失败"
         return False, msg
 
+    def handle_modify_many(self, changes: dict) -> tuple[int, list[str]]:
+        """
+        批量修改：changes 为 {单号: 更新字段}。逐行重新计算价格后一次性写入，
+        最后只刷新一次界面。返回 (成功条数, 失败原因列表)。
+        """
+        prepared = {}
+        errors = []
+        for order, updated_fields in changes.items():
+            original_record = self.model.get_record(order)
+            if not original_record:
+                errors.append(f"{order}: 原始记录未找到")
+                continue
+            fields = dict(updated_fields)
+            try:
+                self._recalculate_prices(original_record, fields)
+            except (ValueError, TypeError) as e:
+                errors.append(f"{order}: 数据格式错误: {e}")
+                continue
+            prepared[order] = fields
+
+        if not prepared:
+            return 0, errors
+        if not self.model.update_records(prepared):
+            detail = self.model.last_error if hasattr(self.model, 'last_error') else ""
+            msg = f"数据库更新失败: {detail}" if detail else "数据库更新失败"
+            return 0, errors + [msg] * len(prepared)
+        self.refresh_inventory_list()
+        return len(prepared), errors
+
     def handle_delete(self, order: str) -> bool:
         success = self.model.delete_record(order)
         if success:
@@ -139,22 +250,59 @@ class InventoryController:
 
     def refresh_inventory_list(self):
         """
-        统一调用：刷新入库、出库列表，并且在“全部库存”查询模式下
+        统一调用：请求刷新入库、出库列表，并且在“全部库存”查询模式下
         自动更新数据查询页的数据（不清空筛选条件，只替换数据行）。
+        只标记为待刷新，Tk 空闲时（after_idle）合并为一次重新加载和重绘；
+        连续出库、批量修改等产生的多次请求只刷新一次。没有主窗口时立即刷新。
         """
+        root = getattr(self.view, 'root', None)
+        if root is None:
+            self.refresh_inventory_list_now()
+            return
+        if not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            root.after_idle(self.refresh_inventory_list_now)
+
+    def _pending_changes_received(self, changes):
+        self._pending_changes.extend(changes)
+
+    def refresh_inventory_list_now(self):
+        """
+        立即刷新各页的库存列表。自上次刷新以来只有记录级变更时，各页按单号只修补受影响的行；
+        切换表、文件被重新加载等整表变化（或没有变更通知）时整体重新加载和重绘。
+        """
+        # 先读取记录：文件在外部被修改时这里会重新解析，由 generation 的变化发现
         recs = self.model.get_all_records()
+        changes, self._pending_changes = self._pending_changes, []
+        generation = getattr(self.model, 'generation', None)
+        incremental = (bool(changes) and generation == self._painted_generation
+                       and all(c.kind != 'reset' for c in changes))
+        self._painted_generation = generation
+        self._refresh_scheduled = False
         if not self.view:
             return
 
-        # 1) 刷新出库页库存列表
-        self.view.outbound_page.update_inventory_list(recs)
-        # 2) 刷新入库页列表
-        self.view.inbound_page.refresh_list()
+        dp = self.view.data_page
+        # “全部库存”查询模式下随当前表的修改更新数据查询页
+        follow_data = dp.cb.get() == "全部库存" and dp.columns and not getattr(dp, 'all_tables', False)
+        if incremental:
+            self.view.outbound_page.apply_changes(changes)
+            self.view.inbound_page.apply_changes(changes)
+            self.view.modify_page.apply_changes(changes)
+            if not follow_data or dp.apply_changes(changes):
+                return
+        else:
+            # 1) 刷新出库页库存列表
+            self.view.outbound_page.update_inventory_list(recs)
+            # 2) 刷新入库页、数据修改页列表
+            self.view.inbound_page.refresh_list()
+            self.view.modify_page.refresh_list()
 
         # 3) 如果当前 DataView 是“全部库存”，则仅替换数据，不重置筛选
-        dp = self.view.data_page
-        if dp.cb.get() == "全部库存" and dp.columns:
-            # 构造新的行数据
+        if follow_data:
+            # 构造新的行数据（沿用查询时的入库日期范围，按入库时间降序）
+            start, end = getattr(dp, 'date_range', (None, None))
+            recs = self.records_in_range(start, end, by_time=True)
             new_data = []
             for r in recs:
                 new_data.append(tuple(r.get(c, "") for c in dp.columns))
@@ -171,13 +319,44 @@ class InventoryController:
             self.view.outbound_page.update_counter_list(ctrs)
             
     def switch_table(self, table_name):
-        """切换到指定的数据表"""
-        self.model = InventoryModel(table_name)
+        """切换到指定的数据表（沿用当前模型的存储配置）"""
+        self.model.set_table(table_name)
         self.refresh_inventory_list()
 
     # 以下是原有各种查询方法，保持不变
-    def view_all_inventory_unified(self):
-        recs = self.model.get_all_records()
+    def _archived_months(self, start=None, end=None) -> list[str]:
+        # 数据库存储没有归档分区
+        if not hasattr(self.model, 'archived_months'):
+            return []
+        return self.model.archived_months(start, end)
+
+    def records_in_range(self, start=None, end=None, by_time=False) -> list[dict]:
+        """
+        当前表入库日期在 [start, end]（YYYY-MM-DD，None 表示不限）内的记录，含相关的归档分区；
+        by_time 为 True 时按入库时间降序。
+        """
+        return records_in_range(self.model, start, end, by_time)
+
+    def archive_closed_records(self, before=None) -> int | None:
+        """把已全部出库/卖出的记录移入归档分区，返回归档条数，失败时返回 None。"""
+        if not hasattr(self.model, 'archive_closed_records'):
+            return None
+        count = self.model.archive_closed_records(before)
+        if count:
+            self.refresh_inventory_list()
+        return count
+
+    def migrate_outbound_events(self) -> int | None:
+        """把当前表旧版“出库记录”列迁移为出库事件（先备份整表），返回导入的事件数，失败时返回 None。"""
+        if not hasattr(self.model, 'migrate_outbound_events'):
+            return None
+        count = self.model.migrate_outbound_events()
+        if count:
+            self.refresh_inventory_list()
+        return count
+
+    def view_all_inventory_unified(self, start=None, end=None):
+        recs = self.records_in_range(start, end, by_time=True)
         cols = (
             "入库快递单号","货商姓名","入库时间","数字条码","商品名称",
             "商品数量","结算日期","货源","颜色/配置",
@@ -185,38 +364,53 @@ class InventoryController:
             "结算状态","出库状态","出库档口","快递单号","快递价格","备注","单号","出库记录"
         )
         data = [tuple(r.get(c, "") for c in cols) for r in recs]
-        self.view.data_page.display_results(cols, data)
+        self.view.data_page.display_results(cols, data, sorted_by_time=True)
 
-    def view_profit_by_product_unified(self):
-        recs = self.model.get_all_records()
-        d = {}
-        for r in recs:
-            p = r.get('商品名称', '')
-            try:
-                profit = float(r.get('行情价格','0') or 0) - float(r.get('结算价','0') or 0)
-            except:
-                profit = 0
-            d[p] = d.get(p, 0) + profit
+    def _aggregate(self, name, start=None, end=None) -> dict | None:
+        """
+        不限日期且没有归档时，直接取模型维护的物化汇总中的 name 项；
+        否则（或数据库存储没有物化汇总）返回 None，由调用方按记录统计。
+        """
+        if start or end or not hasattr(self.model, 'aggregates') or self._archived_months():
+            return None
+        return self.model.aggregates()[name]
+
+    def _profit_by(self, column, start=None, end=None) -> dict:
+        name = {'商品名称': 'profit_by_product', '货商姓名': 'profit_by_supplier'}.get(column)
+        d = self._aggregate(name, start, end) if name else None
+        if d is not None:
+            return d
+        # 不限日期且没有归档时直接用模型的索引汇总
+        if not (start or end) and not self._archived_months():
+            return self.model.profit_by(column)
+        return profit_by_records(self.records_in_range(start, end), column)
+
+    def view_profit_by_product_unified(self, start=None, end=None):
+        d = self._profit_by('商品名称', start, end)
         cols = ("商品名称", "盈亏")
         data = [(k, f"{d[k]:.2f}") for k in d]
         self.view.data_page.display_results(cols, data)
 
-    def view_profit_by_supplier_unified(self):
-        recs = self.model.get_all_records()
-        d = {}
-        for r in recs:
-            s = r.get('货商姓名', '')
-            try:
-                profit = float(r.get('行情价格','0') or 0) - float(r.get('结算价','0') or 0)
-            except:
-                profit = 0
-            d[s] = d.get(s, 0) + profit
+    def view_profit_by_supplier_unified(self, start=None, end=None):
+        d = self._profit_by('货商姓名', start, end)
         cols = ("货商姓名", "盈亏")
         data = [(k, f"{d[k]:.2f}") for k in d]
         self.view.data_page.display_results(cols, data)
 
-    def view_by_tracking_number_unified(self, t: str):
-        recs = [r for r in self.model.get_all_records() if r.get('快递单号','') == t]
+    def view_by_tracking_number_unified(self, t: str, start=None, end=None):
+        recs = [r for r in self.model.find_by('快递单号', t) if in_date_range(r, start, end)]
+        archived = {}
+        if self._archived_months(start, end):
+            archived = {r.get('单号', ''): r for r in self.model.iter_archived(start, end)}
+            recs += [r for r in archived.values() if r.get('快递单号', '') == t]
+        # 分批出库时后续批次的快递单号只记录在出库事件中
+        if hasattr(self.model, 'outbound_events'):
+            seen = {r.get('单号', '') for r in recs}
+            for e in self.model.outbound_events(快递单号=t):
+                r = self.model.get_record(e['单号']) or archived.get(e['单号'])
+                if r is not None and e['单号'] not in seen and in_date_range(r, start, end):
+                    seen.add(e['单号'])
+                    recs.append(r)
         cols = (
             "入库快递单号","货商姓名","入库时间","数字条码","商品名称",
             "商品数量","结算日期","货源","颜色/配置",
@@ -226,16 +420,92 @@ class InventoryController:
         data = [tuple(r.get(c,"") for c in cols) for r in recs]
         self.view.data_page.display_results(cols, data)
 
-    def view_inbound_count_by_supplier_unified(self):
-        recs = self.model.get_all_records()
-        cnt = {}
-        for r in recs:
-            s = r.get('货商姓名','')
-            cnt[s] = cnt.get(s, 0) + 1
+    def view_inbound_count_by_supplier_unified(self, start=None, end=None):
+        cnt = self._aggregate('inbound_by_supplier', start, end)
+        if cnt is None and not (start or end) and not self._archived_months():
+            cnt = self.model.count_by('货商姓名')
+        elif cnt is None:
+            cnt = count_by_records(self.records_in_range(start, end), '货商姓名')
         cols = ("货商姓名", "入库次数")
         data = [(k, str(cnt[k])) for k in cnt]
         self.view.data_page.display_results(cols, data)
-    
+
+    def grouped_summary(self, spec: dict, start=None, end=None) -> tuple[list, list]:
+        """
+        分组统计（见 analytics.group_by）。spec 含 group_cols、time_field（None / 入库时间 / 出库时间）、
+        unit（day/week/month）、measures、funcs。按出库时间统计时以出库事件为行，
+        日期范围也按出库日期筛选。
+        """
+        if spec.get('time_field') == '出库时间':
+            rows = self._outbound_rows(start, end)
+            numeric = NumericColumns(rows, EVENT_MEASURES)
+        elif not (start or end) and not self._archived_months() and hasattr(self.model, 'numeric_columns'):
+            # 不限日期且没有归档：直接用模型缓存的列式数据
+            numeric = self.model.numeric_columns()
+            rows = self.model.get_all_records()
+        else:
+            rows = self.records_in_range(start, end)
+            numeric = NumericColumns(rows)
+        return group_by(rows, numeric, spec.get('group_cols', ()), spec.get('time_field'),
+                        spec.get('unit', 'month'), spec.get('measures', ()), spec.get('funcs', ('sum',)))
+
+    def _outbound_rows(self, start=None, end=None) -> list[dict]:
+        """出库日期在 [start, end] 内的出库事件，拼上所属记录的商品名称等列。"""
+        if not hasattr(self.model, 'outbound_events'):
+            return []
+        events = [e for e in self.model.outbound_events()
+                  if (not start or e['出库时间'][:10] >= start) and (not end or e['出库时间'][:10] <= end)]
+        archived = None
+
+        def lookup(order):
+            nonlocal archived
+            r = self.model.get_record(order)
+            if r is None and self._archived_months():
+                # 出库日期与入库分区无关，归档记录只在用到时整体读取一次
+                if archived is None:
+                    archived = {a.get('单号', ''): a for a in self.model.iter_archived()}
+                r = archived.get(order)
+            return r
+        return outbound_rows(events, lookup)
+
+    def view_grouped_unified(self, spec: dict, start=None, end=None):
+        cols, data = self.grouped_summary(spec, start, end)
+        self.view.data_page.display_results(cols, data)
+
+    def summarize_all_tables(self, start=None, end=None) -> list[dict]:
+        """并行汇总设置中的所有数据表，返回各表的部分汇总（见 cross_table.summarize_table）。"""
+        backend = self.settings_model.get_storage_settings()['backend']
+        # 子进程从磁盘读取，先落盘当前表的异步修改
+        self.flush_writes()
+        return summarize_tables(self.settings_model.get_tables(), backend, start, end)
+
+    def view_all_tables_unified(self, query: str, start=None, end=None):
+        """在所有数据表上执行汇总查询，合并后显示；“全部库存”显示每张表一行及合计。"""
+        summaries = self.summarize_all_tables(start, end)
+        total = merge_summaries(summaries)
+        if query == "按商品统计盈亏":
+            d = total['profit_by_product']
+            cols = ("商品名称", "盈亏")
+            data = [(k, f"{d[k]:.2f}") for k in d]
+        elif query == "按货商统计盈亏":
+            d = total['profit_by_supplier']
+            cols = ("货商姓名", "盈亏")
+            data = [(k, f"{d[k]:.2f}") for k in d]
+        elif query == "按货商的入库次数":
+            cnt = total['inbound_by_supplier']
+            cols = ("货商姓名", "入库次数")
+            data = [(k, str(cnt[k])) for k in cnt]
+        else:
+            cols = ("数据表", "记录数", "库存价值", "盈亏")
+            data = [(s['表名'], str(s['rows']), f"{s['stock_value']:.2f}", f"{s['profit']:.2f}")
+                    for s in summaries]
+            data.append(("合计", str(total['rows']), f"{total['stock_value']:.2f}", f"{total['profit']:.2f}"))
+        self.view.data_page.display_results(cols, data)
+
+    def export_table(self, path: str) -> bool:
+        """导出当前表为 CSV 文件。"""
+        return self.model.export_csv(path)
+
     def refresh_column_display(self, page_type: str):
         """刷新指定页面的列显示配置"""
         if not self.view:
@@ -0,0 +1,81 @@
+import os
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from model import InventoryModel, profit_by_records, count_by_records
+from archive import records_in_range
+from numeric_columns import parse_number
+
+
+def summarize_table(table: str, backend: str = 'csv', start: str | None = None,
+                    end: str | None = None) -> dict:
+    """
+    读取一张表（含日期范围涉及的归档分区），返回可以与其他表合并的部分汇总。
+    在子进程中运行，只读不写。
+    """
+    if backend == 'sqlite':
+        from sqlite_model import SQLiteInventoryModel
+        model = SQLiteInventoryModel(table)
+    else:
+        # 只读打开：在内存中回放未合并的变更，不创建、不合并、不保存汇总，可与界面进程并发
+        model = InventoryModel(table, read_only=True)
+    try:
+        if not (start or end) and hasattr(model, 'aggregates') and not model.archived_months():
+            # 不限日期且没有归档：直接使用物化汇总，文件未变化时不必解析 CSV
+            return {'表名': table, **model.aggregates(), 'error': model.last_error}
+        records = records_in_range(model, start, end)
+        stock_value = 0.0
+        for r in records:
+            # 与数据查询页的“库存价值”一致：未卖出记录的结算价之和
+            if r.get('出库状态') != '卖出':
+                stock_value += parse_number(r.get('结算价'))[0]
+        by_product = profit_by_records(records, '商品名称')
+        return {
+            '表名': table,
+            'rows': len(records),
+            'stock_value': stock_value,
+            'profit': sum(by_product.values()),
+            'profit_by_product': by_product,
+            'profit_by_supplier': profit_by_records(records, '货商姓名'),
+            'inbound_by_supplier': count_by_records(records, '货商姓名'),
+            'error': model.last_error,
+        }
+    finally:
+        if backend == 'sqlite':
+            model.conn.close()
+
+
+def summarize_tables(tables: list[str], backend: str = 'csv', start: str | None = None,
+                     end: str | None = None, max_workers: int | None = None) -> list[dict]:
+    """
+    并行汇总多张表，按 tables 的顺序返回各表的部分汇总。
+    CSV 表在进程池中各自解析；数据库存储的各表共用一个文件，逐表在本进程查询。
+    """
+    if backend == 'sqlite' or len(tables) < 2:
+        return [summarize_table(t, backend, start, end) for t in tables]
+    workers = max_workers or min(len(tables), os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(summarize_table, tables, repeat(backend), repeat(start), repeat(end)))
+    except (BrokenProcessPool, OSError, NotImplementedError):
+        # 无法启动子进程（受限环境等）时退回逐表汇总
+        return [summarize_table(t, backend, start, end) for t in tables]
+
+
+def _merge_counts(target: dict, part: dict):
+    for k, v in part.items():
+        target[k] = target.get(k, 0) + v
+
+
+def merge_summaries(summaries: list[dict]) -> dict:
+    """合并各表的部分汇总；分组结果按各值首次出现的顺序排列。"""
+    total = {'rows': 0, 'stock_value': 0.0, 'profit': 0.0,
+             'profit_by_product': {}, 'profit_by_supplier': {}, 'inbound_by_supplier': {}}
+    for s in summaries:
+        total['rows'] += s['rows']
+        total['stock_value'] += s['stock_value']
+        total['profit'] += s['profit']
+        for key in ('profit_by_product', 'profit_by_supplier', 'inbound_by_supplier'):
+            _merge_counts(total[key], s[key])
+    return total
@@ -1,6 +1,14 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog, messagebox
 from datetime import datetime
+from numeric_columns import NumericColumns, mask_and
+from outbound_events import parse_legacy_outbound
+from archive import in_date_range
+from time_index import parse_timestamp
+from virtual_tree import VirtualTree
+from filter_engine import FilterEngine, compile_filters, FILTER_SYNTAX
+from sort_keys import TableSorter, click_sort, heading_text
+from group_by_dialog import GroupByDialog
 
 class DataView(ttk.Frame):
     def __init__(self, parent, controller):
@@ -9,10 +17,25 @@ class DataView(ttk.Frame):
 
         # 当前查询用到的列和数据
         self.columns = []
+        self._row_cols = []  # orig 中每行包含的列
         self.orig = []  # 原始数据字典列表
         self.full = []  # 应用筛选或排序后的数据
+        # orig 的列式数值及状态掩码，加载数据时构建一次，供 update_metrics 使用
+        self._numeric = NumericColumns()
+        self._orig_pos = {}
+        self._by_order = {}  # 单号 → orig 中的行，供增量更新定位
+        self._sold = self._not_sold = self._unsettled = bytearray()
+        self._filter = FilterEngine()  # orig 的筛选
 
         self.sort_states = {}  # 各列排序状态：True=升序，False=降序
+        self.sort_spec = []  # 当前排序条件 [(列, 是否升序), ...]，筛选后沿用
+        self._sorter = TableSorter()  # orig 的排序键及各排序条件的结果
+        # 当前查询的入库日期范围 (起, 止)，None 表示不限；只有范围涉及的月份才读取归档分区
+        self.date_range = (None, None)
+        # 当前结果是否为所有数据表的汇总（此时不随当前表的修改自动刷新）
+        self.all_tables = False
+        # 上次的分组统计选项（见 GroupByDialog）
+        self.group_spec = None
 
         self.create_widgets()
 
@@ -24,7 +47,8 @@ class DataView(ttk.Frame):
             "按商品统计盈亏",
             "按货商统计盈亏",
             "快递单号查询",
-            "按货商的入库次数"
+            "按货商的入库次数",
+            "分组统计"
         ], state="readonly", width=20)
         self.cb.current(0)
         self.cb.grid(row=0, column=1, padx=5, pady=5, sticky="w")
@@ -37,20 +61,37 @@ class DataView(ttk.Frame):
         self.ent_cond.bind("<Return>", lambda e: self.exec_q())
 
         ttk.Button(self, text="查询", command=self.exec_q).grid(row=0, column=4, padx=5, pady=5)
+        ttk.Button(self, text="导出CSV", command=self.export_csv).grid(row=0, column=5, padx=5, pady=5)
+
+        # 入库日期范围（YYYY-MM-DD，留空表示不限）
+        range_fr = ttk.Frame(self)
+        range_fr.grid(row=0, column=6, padx=5, pady=5, sticky="w")
+        ttk.Label(range_fr, text="入库日期:").pack(side=tk.LEFT)
+        self.ent_from = ttk.Entry(range_fr, width=11)
+        self.ent_from.pack(side=tk.LEFT)
+        ttk.Label(range_fr, text="至").pack(side=tk.LEFT, padx=2)
+        self.ent_to = ttk.Entry(range_fr, width=11)
+        self.ent_to.pack(side=tk.LEFT)
+        for e in (self.ent_from, self.ent_to):
+            e.bind("<Return>", lambda ev: self.exec_q())
+        # 汇总设置中的所有数据表（快递单号查询只查当前表）
+        self.var_all_tables = tk.BooleanVar(value=False)
+        self.chk_all_tables = ttk.Checkbutton(range_fr, text="所有数据表", variable=self.var_all_tables)
+        self.chk_all_tables.pack(side=tk.LEFT, padx=(10, 0))
         self.on_q()
 
-        # 结果表格
-        self.tree = ttk.Treeview(self, show="headings")
-        self.tree.grid(row=1, column=0, columnspan=5, sticky="nsew")
+        # 结果表格：虚拟滚动，只为可见行创建 Treeview 项
+        self.table = VirtualTree(self, self._row_values, self._row_tags, show="headings")
+        self.table.grid(row=1, column=0, columnspan=6, sticky="nsew")
+        self.tree = self.table.tree
         # 仅"出库状态"列上色
         self.tree.tag_configure('outbound', foreground='green')
         self.tree.tag_configure('inbound',  foreground='blue')
         # 绑定双击事件
         self.tree.bind("<Double-1>", self.on_tree_double_click)
+        # Shift+单击表头：多列排序
+        self.tree.bind("<Shift-Button-1>", self.on_heading_shift_click)
 
-        vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
-        vsb.grid(row=1, column=5, sticky="ns")
-        self.tree.configure(yscrollcommand=vsb.set)
         hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
         hsb.grid(row=2, column=0, columnspan=5, sticky="ew")
         self.tree.configure(xscrollcommand=hsb.set)
@@ -109,6 +150,8 @@ class DataView(ttk.Frame):
             e.bind("<Return>", lambda ev: self.apply_filters())
             self.filter_entries[c] = e
         idx = len(self.columns)
+        ttk.Label(self.filter_inner, text=f"支持：{FILTER_SYNTAX}", foreground="gray")\
+            .grid(row=0, column=idx, columnspan=2, sticky="w", padx=5)
         ttk.Button(self.filter_inner, text="应用筛选", command=self.apply_filters)\
             .grid(row=1, column=idx, padx=5)
         ttk.Button(self.filter_inner, text="清空筛选条件", command=self.clear_filters)\
@@ -120,28 +163,81 @@ class DataView(ttk.Frame):
             self.ent_cond.delete(0, tk.END)
             self.ent_cond.config(state="disabled")
             self.lbl_cond.config(text="查询条件:")
+            self.chk_all_tables.config(state="normal")
+        elif q == "分组统计":
+            self.ent_cond.delete(0, tk.END)
+            self.ent_cond.config(state="disabled")
+            self.lbl_cond.config(text="查询条件:")
+            self.var_all_tables.set(False)
+            self.chk_all_tables.config(state="disabled")
         else:
             self.ent_cond.config(state="normal")
             self.lbl_cond.config(text="快递单号:")
+            self.var_all_tables.set(False)
+            self.chk_all_tables.config(state="disabled")
+
+    def get_date_range(self):
+        """读取入库日期范围，返回 (起, 止)，留空的一端为 None；格式错误时提示并返回 None。"""
+        result = []
+        for e in (self.ent_from, self.ent_to):
+            v = e.get().strip()
+            if v:
+                try:
+                    v = datetime.strptime(v, "%Y-%m-%d").strftime("%Y-%m-%d")
+                except ValueError:
+                    messagebox.showwarning("提示", f"日期格式应为 YYYY-MM-DD：{v}")
+                    return None
+            result.append(v or None)
+        return tuple(result)
 
     def exec_q(self):
         q = self.cb.get()
         c = self.ent_cond.get().strip()
-        if q == "全部库存":
-            self.controller.view_all_inventory_unified()
+        rng = self.get_date_range()
+        if rng is None:
+            return
+        self.date_range = rng
+        self.all_tables = self.var_all_tables.get() and q not in ("快递单号查询", "分组统计")
+        if q == "分组统计":
+            dialog = GroupByDialog(self.winfo_toplevel(), self.group_spec)
+            self.wait_window(dialog)
+            if dialog.result is None:
+                return
+            self.group_spec = dialog.result
+            self.controller.view_grouped_unified(self.group_spec, *rng)
+        elif self.all_tables:
+            self.controller.view_all_tables_unified(q, *rng)
+        elif q == "全部库存":
+            self.controller.view_all_inventory_unified(*rng)
         elif q == "按商品统计盈亏":
-            self.controller.view_profit_by_product_unified()
+            self.controller.view_profit_by_product_unified(*rng)
         elif q == "按货商统计盈亏":
-            self.controller.view_profit_by_supplier_unified()
+            self.controller.view_profit_by_supplier_unified(*rng)
         elif q == "按货商的入库次数":
-            self.controller.view_inbound_count_by_supplier_unified()
+            self.controller.view_inbound_count_by_supplier_unified(*rng)
         else:
-            self.controller.view_by_tracking_number_unified(c)
+            self.controller.view_by_tracking_number_unified(c, *rng)
 
-    def display_results(self, cols, data):
+    def export_csv(self):
+        path = filedialog.asksaveasfilename(
+            title="导出当前表", defaultextension=".csv", filetypes=[("CSV 文件", "*.csv")]
+        )
+        if not path:
+            return
+        if self.controller.export_table(path):
+            messagebox.showinfo("提示", f"已导出到 {path}")
+        else:
+            messagebox.showerror("错误", "导出失败")
+
+    def display_results(self, cols, data, sorted_by_time=False):
+        """显示查询结果；sorted_by_time 表示 data 已按入库时间降序（来自模型的入库时间索引）。"""
         # 保存所有列和原始数据
         self.all_columns = list(cols)
+        self._row_cols = list(cols)
         self.orig = [dict(zip(cols, row)) for row in data]
+        # 默认按照入库时间降序排列；筛选结果沿用这一顺序
+        if '入库时间' in self.all_columns and not sorted_by_time:
+            self.orig.sort(key=lambda d: parse_timestamp(d.get('入库时间')), reverse=True)
         # 计算利润
         for d in self.orig:
             try:
@@ -149,86 +245,68 @@ class DataView(ttk.Frame):
                 d["利润"] = f"{p:.2f}"
             except:
                 d["利润"] = ""
+        self._load_numeric()
         self.full = list(self.orig)
 
-        # 从设置中获取要显示的列
-        display_cols = self.controller.settings_model.get_display_columns('data_query')
-        if not display_cols:
-            # 如果没有配置，使用所有列
-            display_cols = self.all_columns
-        
-        # 只保留存在的列
-        self.columns = [col for col in display_cols if col in self.all_columns]
-        if not self.columns:
-            self.columns = self.all_columns
-
-        # 默认按照入库时间降序排列
-        if '入库时间' in self.all_columns:
-            self.full.sort(key=lambda d: self._parse_datetime(
-                d.get('入库时间', '0000-01-01 00:00:00')
-            ), reverse=True)
+        self.columns = self._display_columns()
 
         # 重建表头
-        self.tree.delete(*self.tree.get_children())
-        self.tree["columns"] = self.columns
-        self.sort_states = {c: True for c in self.columns}
-        for c in self.columns:
-            self.tree.heading(c, text=c, command=lambda c=c: self.sort_by(c))
-            self.tree.column(c, width=100, anchor="center")
+        self.sort_spec = []
+        self._set_headings()
 
-        # 插入数据并上色"出库状态"
-        for d in self.full:
-            vals = []
-            for c in self.columns:
-                if c == "出库记录":
-                    # 出库记录列显示"点击查询详细"
-                    vals.append("双击查询详细")
-                else:
-                    vals.append(d.get(c,""))
-            status = d.get("出库状态","")
-            tag = "outbound" if status == "卖出" else "inbound"
-            self.tree.insert("", tk.END, values=vals, tags=(tag,))
+        # 显示数据并上色"出库状态"
+        self._fill_tree()
 
         # 重建筛选区
         self.create_filter_row()
 
         # 更新指标
         self.update_metrics()
+
+    def _set_headings(self):
+        self.tree["columns"] = self.columns
+        self.sort_states = {c: True for c in self.columns}
+        for c in self.columns:
+            self.tree.heading(c, text=heading_text(c, self.sort_spec), command=lambda c=c: self.sort_by(c))
+            self.tree.column(c, width=100, anchor="center")
+
+    def _row_values(self, d):
+        # 出库记录列显示"双击查询详细"
+        return [("双击查询详细" if c == "出库记录" else d.get(c, "")) for c in self.columns]
+
+    @staticmethod
+    def _row_tags(d):
+        return ("outbound" if d.get("出库状态", "") == "卖出" else "inbound",)
+
+    def _fill_tree(self):
+        """按 full 重绘表格，滚动位置（行号）和选中行保持不变。"""
+        self.table.set_rows(self.full)
     
+    def _display_columns(self) -> list:
+        """
+        要显示的列：记录列表（含单号列）按设置中的显示列，汇总结果（分组统计等）显示全部列。
+        """
+        if '单号' not in self.all_columns:
+            return list(self.all_columns)
+        display_cols = self.controller.settings_model.get_display_columns('data_query')
+        # 只保留存在的列；没有配置或都不存在时使用所有列
+        columns = [col for col in display_cols or self.all_columns if col in self.all_columns]
+        return columns or list(self.all_columns)
+
     def refresh_columns(self):
         """刷新表格列显示配置"""
         if not hasattr(self, 'all_columns') or not self.all_columns:
             return
         
-        # 从设置中获取要显示的列
-        display_cols = self.controller.settings_model.get_display_columns('data_query')
-        if not display_cols:
-            display_cols = self.all_columns
+        self.columns = self._display_columns()
         
-        # 只保留存在的列
-        self.columns = [col for col in display_cols if col in self.all_columns]
-        if not self.columns:
-            self.columns = self.all_columns
-        
-        # 重建表头
-        self.tree.delete(*self.tree.get_children())
-        self.tree["columns"] = self.columns
-        self.sort_states = {c: True for c in self.columns}
-        for c in self.columns:
-            self.tree.heading(c, text=c, command=lambda c=c: self.sort_by(c))
-            self.tree.column(c, width=100, anchor="center")
+        # 重建表头（隐藏的列不再参与排序）
+        self.sort_spec = [(c, asc) for c, asc in self.sort_spec if c in self.columns]
+        self.full = self._sorter.sort(self.full, self.sort_spec) if self.sort_spec else self.full
+        self._set_headings()
         
-        # 重新插入数据
-        for d in self.full:
-            vals = []
-            for c in self.columns:
-                if c == "出库记录":
-                    vals.append("双击查询详细")
-                else:
-                    vals.append(d.get(c,""))
-            status = d.get("出库状态","")
-            tag = "outbound" if status == "卖出" else "inbound"
-            self.tree.insert("", tk.END, values=vals, tags=(tag,))
+        # 重新显示数据
+        self._fill_tree()
         
         # 重建筛选区
         self.create_filter_row()
@@ -236,62 +314,96 @@ class DataView(ttk.Frame):
         # 更新指标
         self.update_metrics()
 
+    def _make_row(self, values: dict) -> dict:
+        d = {c: values.get(c, "") for c in self._row_cols}
+        try:
+            p = float(d.get("行情价格","0") or 0) - float(d.get("结算价","0") or 0)
+            d["利润"] = f"{p:.2f}"
+        except:
+            d["利润"] = ""
+        return d
+
     def update_current_data(self, cols, data):
         # 保留当前筛选条件，只替换数据
         self.columns = list(cols)
-        self.orig = [dict(zip(cols, row)) for row in data]
-        for d in self.orig:
-            try:
-                p = float(d.get("行情价格","0") or 0) - float(d.get("结算价","0") or 0)
-                d["利润"] = f"{p:.2f}"
-            except:
-                d["利润"] = ""
-        self.full = list(self.orig)
-        # 默认按入库时间降序
-        if '入库时间' in self.columns:
-            self.full.sort(key=lambda d: self._parse_datetime(
-                d.get('入库时间', '0000-01-01 00:00:00')
-            ), reverse=True)
-        # 重绘行
-        self.tree.delete(*self.tree.get_children())
-        for d in self.full:
-            vals = []
-            for c in self.columns:
-                if c == "出库记录":
-                    # 出库记录列显示"点击查询详细"
-                    vals.append("点击查询详细")
-                else:
-                    vals.append(d.get(c,""))
-            status = d.get("出库状态","")
-            tag = "outbound" if status == "卖出" else "inbound"
-            self.tree.insert("", tk.END, values=vals, tags=(tag,))
-        # 重新应用筛选条件
+        self._row_cols = list(cols)
+        self.orig = [self._make_row(dict(zip(cols, row))) for row in data]
+        self._load_numeric()
+        # 重新应用筛选条件并重绘行
         self.apply_filters()
 
-    def apply_filters(self):
-        filtered = []
-        for d in self.orig:
-            ok = True
-            for c, e in self.filter_entries.items():
-                v = e.get().strip().lower()
-                if v and v not in str(d.get(c,"")).lower():
-                    ok = False
-                    break
-            if ok:
-                filtered.append(d)
-        self.full = filtered
-        self.tree.delete(*self.tree.get_children())
-        for d in self.full:
-            vals = []
-            for c in self.columns:
-                if c == "出库记录":
-                    # 出库记录列显示"点击查询详细"
-                    vals.append("点击查询详细")
+    def apply_changes(self, changes) -> bool:
+        """
+        “全部库存”结果的增量更新：按单号修补 orig 和 full（新记录插到最前），
+        其余行保持原位，滚动位置和选中行不变。结果中没有单号列时返回 False，需整体更新。
+        """
+        if "单号" not in self._row_cols:
+            return False
+        start, end = self.date_range
+        passes = compile_filters(self._filter_terms())
+        removed = False
+        dropped, added = set(), {}  # full 中要删除的位置；要插到最前的新行（单号 → 行）
+        for c in changes:
+            d = None
+            if c.new is not None and in_date_range(c.new, start, end):
+                d = self._make_row(c.new)
+            # 1) 修补 orig 及其列式数值、筛选和排序缓存（删除时最后统一重建）
+            old = self._by_order.pop(c.order, None)
+            if old is not None:
+                i = self._orig_pos.pop(id(old))
+                self.orig[i] = d
+                if d is None:
+                    removed = True
                 else:
-                    vals.append(d.get(c,""))
-            status = d.get("出库状态","")
-            tag = "outbound" if status == "卖出" else "inbound"
-            self.tree.insert("", tk.END, values=vals, tags=(tag,))
+                    self._orig_pos[id(d)] = i
+                    self._numeric.set(i, d)
+                    self._set_masks(i, d)
+                    if not removed:
+                        self._filter.update(i, d)
+                        self._sorter.update(i, d)
+            elif d is not None:
+                self._orig_pos[id(d)] = len(self.orig)
+                if not removed:
+                    self._filter.update(len(self.orig), d)
+                    self._sorter.update(len(self.orig), d)
+                self.orig.append(d)
+                self._numeric.append(d)
+                self._set_masks(None, d)
+            if d is not None:
+                self._by_order[c.order] = d
+            # 2) 只修补 full 中受影响的行：按单号取位置，增删最后一次完成
+            shown = d is not None and passes(d)
+            added.pop(c.order, None)
+            i = self.table.index(old) if old is not None else None
+            if i is not None:
+                if shown:
+                    self.table.replace(i, d)
+                else:
+                    dropped.add(i)
+            elif shown:
+                added[c.order] = d
+        self.table.delete_rows(dropped)
+        self.table.insert_rows(0, list(added.values())[::-1])
+        if removed:
+            self.orig = [d for d in self.orig if d is not None]
+            self._load_numeric()
+        self.table.refresh()
+        self.update_metrics()
+        return True
+
+    def _filter_terms(self):
+        terms = []
+        for c, e in self.filter_entries.items():
+            v = e.get().strip().lower()
+            if v:
+                terms.append((c, v))
+        return terms
+
+    def apply_filters(self):
+        self.full = self._filter.filter(self._filter_terms())
+        if self.sort_spec:
+            self.full = self._sorter.sort(self.full, self.sort_spec)
+        self._fill_tree()
         self.update_metrics()
 
     def clear_filters(self):
@@ -299,72 +411,71 @@ class DataView(ttk.Frame):
             e.delete(0, tk.END)
         self.apply_filters()
 
-    def sort_by(self, col):
+    def sort_by(self, col, multi=False):
+        """单击表头按该列排序（再次单击反向）；multi 为 True（Shift+单击）时追加为次要排序列。"""
         asc = self.sort_states.get(col, True)
-        try:
-            self.full.sort(key=lambda x: float(x.get(col,"") or 0), reverse=not asc)
-        except:
-            self.full.sort(key=lambda x: x.get(col,""), reverse=not asc)
-        self.sort_states[col] = not asc
-        self.tree.delete(*self.tree.get_children())
-        for d in self.full:
-            vals = []
-            for c in self.columns:
-                if c == "出库记录":
-                    # 出库记录列显示"点击查询详细"
-                    vals.append("点击查询详细")
-                else:
-                    vals.append(d.get(c,""))
-            status = d.get("出库状态","")
-            tag = "outbound" if status == "卖出" else "inbound"
-            self.tree.insert("", tk.END, values=vals, tags=(tag,))
-
-    def _parse_datetime(self, date_str):
-        """解析多种格式的日期字符串"""
-        formats = [
-            "%Y-%m-%d %H:%M:%S",  # 带秒的完整格式
-            "%Y-%m-%d %H:%M",     # 不带秒的格式
-            "%Y-%m-%d"           # 只有日期的格式
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        
-        # 如果所有格式都失败，返回一个很早的日期作为默认值
-        return datetime(1900, 1, 1)
-        
+        self.sort_spec = click_sort(self.sort_spec, col, asc, multi)
+        if not multi:
+            self.sort_states[col] = not asc
+        self.full = self._sorter.sort(self.full, self.sort_spec)
+        for c in self.columns:
+            self.tree.heading(c, text=heading_text(c, self.sort_spec))
+        self._fill_tree()
+
+    def on_heading_shift_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != "heading":
+            return None
+        i = int(self.tree.identify_column(event.x)[1:]) - 1
+        if 0 <= i < len(self.columns):
+            self.sort_by(self.columns[i], multi=True)
+        return "break"
+
+    def _load_numeric(self):
+        """为 orig 构建列式数值、状态掩码，并重置筛选和排序的缓存。"""
+        self._numeric = NumericColumns(self.orig)
+        self._filter.load(self.orig)
+        self._sorter.load(self.orig)
+        self._orig_pos = {id(d): i for i, d in enumerate(self.orig)}
+        self._by_order = {d.get('单号'): d for d in self.orig if d.get('单号')}
+        self._sold = bytearray(d.get('出库状态') == '卖出' for d in self.orig)
+        self._not_sold = bytearray(not s for s in self._sold)
+        self._unsettled = bytearray(d.get('结算状态') == '否' for d in self.orig)
+
+    def _set_masks(self, i, d):
+        """更新 orig 第 i 行（None 表示追加的一行）的状态掩码。"""
+        sold = d.get('出库状态') == '卖出'
+        unsettled = d.get('结算状态') == '否'
+        if i is None:
+            self._sold.append(sold)
+            self._not_sold.append(not sold)
+            self._unsettled.append(unsettled)
+        else:
+            self._sold[i] = sold
+            self._not_sold[i] = not sold
+            self._unsettled[i] = unsettled
+
     def update_metrics(self):
-        sold_profit = settled_profit = inventory_value = shipping_cost = commission_cost = unsettled_amount = 0.0
-        total_market = total_qty = 0.0
-        for d in self.full:
-            try: commission_cost += float(d.get('佣金','0') or 0)
-            except: pass
-            if d.get('出库状态') == '卖出':
-                try:
-                    sale = float(d.get('行情价格','0') or 0)
-                    cost = float(d.get('结算价','0') or 0)
-                    ship = float(d.get('快递价格','0') or 0)
-                    sold_profit   += (sale - cost - ship)
-                    shipping_cost += ship
-                    
-                    # 计算已出库且已设置结算价的总利润
-                    # 检查结算价是否已设置（不为空且大于0）
-                    if cost > 0:
-                        settled_profit += (sale - cost - ship)
-                except: pass
-            else:
-                try: inventory_value += float(d.get('结算价','0') or 0)
-                except: pass
-            if d.get('结算状态') == '否':
-                try: unsettled_amount += float(d.get('结算价','0') or 0)
-                except: pass
-            try: total_market += float(d.get('行情价格','0') or 0)
-            except: pass
-            try: total_qty    += float(d.get('商品数量','0') or 0)
-            except: pass
+        nc = self._numeric
+        # 当前显示的行（筛选后）对应的掩码；未筛选时为 None 表示全部
+        if len(self.full) == len(self.orig):
+            shown = None
+        else:
+            shown = nc.selector(self._orig_pos[id(d)] for d in self.full)
+
+        # 无法解析的值按 0 计入单列合计
+        commission_cost = nc.sum('佣金', shown)
+        total_market = nc.sum('行情价格', shown)
+        total_qty = nc.sum('商品数量', shown)
+        inventory_value = nc.sum('结算价', mask_and(shown, self._not_sold))
+        unsettled_amount = nc.sum('结算价', mask_and(shown, self._unsettled))
+
+        # 卖出的行：行情价格、结算价、快递价格任一无法解析时整行跳过
+        sold = mask_and(shown, self._sold, nc.ok['行情价格'], nc.ok['结算价'], nc.ok['快递价格'])
+        shipping_cost = nc.sum('快递价格', sold)
+        sold_profit = nc.sum('行情价格', sold) - nc.sum('结算价', sold) - shipping_cost
+        # 已出库且已设置结算价（大于0）的总利润
+        settled = mask_and(sold, nc.positive('结算价'))
+        settled_profit = nc.sum('行情价格', settled) - nc.sum('结算价', settled) - nc.sum('快递价格', settled)
 
         self.lbl_sold_profit     .config(text=f"卖出总利润: {sold_profit:.2f}")
         self.lbl_settled_profit  .config(text=f"已出库已结算总利润: {settled_profit:.2f}")
@@ -401,9 +512,8 @@ class DataView(ttk.Frame):
         # 只有点击出库记录列才弹出详细窗口
         if col_name == "出库记录":
             # 获取当前行的数据
-            row_index = self.tree.index(item)
-            if row_index < len(self.full):
-                record_data = self.full[row_index]
+            record_data = self.table.row_at(item)
+            if record_data is not None:
                 self.show_outbound_details(record_data)
     
     def show_outbound_details(self, record_data):
@@ -457,27 +567,18 @@ class DataView(ttk.Frame):
         detail_scrollbar.pack(side="right", fill="y")
         detail_tree.configure(yscrollcommand=detail_scrollbar.set)
         
-        # 解析出库记录数据
-        outbound_records_str = record_data.get('出库记录', '')
-        if outbound_records_str:
-            try:
-                # 出库记录格式: "时间1|档口1|快递单号1|数量1|单价1;时间2|档口2|快递单号2|数量2|单价2"
-                records = outbound_records_str.split(';')
-                for record in records:
-                    if record.strip():
-                        parts = record.split('|')
-                        if len(parts) >= 4:
-                            time_str = parts[0] if len(parts) > 0 else ""
-                            counter = parts[1] if len(parts) > 1 else ""
-                            tracking = parts[2] if len(parts) > 2 else ""
-                            quantity = parts[3] if len(parts) > 3 else ""
-                            unit_price = parts[4] if len(parts) > 4 else ""
-                            detail_tree.insert("", tk.END, values=(time_str, counter, tracking, quantity, unit_price))
-            except Exception as e:
-                # 如果解析失败，显示原始数据
-                detail_tree.insert("", tk.END, values=("解析错误", "", "", "", ""))
-                detail_tree.insert("", tk.END, values=(outbound_records_str, "", "", "", ""))
+        # 出库事件按单号索引查询；数据模型不支持出库事件时解析旧版“出库记录”字符串
+        model = self.controller.model
+        order = record_data.get('单号', '')
+        if hasattr(model, 'outbound_events'):
+            events = model.outbound_events(单号=order)
         else:
+            events = parse_legacy_outbound(order, record_data.get('出库记录', ''))
+        for e in events:
+            detail_tree.insert("", tk.END, values=(
+                e['出库时间'], e['出库档口'], e['快递单号'], e['出库数量'], e['单价']
+            ))
+        if not events:
             # 如果没有出库记录，显示提示
             detail_tree.insert("", tk.END, values=("暂无出库记录", "", "", "", ""))
         
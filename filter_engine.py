@@ -0,0 +1,253 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+from numeric_columns import parse_number
+from time_index import parse_timestamp, NO_TIME
+
+# 筛选框支持的写法（其余按子串匹配）
+FILTER_SYNTAX = ">100  <=50  10..50  2025-03-01..2025-03-31  =精确值  =（为空）  !empty（不为空）  a|b"
+_OPS = ('>=', '<=', '>', '<')
+
+
+def _typed(text: str):
+    """把条件中的值识别为 ('num', 数值)、('time', (起, 止)) 或 ('str', 文本)。只有日期时止为当天最后一秒。"""
+    try:
+        return 'num', float(text)
+    except ValueError:
+        pass
+    t = parse_timestamp(text)
+    if t != NO_TIME:
+        return 'time', (t, t + 86399 if len(text) <= 10 else t)
+    return 'str', text
+
+
+def parse_term(text: str) -> tuple:
+    """
+    把一个筛选框的内容（已转小写）解析为条件：
+    ('sub', 子串)、('eq', 值)、('empty', 是否为空)、('range', 类型, 下限, 上限)、('or', [条件, ...])。
+    比较（>100、<=2025-03-01）也表示为 range，不限的一端为 None。
+    单独的 = 表示为空（空白也算空），!empty 表示不为空；单独的 empty 仍按子串查找。
+    """
+    if '|' in text:
+        return 'or', [parse_term(part.strip()) for part in text.split('|') if part.strip()]
+    if text in ('=', '!empty'):
+        return 'empty', text == '='
+    if text.startswith('='):
+        return 'eq', text[1:]
+    for op in _OPS:
+        if text.startswith(op) and text[len(op):].strip():
+            kind, value = _typed(text[len(op):].strip())
+            if kind == 'time':
+                first, last = value
+                value = {'>=': (first, None), '>': (last + 1, None), '<=': (None, last), '<': (None, first - 1)}[op]
+                return ('range', kind) + value
+            if op in ('>=', '>'):
+                return 'range', kind, (value, op == '>'), None
+            return 'range', kind, None, (value, op == '<')
+    if '..' in text:
+        lo, _, hi = text.partition('..')
+        lo, hi = lo.strip(), hi.strip()
+        kinds = {_typed(v)[0] for v in (lo, hi) if v}
+        # 只有两端都是数值或都是时间时才是区间，其余（a..b、...）仍按子串查找
+        if len(kinds) == 1 and kinds <= {'num', 'time'}:
+            kind = kinds.pop()
+            lo_v = _typed(lo)[1] if lo else None
+            hi_v = _typed(hi)[1] if hi else None
+            if kind == 'time':
+                return 'range', kind, lo_v and lo_v[0], hi_v and hi_v[1]
+            return ('range', kind, None if lo_v is None else (lo_v, False),
+                    None if hi_v is None else (hi_v, False))
+    return 'sub', text
+
+
+def _plain(cond) -> bool:
+    return cond[0] == 'sub'
+
+
+def compile_filters(terms):
+    """把 [(列, 小写条件), ...] 编译成判断单行是否满足全部条件的函数。"""
+    checks = [(c, _row_check(parse_term(v))) for c, v in terms]
+    if not checks:
+        return lambda row: True
+    return lambda row: all(check(str(row.get(c, ""))) for c, check in checks)
+
+
+def _row_check(cond):
+    """单个值（原始字符串）的判断函数。"""
+    kind = cond[0]
+    if kind == 'or':
+        parts = [_row_check(c) for c in cond[1]]
+        return lambda v: any(p(v) for p in parts)
+    if kind == 'sub':
+        return lambda v: cond[1] in v.lower()
+    if kind == 'eq':
+        return lambda v: v.lower() == cond[1]
+    if kind == 'empty':
+        return lambda v: (v.strip() == '') == cond[1]
+    _, typ, lo, hi = cond
+    if typ == 'time':
+        return lambda v: _in_time(parse_timestamp(v), lo, hi)
+    if typ == 'num':
+        def check(v):
+            x, ok, null = parse_number(v)
+            return ok and not null and _in_range(x, lo, hi)
+        return check
+    return lambda v: _in_range(v.lower(), lo, hi)
+
+
+def _in_range(x, lo, hi) -> bool:
+    """lo、hi 为 (界, 是否不含) 或 None。"""
+    if lo is not None and (x < lo[0] or (lo[1] and x == lo[0])):
+        return False
+    if hi is not None and (x > hi[0] or (hi[1] and x == hi[0])):
+        return False
+    return True
+
+
+def _in_time(t, lo, hi) -> bool:
+    return t != NO_TIME and (lo is None or t >= lo) and (hi is None or t <= hi)
+
+
+def _narrows(terms: dict, previous: dict) -> bool:
+    """
+    terms 的结果是否一定包含在 previous 的结果中：原有各列的条件不变，
+    或者都是子串且只是加长；可以另加新列。
+    """
+    for c, v in previous.items():
+        if c not in terms:
+            return False
+        if terms[c] != v and not (_plain(parse_term(v)) and _plain(parse_term(terms[c])) and v in terms[c]):
+            return False
+    return True
+
+
+class FilterEngine:
+    """
+    表格筛选。每列的条件可以是子串，也可以是比较、区间、精确值、是否为空及其组合（见 parse_term）。
+
+    加载数据后各列按需生成一次小写值、数值、时间等类型化副本，之后不再逐格转换；
+    精确值走按值分组的哈希索引，数值和时间的比较、区间走有序索引二分查找。
+    新的条件是上一次条件的收窄（在原有的子串后继续输入、或多填一列）时，
+    只在上一次的结果中查找，不必重新扫描全部行。
+    单行修改或追加用 update 就地修补已生成的副本，不必重新 load。
+    """
+
+    def __init__(self):
+        self.load([])
+
+    def load(self, rows: list):
+        """设置要筛选的行（复制一份按位置引用；增删行后需重新调用，单行修改用 update）。"""
+        self.rows = list(rows)
+        self._lower = {}    # 列名 → 按位置排列的小写值
+        self._by_value = {}  # 列名 → {小写值: 位置列表}
+        self._sorted = {}   # (列名, 'num' / 'time') → (升序的值, 对应位置)
+        self._last = None   # 上一次的 (条件, 结果位置)
+
+    def update(self, pos: int, row):
+        """把第 pos 行换成 row（pos 等于行数时追加），小写值和精确值索引就地修补，有序索引下次用到时重建。"""
+        append = pos == len(self.rows)
+        if append:
+            self.rows.append(row)
+        else:
+            self.rows[pos] = row
+        for column, values in self._lower.items():
+            v = str(row.get(column, "")).lower()
+            index = self._by_value.get(column)
+            if index is not None:
+                if not append:
+                    positions = index[values[pos]]
+                    positions.remove(pos)
+                    if not positions:
+                        del index[values[pos]]
+                insort(index.setdefault(v, []), pos)
+            if append:
+                values.append(v)
+            else:
+                values[pos] = v
+        self._sorted = {}
+        self._last = None
+
+    def _column(self, column: str) -> list:
+        values = self._lower.get(column)
+        if values is None:
+            values = self._lower[column] = [str(r.get(column, "")).lower() for r in self.rows]
+        return values
+
+    def _hash_index(self, column: str) -> dict:
+        index = self._by_value.get(column)
+        if index is None:
+            index = self._by_value[column] = {}
+            for pos, v in enumerate(self._column(column)):
+                index.setdefault(v, []).append(pos)
+        return index
+
+    def _sorted_index(self, column: str, kind: str):
+        key = (column, kind)
+        index = self._sorted.get(key)
+        if index is None:
+            pairs = []
+            for pos, r in enumerate(self.rows):
+                v = r.get(column, "")
+                if kind == 'num':
+                    x, ok, null = parse_number(v)
+                    if ok and not null:
+                        pairs.append((x, pos))
+                else:
+                    t = parse_timestamp(str(v))
+                    if t != NO_TIME:
+                        pairs.append((t, pos))
+            pairs.sort()
+            index = self._sorted[key] = (array('d', [k for k, _ in pairs]), array('q', [p for _, p in pairs]))
+        return index
+
+    def _lookup(self, column: str, cond):
+        """用索引取出满足 cond 的全部位置（集合），不能走索引时返回 None。"""
+        kind = cond[0]
+        if kind == 'eq':
+            return set(self._hash_index(column).get(cond[1], ()))
+        if kind == 'or':
+            result = set()
+            for c in cond[1]:
+                part = self._lookup(column, c)
+                if part is None:
+                    return None
+                result |= part
+            return result
+        if kind == 'range' and cond[1] in ('num', 'time'):
+            _, typ, lo, hi = cond
+            keys, positions = self._sorted_index(column, typ)
+            if typ == 'time':
+                lo = None if lo is None else (lo, False)
+                hi = None if hi is None else (hi, False)
+            i = 0 if lo is None else (bisect_right if lo[1] else bisect_left)(keys, lo[0])
+            j = len(keys) if hi is None else (bisect_left if hi[1] else bisect_right)(keys, hi[0])
+            return set(positions[i:j])
+        return None
+
+    def filter(self, terms) -> list:
+        """返回满足 terms（[(列, 小写条件), ...]）的行，保持 rows 中的顺序。"""
+        terms = dict(terms)
+        previous = {}
+        candidates = None  # None 表示全部行
+        if self._last is not None and _narrows(terms, self._last[0]):
+            previous, candidates = self._last
+        for column, text in terms.items():
+            if previous.get(column) == text:
+                continue  # 上一次的结果已经满足这一列
+            cond = parse_term(text)
+            hits = self._lookup(column, cond) if candidates is None else None
+            if hits is not None:
+                candidates = sorted(hits)
+                continue
+            scan = range(len(self.rows)) if candidates is None else candidates
+            if cond[0] == 'sub':
+                values = self._column(column)
+                candidates = [i for i in scan if text in values[i]]
+            else:
+                check, rows = _row_check(cond), self.rows
+                candidates = [i for i in scan if check(str(rows[i].get(column, "")))]
+        if candidates is None:
+            candidates = range(len(self.rows))
+        self._last = (terms, candidates)
+        rows = self.rows
+        return [rows[i] for i in candidates]
@@ -0,0 +1,94 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from analytics import GROUP_COLUMNS, TIME_UNITS, RECORD_MEASURES, EVENT_MEASURES, FUNCS
+
+_NO_TIME = "不分时段"
+
+
+class GroupByDialog(tk.Toplevel):
+    """分组统计选项：分组列、时间段、汇总列。确定后 self.result 为统计选项，取消时为 None。"""
+
+    def __init__(self, parent, spec: dict | None = None):
+        super().__init__(parent)
+        self.title("分组统计")
+        self.resizable(False, False)
+        self.transient(parent)
+        self.grab_set()
+        self.result = None
+        self.spec = spec or {'group_cols': ['商品名称'], 'time_field': None, 'unit': 'month',
+                             'measures': ['结算价'], 'funcs': ['sum']}
+        self.create_widgets()
+        self.focus_set()
+
+    def create_widgets(self):
+        fr = ttk.Frame(self, padding=10)
+        fr.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(fr, text="分组列:").grid(row=0, column=0, sticky="ne", padx=5, pady=5)
+        cols_fr = ttk.Frame(fr)
+        cols_fr.grid(row=0, column=1, sticky="w", pady=5)
+        self.group_vars = {}
+        for c in GROUP_COLUMNS:
+            v = tk.BooleanVar(value=c in self.spec['group_cols'])
+            ttk.Checkbutton(cols_fr, text=c, variable=v).pack(side=tk.LEFT, padx=(0, 8))
+            self.group_vars[c] = v
+
+        ttk.Label(fr, text="时间段:").grid(row=1, column=0, sticky="e", padx=5, pady=5)
+        time_fr = ttk.Frame(fr)
+        time_fr.grid(row=1, column=1, sticky="w", pady=5)
+        self.cb_time = ttk.Combobox(time_fr, values=[_NO_TIME, "入库时间", "出库时间"], state="readonly", width=10)
+        self.cb_time.set(self.spec['time_field'] or _NO_TIME)
+        self.cb_time.pack(side=tk.LEFT)
+        self.cb_time.bind("<<ComboboxSelected>>", lambda e: self.fill_measures())
+        self.units = {label: unit for unit, label in TIME_UNITS.items()}
+        self.cb_unit = ttk.Combobox(time_fr, values=list(self.units), state="readonly", width=4)
+        self.cb_unit.set(TIME_UNITS[self.spec['unit']])
+        self.cb_unit.pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(fr, text="汇总列:").grid(row=2, column=0, sticky="ne", padx=5, pady=5)
+        self.lb_measures = tk.Listbox(fr, selectmode=tk.MULTIPLE, height=8, exportselection=False)
+        self.lb_measures.grid(row=2, column=1, sticky="we", pady=5)
+        self.fill_measures(self.spec['measures'])
+
+        ttk.Label(fr, text="汇总方式:").grid(row=3, column=0, sticky="e", padx=5, pady=5)
+        funcs_fr = ttk.Frame(fr)
+        funcs_fr.grid(row=3, column=1, sticky="w", pady=5)
+        self.func_vars = {}
+        for f, label in FUNCS.items():
+            v = tk.BooleanVar(value=f in self.spec['funcs'])
+            ttk.Checkbutton(funcs_fr, text=label, variable=v).pack(side=tk.LEFT, padx=(0, 8))
+            self.func_vars[f] = v
+        ttk.Label(funcs_fr, text="（始终显示条数）").pack(side=tk.LEFT)
+
+        btn_fr = ttk.Frame(fr)
+        btn_fr.grid(row=4, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(btn_fr, text="统计", command=self.on_ok).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_fr, text="取消", command=self.destroy).pack(side=tk.LEFT, padx=5)
+
+    def fill_measures(self, selected=None):
+        """按时间段列出可汇总的列：按出库时间统计时只有出库数量、出库金额。"""
+        if selected is None:
+            selected = [self.lb_measures.get(i) for i in self.lb_measures.curselection()]
+        measures = EVENT_MEASURES if self.cb_time.get() == "出库时间" else RECORD_MEASURES
+        self.lb_measures.delete(0, tk.END)
+        for i, m in enumerate(measures):
+            self.lb_measures.insert(tk.END, m)
+            if m in selected:
+                self.lb_measures.selection_set(i)
+
+    def on_ok(self):
+        group_cols = [c for c, v in self.group_vars.items() if v.get()]
+        time_field = self.cb_time.get()
+        time_field = None if time_field == _NO_TIME else time_field
+        if not group_cols and not time_field:
+            messagebox.showwarning("提示", "请至少选择一个分组列或时间段", parent=self)
+            return
+        self.result = {
+            'group_cols': group_cols,
+            'time_field': time_field,
+            'unit': self.units[self.cb_unit.get()],
+            'measures': [self.lb_measures.get(i) for i in self.lb_measures.curselection()],
+            'funcs': [f for f, v in self.func_vars.items() if v.get()],
+        }
+        self.destroy()
@@ -0,0 +1,85 @@
+"""
+分组汇总耗时报告：在合成数据上比较 analytics.group_by 的各汇总方式。
+
+  逐行累加：按分组编号逐行累加到各组（group_by 的实现）
+  分段求和：按分组编号排序后重排数组，每组一段用 sum(compress(...)) 求和
+  分组掩码：每组生成一个 0/1 掩码，用 NumericColumns.sum 求和
+
+用法：
+    python group_by_report.py [行数，默认 200000]
+"""
+import sys
+import random
+import time
+from array import array
+from collections import Counter
+from itertools import accumulate, compress
+
+from analytics import RECORD_MEASURES, _measure
+from memory_report import SUPPLIERS, PRODUCTS
+from numeric_columns import NumericColumns, mask_and
+
+
+def synthetic_rows(rows: int, seed: int = 1) -> list[dict]:
+    rnd = random.Random(seed)
+    return [{
+        '商品名称': rnd.choice(PRODUCTS),
+        '货商姓名': rnd.choice(SUPPLIERS),
+        '商品数量': str(rnd.randint(1, 5)),
+        '结算价': f"{rnd.uniform(10, 500):.2f}",
+        '行情价格': rnd.choice(["", f"{rnd.uniform(10, 500):.2f}"]),
+    } for _ in range(rows)]
+
+
+def by_loop(gids, n, values, ok):
+    sums, used = [0.0] * n, [0] * n
+    for g, v, good in zip(gids, values, ok):
+        if good:
+            sums[g] += v
+            used[g] += 1
+    return sums, used
+
+
+def by_segments(gids, n, values, ok):
+    order = sorted(range(len(gids)), key=gids.__getitem__)
+    counts = Counter(gids)
+    bounds = list(accumulate((counts[g] for g in range(n)), initial=0))
+    values = array('d', map(values.__getitem__, order))
+    ok = bytes(map(ok.__getitem__, order))
+    sums = [sum(compress(values[s:e], ok[s:e])) for s, e in zip(bounds, bounds[1:])]
+    used = [ok.count(1, s, e) for s, e in zip(bounds, bounds[1:])]
+    return sums, used
+
+
+def by_masks(gids, n, values, ok):
+    sums, used = [], []
+    for g in range(n):
+        where = mask_and(bytearray(map(g.__eq__, gids)), ok)
+        sums.append(sum(compress(values, where)))
+        used.append(where.count(1))
+    return sums, used
+
+
+METHODS = {'逐行累加': by_loop, '分段求和': by_segments, '分组掩码': by_masks}
+
+
+def main(rows: int, group_col: str = '货商姓名', measures=('结算价', '利润', '商品数量')):
+    """返回 {方式: (秒, 各列汇总结果)}。"""
+    data = synthetic_rows(rows)
+    numeric = NumericColumns(data)
+    keys = {}
+    gids = array('l', (keys.setdefault(r[group_col], len(keys)) for r in data))
+    columns = [_measure(numeric, c) for c in measures if c in RECORD_MEASURES]
+    results = {}
+    for name, method in METHODS.items():
+        start = time.perf_counter()
+        totals = [method(gids, len(keys), values, ok) for values, ok in columns]
+        results[name] = (time.perf_counter() - start, totals)
+    print(f"{rows} 行，按{group_col}分 {len(keys)} 组，汇总 {len(columns)} 列")
+    for name, (seconds, _) in results.items():
+        print(f"  {name}: {seconds * 1000:8.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -1,7 +1,8 @@
 import os
 import base64
+import queue
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox
 from inbound_view import InboundView
 from outbound_view import OutboundView
 from data_view import DataView
@@ -64,7 +65,47 @@ class InventoryMainView:
         nb.add(self.settings_page, text="设置")
         nb.add(self.update_page,   text="检查更新")
 
-        ttk.Button(self.root, text="退出", command=self.root.quit).pack(pady=5)
+        bottom = ttk.Frame(self.root)
+        bottom.pack(fill=tk.X)
+        # 后台写入状态
+        self.lbl_write_status = ttk.Label(bottom, text="")
+        self.lbl_write_status.pack(side=tk.LEFT, padx=10)
+        ttk.Button(bottom, text="退出", command=self.quit).pack(pady=5)
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+        self._write_error_shown = False
+        self._poll_write_status()
+
+    WRITE_STATUS_TEXT = {
+        'idle': "已保存",
+        'pending': "等待保存…",
+        'writing': "正在保存…",
+        'error': "保存失败，稍后自动重试",
+    }
+
+    def _poll_write_status(self):
+        """定时刷新写入状态；写入线程报告的错误在这里（主线程）提示，连续失败只提示一次。"""
+        status, _ = self.controller.write_status()
+        self.lbl_write_status.config(text=self.WRITE_STATUS_TEXT.get(status, ""),
+                                     foreground="red" if status == 'error' else "")
+        latest = None
+        while True:
+            try:
+                latest = self.controller.write_errors.get_nowait()
+            except queue.Empty:
+                break
+        if status == 'idle':
+            self._write_error_shown = False
+        elif latest and not self._write_error_shown:
+            self._write_error_shown = True
+            messagebox.showerror("保存失败", f"{latest}\n\n修改仍保留在内存中，程序会自动重试。")
+        self.root.after(500, self._poll_write_status)
+
+    def quit(self):
+        """退出前写入未落盘的修改，失败时询问是否仍要退出。"""
+        if not self.controller.flush_writes():
+            if not messagebox.askyesno("保存失败", "部分修改未能写入磁盘，仍然退出将丢失这些修改。\n是否仍要退出？"):
+                return
+        self.root.quit()
 
     def show_message(self, msg: str):
         from tkinter import messagebox
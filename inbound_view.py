@@ -3,6 +3,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from bulk_inbound_dialog import BulkInboundDialog
+from tree_rows import insert_row, ProgressiveLoader
 try:
     from tkcalendar import DateEntry
 except ImportError:
@@ -20,6 +21,7 @@ class InboundView(ttk.Frame):
         super().__init__(parent, padding=10)
         self.controller = controller
         self.create_widgets()
+        self._loader = ProgressiveLoader(self.tree)
         self.update_supplier_list(self.controller.settings_model.get_suppliers())
         self.refresh_list()
         self.update_preview()
@@ -274,33 +276,71 @@ class InboundView(ttk.Frame):
             messagebox.showinfo("提示", "入库登记成功！")
             self.clear_form_defaults()
             self.update_preview()
-            self.refresh_list()
         else:
             messagebox.showerror("错误", "入库登记失败！")
 
+    def _display_columns(self):
+        display_cols = self.controller.settings_model.get_display_columns('inbound')
+        if not display_cols:
+            display_cols = ["入库快递单号", "货商姓名", "商品名称", "商品数量", "入库时间", "颜色/配置"]
+        return display_cols
+
     def refresh_list(self):
         recs = self.controller.model.get_all_records()
         
         # 获取当前显示的列
-        display_cols = self.controller.settings_model.get_display_columns('inbound')
-        if not display_cols:
-            display_cols = ["入库快递单号", "货商姓名", "商品名称", "商品数量", "入库时间", "颜色/配置"]
+        display_cols = self._display_columns()
         
-        # 统计重复快递单号
-        counts = {}
-        for r in recs:
-            key = r.get("入库快递单号", "")
-            counts[key] = counts.get(key, 0) + 1
+        # 统计重复快递单号（走入库快递单号索引），增量更新时在此基础上加减
+        counts = self.controller.model.count_by("入库快递单号")
+        self._courier_counts = counts
 
-        self.tree.delete(*self.tree.get_children())
-        for r in reversed(recs):
-            # 根据配置的列构建显示数据
-            vals = []
-            for col in display_cols:
-                vals.append(r.get(col, ""))
-            
+        def insert(r):
+            # 根据配置的列构建显示数据，单号作为行的 iid
+            vals = tuple(r.get(col, "") for col in display_cols)
             tag = ('duplicate',) if counts.get(r.get("入库快递单号",""), 0) > 1 else ()
-            self.tree.insert("", tk.END, values=tuple(vals), tags=tag)
+            insert_row(self.tree, tk.END, r.get("单号", ""), vals, tag)
+        # 第一屏立即显示，其余行在事件循环空闲时分批插入
+        self._loader.start(reversed(recs), insert)
+
+    def apply_changes(self, changes):
+        """
+        按记录级变更修补列表：新记录插到最前，修改、删除只处理对应单号的行，
+        其余行不重绘，滚动位置和选中行保持不变。
+        """
+        # 分批加载尚未完成时先插完，避免按单号修补时找不到行
+        self._loader.finish()
+        display_cols = self._display_columns()
+        counts = self._courier_counts
+        touched = {}   # 受影响的入库快递单号 → 变更前的条数
+        for c in changes:
+            for r, delta in ((c.old, -1), (c.new, 1)):
+                if r is not None:
+                    key = r.get("入库快递单号", "")
+                    touched.setdefault(key, counts.get(key, 0))
+                    counts[key] = counts.get(key, 0) + delta
+            if c.kind == 'deleted':
+                if self.tree.exists(c.order):
+                    self.tree.delete(c.order)
+                continue
+            vals = tuple(c.new.get(col, "") for col in display_cols)
+            if self.tree.exists(c.order):
+                self.tree.item(c.order, values=vals)
+            else:
+                insert_row(self.tree, 0, c.order, vals)
+
+        # 重复标记：条数跨过 1 的快递单号重新标记其全部行，其余只标记本次变更的行
+        model = self.controller.model
+        for key, before in touched.items():
+            dup = counts.get(key, 0) > 1
+            if (before > 1) != dup:
+                rows = [r.get("单号", "") for r in model.find_by("入库快递单号", key)]
+            else:
+                rows = [c.order for c in changes
+                        if c.new is not None and c.new.get("入库快递单号", "") == key]
+            for order in rows:
+                if self.tree.exists(order):
+                    self.tree.item(order, tags=('duplicate',) if dup else ())
 
     def update_supplier_list(self, suppliers):
         self.cb_sup['values'] = suppliers
@@ -357,5 +397,4 @@ class InboundView(ttk.Frame):
         dialog = BulkInboundDialog(self.winfo_toplevel(), self.controller, initial_courier=init_courier)
         # 等待对话框关闭后刷新列表
         self.wait_window(dialog)
-        self.refresh_list()
         self.update_preview()
@@ -0,0 +1,95 @@
+import os
+import json
+import time
+
+
+class ChangeJournal:
+    """
+    数据表的追加式变更日志（data/<表名>.journal）。
+
+    每行一条 JSON 变更：
+        {"op": "add", "rec": {...}}               新增记录
+        {"op": "set", "id": 单号, "fields": {...}} 修改字段
+        {"op": "del", "id": 单号}                  删除记录
+    所有变更都可以重复回放，压缩过程中崩溃也不会造成数据错乱。
+    压缩时先把日志轮换为 <表名>.journal.compacting，再把完整数据写回 CSV。
+    """
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self.path = os.path.splitext(csv_path)[0] + ".journal"
+        self.compacting_path = self.path + ".compacting"
+        self.started = None
+
+    def paths(self) -> tuple:
+        return (self.compacting_path, self.path)
+
+    def size(self) -> int:
+        total = 0
+        for p in self.paths():
+            try:
+                total += os.path.getsize(p)
+            except OSError:
+                pass
+        return total
+
+    def age(self) -> float:
+        """返回最早一条未压缩变更距今的秒数，没有变更时返回 0。"""
+        if self.started is None:
+            # 程序启动时遗留的日志：以文件修改时间近似
+            try:
+                st = os.stat(self.path)
+                if st.st_size:
+                    self.started = st.st_mtime
+            except OSError:
+                pass
+        return time.time() - self.started if self.started is not None else 0.0
+
+    def append(self, ops: list[dict]):
+        """把一组变更追加写入日志并刷到磁盘。"""
+        data = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if self.started is None:
+            self.started = time.time()
+
+    def read(self):
+        """按顺序产出所有未压缩的变更；末尾写了一半的行会被忽略。"""
+        for p in self.paths():
+            if not os.path.exists(p):
+                continue
+            with open(p, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def rotate(self):
+        """把当前日志并入 .compacting 文件，之后的新变更写入新的空日志。"""
+        if not os.path.exists(self.path):
+            return
+        if os.path.exists(self.compacting_path):
+            with open(self.path, "r", encoding="utf-8") as src, \
+                    open(self.compacting_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.compacting_path)
+        self.started = None
+
+    def finish_compaction(self):
+        """CSV 已包含全部轮换出的变更后调用，删除 .compacting 文件。"""
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+
+    def rename(self, new_csv_path: str):
+        new = ChangeJournal(new_csv_path)
+        for old_p, new_p in zip(self.paths(), new.paths()):
+            if os.path.exists(old_p) and not os.path.exists(new_p):
+                os.rename(old_p, new_p)
@@ -1,7 +1,10 @@
 import sys
+import multiprocessing
+from datetime import datetime, timedelta
 from tkinter import Tk
 
 from model import InventoryModel
+from sqlite_model import SQLiteInventoryModel
 from settings_model import SettingsModel
 from controller import InventoryController
 from gui_view import InventoryMainView
@@ -11,7 +14,21 @@ def main():
     # 应用初始化
     settings_model = SettingsModel()
     active_table = settings_model.get_active_table()
-    model = InventoryModel(active_table)
+    storage = settings_model.get_storage_settings()
+    if storage['backend'] == 'sqlite':
+        model = SQLiteInventoryModel(active_table)
+    else:
+        model = InventoryModel(
+            active_table,
+            journal_mode=storage['journal_mode'],
+            journal_max_bytes=storage['journal_max_bytes'],
+            journal_max_age=storage['journal_max_age'],
+            async_writes=storage['async_writes']
+        )
+        # 启动时把早已关闭的记录移入归档分区，保持主表精简
+        if storage['archive_after_days']:
+            before = datetime.now() - timedelta(days=storage['archive_after_days'])
+            model.archive_closed_records(before.strftime("%Y-%m-%d"))
     
     # 创建根窗口并传递给控制器和视图
     controller = InventoryController(model, settings_model)
@@ -26,8 +43,13 @@ def main():
     # 启动主界面
     view.start()
 
+    # 退出前把未合并的变更日志写回 CSV（数据库模式下合并 WAL）
+    controller.model.close()
+
     # 确保主界面关闭后进程退出
     sys.exit(0)
 
 if __name__ == "__main__":
+    # 打包为 exe 后，跨表汇总的子进程从这里启动
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
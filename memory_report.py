@@ -0,0 +1,80 @@
+"""
+内存占用报告：生成一张合成的库存表，比较逐行 dict 与紧凑记录（InventoryRecord）加载后的内存。
+
+用法：
+    python memory_report.py [行数，默认 100000]
+"""
+import os
+import sys
+import csv
+import random
+import tempfile
+import tracemalloc
+
+from model import InventoryModel
+
+SUPPLIERS = [f"货商{i}" for i in range(40)]
+PRODUCTS = [f"商品{i}" for i in range(300)]
+COLORS = ["黑色", "白色", "蓝色", "红色", "银色", "金色"]
+STATUSES = ["未出库", "部分出库", "全部出库", "卖出"]
+COUNTERS = ["", "档口A", "档口B", "档口C"]
+
+
+def write_synthetic_table(path: str, rows: int, seed: int = 1):
+    rnd = random.Random(seed)
+    with open(path, 'w', newline='', encoding="gb2312") as f:
+        writer = csv.DictWriter(f, fieldnames=InventoryModel.CSV_HEADER)
+        writer.writeheader()
+        for i in range(rows):
+            day = f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+            qty = rnd.randint(1, 5)
+            settle = rnd.randint(100, 5000)
+            writer.writerow({
+                '单号': f"{1700000000000 + i}00001", '货商姓名': rnd.choice(SUPPLIERS),
+                '入库时间': f"{day} {rnd.randint(8, 20):02d}:{rnd.randint(0, 59):02d}:00",
+                '数字条码': str(6900000000000 + rnd.randint(0, 99999)), '商品名称': rnd.choice(PRODUCTS),
+                '商品数量': str(qty), '结算日期': day, '入库快递单号': f"SF{rnd.randint(10**9, 10**10)}",
+                '货源': "线上", '颜色/配置': rnd.choice(COLORS), '买价': str(settle - 20), '佣金': "20",
+                '结算价': str(settle), '单价': f"{settle / qty:.2f}", '剩余数量': str(qty),
+                '剩余价值': str(settle), '行情价格': str(settle + rnd.randint(-100, 300)),
+                '结算状态': rnd.choice(["是", "否"]), '出库状态': rnd.choice(STATUSES),
+                '出库档口': rnd.choice(COUNTERS), '快递单号': '', '快递价格': '', '利润': '', '备注': '',
+                '出库记录': '',
+            })
+
+
+def measure(load) -> tuple[int, object]:
+    """返回 load() 的结果仍被引用时新增的内存（字节）。"""
+    tracemalloc.start()
+    result = load()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def main(rows: int = 100000):
+    data_dir = tempfile.mkdtemp()
+    path = os.path.join(data_dir, "synthetic.csv")
+    write_synthetic_table(path, rows)
+
+    def load_dicts():
+        with open(path, 'r', newline='', encoding="gb2312") as f:
+            return list(csv.DictReader(f))
+
+    def load_records():
+        model = InventoryModel.__new__(InventoryModel)
+        model.filename, model.read_only = path, False
+        return model._read_csv()
+
+    before, dicts = measure(load_dicts)
+    del dicts
+    after, records = measure(load_records)
+    print(f"{rows} 行合成数据（{os.path.getsize(path) / 1024 / 1024:.1f} MB CSV）")
+    print(f"  dict 记录:   {before / 1024 / 1024:8.1f} MB（每行 {before / rows:.0f} 字节）")
+    print(f"  紧凑记录:    {after / 1024 / 1024:8.1f} MB（每行 {after / rows:.0f} 字节）")
+    print(f"  节省:        {(1 - after / before) * 100:8.1f}%")
+    return before, after
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
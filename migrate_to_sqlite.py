@@ -0,0 +1,52 @@
+"""
+一次性迁移工具：把 SettingsModel.get_tables() 中列出的每张 CSV 表导入 SQLite 数据库。
+
+用法：
+    python migrate_to_sqlite.py [数据库路径]
+
+迁移完成后把 config/settings.json 中 storage.backend 设为 "sqlite" 即可切换到数据库存储。
+重复执行会用 CSV 中的数据覆盖数据库里的同名表。
+SQLite 存储没有归档分区：data/<表名>/archive/ 中已归档的记录一并导入主表，不会丢失。
+"""
+import csv
+import sys
+from model import InventoryModel
+from settings_model import SettingsModel
+from sqlite_model import SQLiteInventoryModel
+
+
+def migrate_all_tables(settings_model: SettingsModel | None = None, db_path: str | None = None) -> dict:
+    """导入所有数据表，返回 {表名: 导入条数}；导入失败的表条数记为 -1。"""
+    settings_model = settings_model or SettingsModel()
+    storage = settings_model.get_storage_settings()
+    tables = settings_model.get_tables()
+    result = {}
+    target = SQLiteInventoryModel(tables[0] if tables else "default", db_path=db_path)
+    try:
+        for table in tables:
+            # 日志模式下先回放未合并的变更，保证导入的是最新数据
+            source = InventoryModel(table, journal_mode=storage['journal_mode'])
+            # 出库事件包含旧版“出库记录”列解析出的事件；源 CSV 保持不变，导入的记录中清空该列
+            events = source.outbound_events()
+            records = [dict(r, 出库记录='') for r in source.get_all_records()]
+            try:
+                # 归档分区中的记录追加在后面（按月份顺序）
+                records += [dict(r, 出库记录='') for r in source.archive.iter_range(None, None)]
+            except (OSError, ValueError, csv.Error):
+                # 归档读不出来时不导入这张表，避免切换后丢失归档记录
+                result[table] = -1
+                continue
+            finally:
+                source.close()
+            target.set_table(table)
+            result[table] = len(records) if target.replace_table_records(records, events) else -1
+    finally:
+        target.close()
+    return result
+
+
+if __name__ == "__main__":
+    counts = migrate_all_tables(db_path=sys.argv[1] if len(sys.argv) > 1 else None)
+    for name, count in counts.items():
+        status = f"{count} 条" if count >= 0 else "失败"
+        print(f"{name}: {status}")
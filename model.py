@@ -1,8 +1,20 @@
 import os
 import sys
 import csv
+import time
 import tempfile
+import bisect
+import threading
 import traceback
+from journal import ChangeJournal
+from numeric_columns import NumericColumns, mask_and
+from time_index import TimeIndex
+from outbound_events import OutboundEventStore, parse_legacy_outbound, format_outbound_events
+from archive import ArchiveStore, is_closed, record_date
+from write_queue import WriteQueue
+from record import Record
+from change_events import ChangeBus, RecordChange, RESET
+from aggregates import TableAggregates
 
 class InventoryModel:
     # CSV 文件的表头
@@ -33,8 +45,11 @@ class InventoryModel:
         '备注',
         '出库记录'
     ]
+    # 建有二级索引的列，find_by / count_by 查询这些列时不必扫描全表
+    INDEXED_COLUMNS = ['快递单号', '入库快递单号', '货商姓名', '数字条码', '商品名称']
 
-    def __init__(self, table_name="default"):
+    def __init__(self, table_name="default", journal_mode=False,
+                 journal_max_bytes=1024 * 1024, journal_max_age=300, async_writes=False, read_only=False):
         # 确定程序所在目录
         if getattr(sys, 'frozen', False):
             base = os.path.dirname(sys.executable)
@@ -42,10 +57,45 @@ class InventoryModel:
             base = os.path.dirname(__file__)
         # 在基础目录下创建 data 文件夹
         self.data_dir = os.path.join(base, 'data')
-        os.makedirs(self.data_dir, exist_ok=True)
+        # 只读：不创建数据表、不合并变更日志、不保存汇总，修改方法在写任何文件之前失败（供其他进程并发读取）
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(self.data_dir, exist_ok=True)
+        # 内存中的记录缓存及其对应的文件签名（大小、修改时间、inode）
+        self._records = None
+        self._signature = None
+        # 单号 → 记录位置 的主键索引；重复单号只索引第一条
+        self._index = {}
+        self._duplicate_orders = set()
+        # 二级索引：列名 → {值: 按位置升序排列的记录位置列表}
+        self._secondary = {col: {} for col in self.INDEXED_COLUMNS}
+        # 金额/数量列的列式副本，与缓存按位置对应
+        self._numeric = NumericColumns()
+        # 按入库时间排序的索引，日期范围查询和默认的时间倒序不再逐行解析日期
+        self._by_time = TimeIndex()
+        # 缓存中是否还有旧版“出库记录”字符串需要导入出库事件
+        self._legacy_outbound = False
+        # 日志模式：修改追加到 data/<表名>.journal，超过大小/时长阈值后在后台合并回 CSV
+        self.journal_mode = journal_mode
+        self.journal_max_bytes = journal_max_bytes
+        self.journal_max_age = journal_max_age
+        self.journal = None
+        self._compactor = None
+        self._lock = threading.RLock()
+        self.last_error = ""
+        # 异步写入：修改先作用于内存缓存，由后台写入线程合并后落盘；
+        # 写入失败时在写入线程中调用 on_write_error(错误信息)
+        self.on_write_error = None
+        self.writer = WriteQueue(self._flush_pending, on_error=self._write_failed) if async_writes else None
+        # 记录级变更通知：界面据此按单号修补受影响的行
+        self.changes = ChangeBus()
+        # 缓存重新解析文件（外部修改、切换表等）的次数；变化时界面应整体重绘
+        self.generation = 0
+        # 统计查询用的物化汇总，随记录级变更按差量更新
+        self._aggregates = None
+        self.changes.subscribe(self._update_aggregates)
         # 设置当前表
         self.set_table(table_name)
-        self.last_error = ""
 
     def _record_error(self, context: str, e: Exception, extra: dict | None = None):
         try:
@@ -65,13 +115,426 @@ class InventoryModel:
         except:
             self.last_error = f"{context}: {type(e).__name__}: {e}"
 
+    def _log(self, message: str):
+        """在 diagnostic.log 中记录一次维护操作（迁移、备份等）。"""
+        try:
+            with open(os.path.join(self.data_dir, "diagnostic.log"), "a", encoding="utf-8") as lf:
+                lf.write(f"[maintenance] {time.strftime('%Y-%m-%d %H:%M:%S')} file={self.filename} | {message}\n")
+        except OSError:
+            pass
+
     def set_table(self, table_name: str):
         """
         切换使用的表（CSV 文件），并确保文件存在。
         """
-        self.table_name = table_name
-        self.filename = os.path.join(self.data_dir, f"{table_name}.csv")
-        self.initialize_csv()
+        if self.journal is not None or self.writer is not None or self._aggregates is not None:
+            self.close()
+        with self._lock:
+            self.table_name = table_name
+            self.filename = os.path.join(self.data_dir, f"{table_name}.csv")
+            self.invalidate_cache()
+            if not self.read_only:
+                self.initialize_csv()
+            self.outbound = OutboundEventStore(self.filename)
+            self.archive = ArchiveStore(self.data_dir, table_name, self.CSV_HEADER)
+            self._aggregates = TableAggregates(self.filename)
+            journal = ChangeJournal(self.filename)
+            # 只读时总是在内存中回放未合并的变更
+            self.journal = journal if self.journal_mode or self.read_only else None
+            if not self.journal_mode and not self.read_only and journal.size():
+                # 关闭日志模式前遗留的变更：先合并回 CSV，避免丢失
+                self.journal = journal
+                self.compact()
+                self.journal = None
+        self.changes.emit([RESET])
+
+    # -------- 记录缓存 --------
+    def _file_signature(self):
+        """
+        返回 CSV（日志模式下还包括变更日志）的 (大小, 修改时间, inode)，
+        不存在的文件记为 None。
+        """
+        paths = (self.filename,) + (self.journal.paths() if self.journal else ())
+        signature = []
+        for p in paths:
+            try:
+                st = os.stat(p)
+            except OSError:
+                signature.append(None)
+                continue
+            signature.append((st.st_size, st.st_mtime_ns, st.st_ino))
+        return tuple(signature)
+
+    def invalidate_cache(self):
+        """丢弃内存缓存，下次读取时重新解析 CSV。"""
+        self._records = None
+        self._signature = None
+        self._index = {}
+        self._duplicate_orders = set()
+        self._secondary = {col: {} for col in self.INDEXED_COLUMNS}
+        self._numeric = NumericColumns()
+        self._by_time = TimeIndex()
+
+    def _adopt(self, records: list[dict]):
+        """以 records 作为新的缓存列表，其中的 dict 转换为紧凑记录。"""
+        if records is not self._records:
+            for i, r in enumerate(records):
+                if type(r) is not InventoryRecord:
+                    records[i] = InventoryRecord.from_mapping(r)
+            self._records = records
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        """根据当前缓存重建单号索引、二级索引、列式数值和入库时间索引。"""
+        index = {}
+        duplicates = set()
+        secondary = {col: {} for col in self.INDEXED_COLUMNS}
+        for pos, r in enumerate(self._records or []):
+            order = r.get('单号', '')
+            if order in index:
+                duplicates.add(order)
+            else:
+                index[order] = pos
+            for col, buckets in secondary.items():
+                buckets.setdefault(r.get(col, ''), []).append(pos)
+        self._index = index
+        self._duplicate_orders = duplicates
+        self._secondary = secondary
+        self._numeric = NumericColumns(self._records or [])
+        self._by_time = TimeIndex(self._records or [])
+        self._legacy_outbound = any(self._records[pos].get('出库记录') for pos in index.values())
+
+    def _index_add(self, pos: int, record: dict):
+        for col, buckets in self._secondary.items():
+            bucket = buckets.setdefault(record.get(col, ''), [])
+            if not bucket or bucket[-1] < pos:
+                bucket.append(pos)
+            else:
+                bisect.insort(bucket, pos)
+
+    def _index_discard(self, pos: int, record: dict):
+        for col, buckets in self._secondary.items():
+            value = record.get(col, '')
+            bucket = buckets.get(value)
+            if not bucket:
+                continue
+            i = bisect.bisect_left(bucket, pos)
+            if i < len(bucket) and bucket[i] == pos:
+                del bucket[i]
+                if not bucket:
+                    del buckets[value]
+
+    def _append(self, record: dict):
+        """把记录追加到缓存末尾，同步更新单号索引和二级索引。"""
+        record = InventoryRecord.from_mapping(record)
+        self._records.append(record)
+        pos = len(self._records) - 1
+        order = record.get('单号', '')
+        if order in self._index:
+            self._duplicate_orders.add(order)
+        else:
+            self._index[order] = pos
+            if record.get('出库记录'):
+                self._legacy_outbound = True
+        self._index_add(pos, record)
+        self._numeric.append(record)
+        self._by_time.add(pos, record)
+
+    def _pop(self):
+        """撤销最后一次 _append。"""
+        record = self._records.pop()
+        pos = len(self._records)
+        order = record.get('单号', '')
+        if self._index.get(order) == pos:
+            del self._index[order]
+        self._index_discard(pos, record)
+        self._numeric.pop()
+        self._by_time.discard(pos, record)
+
+    def _put(self, pos: int, record: dict) -> dict:
+        """把缓存中 pos 处的记录替换为 record，同步更新索引，返回原记录。"""
+        record = InventoryRecord.from_mapping(record)
+        old = self._records[pos]
+        self._records[pos] = record
+        if old.get('单号') != record.get('单号'):
+            self._rebuild_index()
+        else:
+            self._index_discard(pos, old)
+            self._index_add(pos, record)
+            self._numeric.set(pos, record)
+            if old.get('入库时间') != record.get('入库时间'):
+                self._by_time.discard(pos, old)
+                self._by_time.add(pos, record)
+            if record.get('出库记录'):
+                self._legacy_outbound = True
+        return old
+
+    def _cache_is_current(self) -> bool:
+        if self._records is None:
+            return False
+        # 还有未落盘的异步修改时，内存缓存比文件新，不能重新读取
+        if self.writer is not None and self.writer.has_pending():
+            return True
+        return self._signature == self._file_signature()
+
+    def _normalize_record(self, record: dict) -> dict:
+        """按表头整理记录，使缓存内容与写入磁盘后再读回的结果一致。"""
+        return {k: '' if record.get(k) is None else str(record.get(k)) for k in self.CSV_HEADER}
+
+    def _check_encoding(self, values: dict):
+        """确认所有值都能以 gb2312 写入 CSV，否则抛出 UnicodeEncodeError。"""
+        for v in values.values():
+            str(v).encode("gb2312")
+
+    def _load_records(self) -> list[dict]:
+        """
+        返回权威的内存记录列表；仅当文件的大小、修改时间或 inode 变化时才重新解析 CSV。
+        调用方不得修改返回列表中的记录。
+        """
+        with self._lock:
+            if self._cache_is_current():
+                return self._records
+            signature = self._file_signature()
+            self._records = self._read_csv()
+            self.generation += 1
+            self._rebuild_index()
+            if self.journal is not None:
+                self._replay_journal()
+            self._signature = signature
+            # 汇总只有与刚读取的文件一致时才继续使用
+            if not self._aggregates.matches(signature):
+                self._aggregates.clear()
+            return self._records
+
+    def _replay_journal(self):
+        """把变更日志中尚未合并的修改依次应用到缓存上。"""
+        records = self._records
+        for op in self.journal.read():
+            kind = op.get('op')
+            if kind == 'add':
+                rec = self._normalize_record(op.get('rec', {}))
+                pos = self._index.get(rec['单号'])
+                if pos is None:
+                    self._append(rec)
+                else:
+                    self._put(pos, rec)
+            elif kind == 'set':
+                fields = op.get('fields', {})
+                pos = self._index.get(op.get('id'))
+                if pos is None and '单号' in fields:
+                    pos = self._index.get(fields['单号'])
+                if pos is None:
+                    continue
+                new = dict(records[pos])
+                new.update(fields)
+                self._put(pos, new)
+            elif kind == 'del':
+                order = op.get('id')
+                if order not in self._index:
+                    continue
+                records[:] = [r for r in records if r.get('单号') != order]
+                self._rebuild_index()
+
+    def _read_csv(self) -> list[dict]:
+        """把 CSV 解析为紧凑记录列表，取值重复的列共用同一个字符串对象。"""
+        if self.read_only and not os.path.exists(self.filename):
+            return []
+        with open(self.filename, 'r', newline='', encoding="gb2312") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return []
+            load = InventoryRecord.loader(header)
+            records = [load(row) for row in reader if row]
+        if '结算日期' not in header:
+            # 旧表没有“结算日期”列：取入库时间的日期部分
+            records = [r.updated({'结算日期': r['入库时间'].split(' ')[0]}) for r in records]
+        return records
+
+    def _write_temp(self, records: list[dict]) -> str:
+        """把整张表写入数据目录下的临时文件，返回临时文件路径。"""
+        temp_file = tempfile.NamedTemporaryFile(
+            "w", newline="", encoding="gb2312", delete=False, dir=self.data_dir
+        )
+        try:
+            writer = csv.writer(temp_file)
+            writer.writerow(self.CSV_HEADER)
+            writer.writerows(InventoryRecord.from_mapping(r).as_tuple() for r in records)
+        except Exception:
+            temp_file.close()
+            os.remove(temp_file.name)
+            raise
+        temp_file.close()
+        return temp_file.name
+
+    def _replace_file(self, temp_name: str, target: str) -> bool:
+        """用临时文件原子地替换目标文件，并清理残留的临时文件。"""
+        try:
+            try:
+                os.replace(temp_name, target)
+            except PermissionError as pe:
+                self._record_error("替换CSV文件时权限错误", pe, {"temp": temp_name, "target": target})
+                return False
+        finally:
+            if os.path.exists(temp_name) and temp_name != target:
+                try:
+                    os.remove(temp_name)
+                except Exception as rm_err:
+                    self._record_error("清理临时文件失败", rm_err, {"temp": temp_name})
+        return True
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"只读打开的数据表不能修改: {self.filename}")
+
+    def _write_all(self, records: list[dict]) -> bool:
+        """
+        通过临时文件 + os.replace 原子地重写整张表，成功后同步缓存签名。
+        """
+        self._check_writable()
+        temp_name = self._write_temp(records)
+        if not self._replace_file(temp_name, self.filename):
+            return False
+        self._adopt(records)
+        self._signature = self._file_signature()
+        return True
+
+    def _save(self, records: list[dict], ops: list[dict]) -> bool:
+        """
+        持久化一次修改：日志模式下只追加 ops 描述的变更，否则整表重写 records。
+        """
+        self._check_writable()
+        if self.writer is not None:
+            # 异步写入：先检查编码并更新缓存，写入线程随后合并落盘
+            for op in ops:
+                self._check_encoding(op.get('rec') or op.get('fields') or {})
+            self._adopt(records)
+            self.writer.submit(ops)
+            return True
+        if self.journal is None:
+            return self._write_all(records)
+        try:
+            for op in ops:
+                self._check_encoding(op.get('rec') or op.get('fields') or {})
+            self.journal.append(ops)
+        except Exception as e:
+            self._record_error("写入变更日志时发生错误", e, {"journal": self.journal.path})
+            return False
+        self._adopt(records)
+        self._signature = self._file_signature()
+        self._maybe_compact()
+        return True
+
+    def _publish(self, changes: list):
+        """
+        通知记录级变更：修改了单号的记录拆成删除旧单号、新增新单号；
+        涉及重复单号时改为通知整表变化（这些记录无法按单号定位）。
+        """
+        split = []
+        for c in changes:
+            if c.kind == 'updated' and c.new.get('单号') != c.order:
+                split.append(RecordChange('deleted', c.order, c.old, None))
+                split.append(RecordChange('inserted', c.new.get('单号', ''), None, c.new))
+            else:
+                split.append(c)
+        changes = split
+        if any(c.order in self._duplicate_orders for c in changes):
+            changes = [RESET]
+        self.changes.emit(changes)
+
+    # -------- 异步写入 --------
+    def _flush_pending(self, ops: list[dict]):
+        """
+        写入线程调用：日志模式下追加合并后的 ops，否则把缓存的最新快照整表写入 CSV。
+        只在替换文件、更新签名时持有锁，慢速的写临时文件在锁外进行。失败时抛出异常。
+        """
+        if self.journal is not None:
+            for op in ops:
+                self._check_encoding(op.get('rec') or op.get('fields') or {})
+            self.journal.append(ops)
+            with self._lock:
+                self._signature = self._file_signature()
+            self._maybe_compact()
+            return
+        with self._lock:
+            records = list(self._records or [])
+            target = self.filename
+        temp_name = self._write_temp(records)
+        with self._lock:
+            if not self._replace_file(temp_name, target):
+                raise OSError(self.last_error)
+            if target == self.filename:
+                self._signature = self._file_signature()
+
+    def _write_failed(self, e: Exception):
+        self._record_error("后台写入失败，修改仍保留在内存中，稍后自动重试", e, {"target": self.filename})
+        if self.on_write_error is not None:
+            self.on_write_error(self.last_error)
+
+    def flush(self) -> bool:
+        """立即写入所有未落盘的异步修改，返回是否成功；未启用异步写入时直接返回 True。"""
+        return self.writer.flush() if self.writer is not None else True
+
+    def write_status(self) -> tuple[str, str]:
+        """返回 (状态, 错误信息)，状态为 idle / pending / writing / error。"""
+        if self.writer is None:
+            return 'idle', ''
+        return self.writer.status, self.writer.error
+
+    # -------- 日志合并 --------
+    def _maybe_compact(self):
+        """变更日志超过大小或时长阈值时，在后台线程中合并回 CSV。"""
+        if self.journal is None or (self._compactor and self._compactor.is_alive()):
+            return
+        if self.journal.size() < self.journal_max_bytes and self.journal.age() < self.journal_max_age:
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def compact(self) -> bool:
+        """
+        把变更日志合并回 CSV。先在锁内取快照并轮换日志，
+        再在锁外写临时文件，最后在锁内替换 CSV 并删除已合并的日志。
+        """
+        journal = self.journal
+        if journal is None or self.read_only:
+            return True
+        with self._lock:
+            if journal is not self.journal or not journal.size():
+                return True
+            try:
+                records = list(self._load_records())
+                journal.rotate()
+                self._signature = self._file_signature()
+            except Exception as e:
+                self._record_error("合并变更日志时发生错误", e, {"journal": journal.path})
+                return False
+        try:
+            temp_name = self._write_temp(records)
+        except Exception as e:
+            self._record_error("合并变更日志时发生错误", e, {"target": journal.csv_path})
+            return False
+        with self._lock:
+            was_current = journal is self.journal and self._cache_is_current()
+            if not self._replace_file(temp_name, journal.csv_path):
+                return False
+            journal.finish_compaction()
+            if was_current:
+                self._signature = self._file_signature()
+        return True
+
+    def close(self):
+        """写入未落盘的异步修改，等待后台合并结束，并把剩余的变更日志同步合并回 CSV。"""
+        if self.writer is not None:
+            self.writer.close()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        if self.journal is not None and self.journal.size():
+            self.compact()
+        if self._aggregates is not None and self._aggregates.valid and self._aggregates.key is None:
+            with self._lock:
+                self._save_aggregates()
 
     def initialize_csv(self):
         """
@@ -86,13 +549,80 @@ class InventoryModel:
         """
         追加一条记录到当前 CSV 表。
         """
+        return self.add_records([record])
+
+    def add_records(self, records: list[dict]) -> bool:
+        """
+        一次性追加多条记录：普通模式下只打开一次 CSV 追加写入，日志模式下只追加一次日志。
+        写入前先检查全部记录的编码，任何一条无法写入时整批不写。
+        """
+        if not records:
+            return True
         try:
-            with open(self.filename, 'a', newline='', encoding="gb2312") as f:
-                writer = csv.DictWriter(f, fieldnames=self.CSV_HEADER)
-                writer.writerow(record)
+            self._check_writable()
+            with self._lock:
+                cached = self._cache_is_current()
+                new_records = [self._normalize_record(r) for r in records]
+                for new in new_records:
+                    self._check_encoding(new)
+                ops = [{'op': 'add', 'rec': new} for new in new_records]
+                if self.writer is not None and self.journal is None:
+                    # 异步写入：直接追加到缓存，由写入线程整表写入
+                    records = self._load_records()
+                    start = len(records)
+                    for new in new_records:
+                        self._append(new)
+                    if not self._save(records, ops):
+                        return False
+                    self._publish([RecordChange('inserted', r['单号'], None, r) for r in records[start:]])
+                    return True
+                if self.journal is not None and not cached and self.writer is None:
+                    # 缓存未加载时只追加日志，下次读取时回放
+                    self.journal.append(ops)
+                    self._maybe_compact()
+                    self.changes.emit([RecordChange('inserted', new['单号'], None, InventoryRecord.from_mapping(new))
+                                       for new in new_records])
+                    return True
+                if self.journal is not None:
+                    # 日志模式下同一单号重复新增视为覆盖，与回放结果保持一致
+                    self._load_records()
+                    undo = []
+                    for new in new_records:
+                        pos = self._index.get(new['单号'])
+                        if pos is None:
+                            self._append(new)
+                            undo.append((None, None))
+                        else:
+                            undo.append((pos, self._put(pos, new)))
+                    if not self._save(self._records, ops):
+                        for pos, old in reversed(undo):
+                            if pos is None:
+                                self._pop()
+                            else:
+                                self._put(pos, old)
+                        return False
+                    changes = []
+                    for new, (pos, old) in zip(new_records, undo):
+                        r = self._records[self._index[new['单号']]]
+                        changes.append(RecordChange('inserted' if pos is None else 'updated', new['单号'], old, r))
+                    self._publish(changes)
+                    return True
+                with open(self.filename, 'a', newline='', encoding="gb2312") as f:
+                    writer = csv.DictWriter(f, fieldnames=self.CSV_HEADER)
+                    writer.writerows(new_records)
+                if cached:
+                    start = len(self._records)
+                    for new in new_records:
+                        self._append(new)
+                    self._signature = self._file_signature()
+                    self._publish([RecordChange('inserted', r['单号'], None, r) for r in self._records[start:]])
+                else:
+                    self.changes.emit([RecordChange('inserted', new['单号'], None, InventoryRecord.from_mapping(new))
+                                       for new in new_records])
             return True
         except Exception as e:
-            self._record_error("添加记录时发生错误", e)
+            self.invalidate_cache()
+            self._record_error("添加记录时发生错误", e, {"count": len(records)})
             return False
 
     def update_record(self, order_number: str, updated_fields: dict) -> bool:
@@ -100,47 +630,36 @@ class InventoryModel:
         根据单号查找并更新记录，返回 True 表示更新成功。
         """
         try:
-            records = self.get_all_records()
-            found = False
-            for r in records:
-                if r['单号'] == order_number:
-                    r.update(updated_fields)
-                    found = True
-                    break
-            if not found:
-                return False
-
-            try:
-                for k, v in updated_fields.items():
-                    _ = str(v).encode("gb2312")
-            except Exception as enc_err:
-                self._record_error("更新记录时发生编码错误", enc_err, {"field": k, "value": v})
-                return False
+            with self._lock:
+                records = self._load_records()
+                pos = self._index.get(order_number)
+                if pos is None:
+                    return False
+                try:
+                    check_columns({order_number: updated_fields}, self.CSV_HEADER)
+                except ValueError as col_err:
+                    self._record_error("更新记录时包含未知的列", col_err, {"order": order_number})
+                    return False
 
-            temp_file = tempfile.NamedTemporaryFile(
-                "w", newline="", encoding="gb2312", delete=False, dir=self.data_dir
-            )
-            try:
-                writer = csv.DictWriter(temp_file, fieldnames=self.CSV_HEADER)
-                writer.writeheader()
-                writer.writerows(records)
-                temp_file.close()
                 try:
-                    os.replace(temp_file.name, self.filename)
-                except PermissionError as pe:
-                    self._record_error("替换CSV文件时权限错误", pe, {"temp": temp_file.name, "target": self.filename})
+                    for k, v in updated_fields.items():
+                        _ = str(v).encode("gb2312")
+                except Exception as enc_err:
+                    self._record_error("更新记录时发生编码错误", enc_err, {"field": k, "value": v})
                     return False
-            finally:
-                if not temp_file.closed:
-                    temp_file.close()
-                if os.path.exists(temp_file.name) and temp_file.name != self.filename:
-                    try:
-                        os.remove(temp_file.name)
-                    except Exception as rm_err:
-                        self._record_error("清理临时文件失败", rm_err, {"temp": temp_file.name})
 
-            return True
+                # 写时复制：不修改已经交给调用方的记录对象，写入失败时恢复原记录
+                fields = {k: '' if v is None else str(v) for k, v in updated_fields.items()}
+                new = dict(records[pos])
+                new.update(fields)
+                old = self._put(pos, new)
+                if not self._save(records, [{'op': 'set', 'id': order_number, 'fields': fields}]):
+                    self._put(pos, old)
+                    return False
+                self._publish([RecordChange('updated', order_number, old, records[pos])])
+                return True
         except Exception as e:
+            self.invalidate_cache()
             self._record_error("更新记录时发生错误", e, {"target": self.filename})
             return False
 
@@ -149,38 +668,193 @@ class InventoryModel:
         根据单号删除记录，返回 True 表示删除成功。
         """
         try:
-            records = self.get_all_records()
-            new_records = [r for r in records if r.get('单号') != order_number]
-            if len(new_records) == len(records):
-                return False
+            with self._lock:
+                records = self._load_records()
+                pos = self._index.get(order_number)
+                if pos is None:
+                    return False
+                if order_number in self._duplicate_orders:
+                    new_records = [r for r in records if r.get('单号') != order_number]
+                else:
+                    new_records = records[:pos] + records[pos + 1:]
 
-            temp_file = tempfile.NamedTemporaryFile(
-                "w", newline="", encoding="gb2312", delete=False, dir=self.data_dir
-            )
-            try:
-                writer = csv.DictWriter(temp_file, fieldnames=self.CSV_HEADER)
-                writer.writeheader()
-                writer.writerows(new_records)
-                temp_file.close()
-                try:
-                    os.replace(temp_file.name, self.filename)
-                except PermissionError as pe:
-                    self._record_error("替换CSV文件时权限错误", pe, {"temp": temp_file.name, "target": self.filename})
+                if order_number in self._duplicate_orders:
+                    changes = [RESET]
+                else:
+                    changes = [RecordChange('deleted', order_number, records[pos], None)]
+                if not self._save(new_records, [{'op': 'del', 'id': order_number}]):
                     return False
-            finally:
-                if not temp_file.closed:
-                    temp_file.close()
-                if os.path.exists(temp_file.name) and temp_file.name != self.filename:
+                self._remove_outbound_events([order_number])
+                self.changes.emit(changes)
+                return True
+        except Exception as e:
+            self.invalidate_cache()
+            self._record_error("删除记录时发生错误", e, {"target": self.filename})
+            return False
+
+    def update_records(self, changes: dict) -> bool:
+        """
+        批量更新记录：changes 为 {单号: 更新字段}，全部修改在内存中完成后只写入一次。
+        不存在的单号会被忽略；包含表头以外的列时不做任何修改。返回 True 表示写入成功。
+        """
+        try:
+            check_columns(changes, self.CSV_HEADER)
+        except ValueError as col_err:
+            self._record_error("批量更新记录时包含未知的列", col_err, {"count": len(changes)})
+            return False
+        try:
+            with self._lock:
+                records = self._load_records()
+                new_records = list(records)
+                ops = []
+                updated = []
+                for order_number, updated_fields in changes.items():
+                    pos = self._index.get(order_number)
+                    if pos is None:
+                        continue
+                    fields = {k: '' if v is None else str(v) for k, v in updated_fields.items()}
                     try:
-                        os.remove(temp_file.name)
-                    except Exception as rm_err:
-                        self._record_error("清理临时文件失败", rm_err, {"temp": temp_file.name})
+                        self._check_encoding(fields)
+                    except Exception as enc_err:
+                        self._record_error("更新记录时发生编码错误", enc_err, {"order": order_number})
+                        return False
+                    new = dict(new_records[pos])
+                    new.update(fields)
+                    new_records[pos] = new
+                    ops.append({'op': 'set', 'id': order_number, 'fields': fields})
+                    updated.append((order_number, pos))
+                if not ops:
+                    return True
+                # 新列表写入成功后才替换缓存，失败时缓存保持原样
+                if not self._save(new_records, ops):
+                    return False
+                self._publish([RecordChange('updated', o, records[pos], self._records[pos]) for o, pos in updated])
+                return True
+        except Exception as e:
+            self.invalidate_cache()
+            self._record_error("批量更新记录时发生错误", e, {"target": self.filename, "count": len(changes)})
+            return False
 
-            return True
+    def delete_records(self, order_numbers) -> bool:
+        """
+        批量删除记录（重复单号全部删除），只写入一次；不存在的单号会被忽略。
+        返回 True 表示写入成功。
+        """
+        try:
+            with self._lock:
+                records = self._load_records()
+                targets = {o for o in order_numbers if o in self._index}
+                if not targets:
+                    return True
+                new_records = [r for r in records if r.get('单号') not in targets]
+                if targets & self._duplicate_orders:
+                    changes = [RESET]
+                else:
+                    changes = [RecordChange('deleted', o, records[self._index[o]], None) for o in targets]
+                if not self._save(new_records, [{'op': 'del', 'id': o} for o in targets]):
+                    return False
+                self._remove_outbound_events(targets)
+                self.changes.emit(changes)
+                return True
         except Exception as e:
-            self._record_error("删除记录时发生错误", e, {"target": self.filename})
+            self.invalidate_cache()
+            self._record_error("批量删除记录时发生错误", e, {"target": self.filename})
             return False
 
+    def reassign_duplicate_orders(self, new_order) -> list[tuple[str, str]] | None:
+        """
+        修复重复单号：每个单号保留第一条记录，其余记录改用 new_order() 生成的新单号。
+        返回 [(旧单号, 新单号), ...]，写入失败时返回 None。
+        """
+        try:
+            # 先落盘异步修改、合并日志，之后的整表重写不会与回放冲突
+            if not self.flush():
+                return None
+            if self._compactor is not None:
+                self._compactor.join()
+            if self.journal is not None and not self.compact():
+                return None
+            with self._lock:
+                records = self._load_records()
+                if not self._duplicate_orders:
+                    return []
+                seen = set()
+                new_records = []
+                changes = []
+                for r in records:
+                    order = r.get('单号', '')
+                    if order in seen:
+                        r = dict(r)
+                        r['单号'] = new_order()
+                        changes.append((order, r['单号']))
+                    else:
+                        seen.add(order)
+                    new_records.append(r)
+                if not self._write_all(new_records):
+                    return None
+            self.changes.emit([RESET])
+            return changes
+        except Exception as e:
+            self.invalidate_cache()
+            self._record_error("修复重复单号时发生错误", e, {"target": self.filename})
+            return None
+
+    # -------- 冷热分区 --------
+    def archive_closed_records(self, before: str | None = None) -> int | None:
+        """
+        把出库状态为“全部出库”“卖出”的记录移入按月分区的归档文件，主表只保留未关闭的记录。
+        before（YYYY-MM-DD）给出时只归档入库日期早于该日期的记录。
+        返回归档的条数，失败时返回 None（已写入的归档会撤销）。
+        """
+        sizes = None
+        try:
+            self._check_writable()
+            # 归档本身整表重写：先（备份后）迁移旧版出库记录，出库事件始终留在主表的事件文件中
+            if self.migrate_outbound_events() is None:
+                return None
+            # 先落盘异步修改、合并日志，之后的整表重写不会与回放冲突
+            if not self.flush():
+                return None
+            if self._compactor is not None:
+                self._compactor.join()
+            if self.journal is not None and not self.compact():
+                return None
+            with self._lock:
+                keep, closed = [], []
+                for r in self._load_records():
+                    if is_closed(r) and (not before or record_date(r) < before):
+                        closed.append(r)
+                    else:
+                        keep.append(r)
+                if not closed:
+                    return 0
+                sizes = self.archive.append(closed)
+                if not self._write_all(keep):
+                    self.archive.rollback(sizes)
+                    return None
+            self.changes.emit([RESET])
+            return len(closed)
+        except Exception as e:
+            if sizes:
+                self.archive.rollback(sizes)
+            self.invalidate_cache()
+            self._record_error("归档记录时发生错误", e, {"target": self.archive.dir})
+            return None
+
+    def archived_months(self, start: str | None = None, end: str | None = None) -> list[str]:
+        """与入库日期范围 [start, end] 重叠的归档分区（默认全部）。"""
+        return self.archive.months_in_range(start, end)
+
+    def iter_archived(self, start: str | None = None, end: str | None = None):
+        """
+        逐条产出入库日期在 [start, end] 内的归档记录，只读取与范围重叠的月份分区。
+        返回的记录请勿直接修改。
+        """
+        try:
+            yield from self.archive.iter_range(start, end)
+        except Exception as e:
+            self._record_error("读取归档记录时发生错误", e, {"target": self.archive.dir})
+
     def rename_table(self, old_name: str, new_name: str) -> bool:
         """
         重命名表文件：data/old_name.csv → data/new_name.csv
@@ -188,125 +862,495 @@ class InventoryModel:
         """
         old_path = os.path.join(self.data_dir, f"{old_name}.csv")
         new_path = os.path.join(self.data_dir, f"{new_name}.csv")
+        if self.read_only:
+            self._record_error("重命名数据表时发生错误", PermissionError("只读打开时不能重命名数据表"), {"target": old_path})
+            return False
         if os.path.exists(old_path) and not os.path.exists(new_path):
+            if old_name == self.table_name:
+                self.close()
             os.rename(old_path, new_path)
+            # 变更日志、出库事件和归档分区随表一起改名
+            ChangeJournal(old_path).rename(new_path)
+            OutboundEventStore(old_path).rename(new_path)
+            ArchiveStore(self.data_dir, old_name, self.CSV_HEADER).rename(self.data_dir, new_name)
+            TableAggregates(old_path).rename(new_path)
+            if old_name == self.table_name:
+                self.invalidate_cache()
             return True
         return False
 
     def get_all_records(self) -> list[dict]:
         """
-        读取并返回当前表的所有记录，每条记录为一个 dict。
+        返回当前表的所有记录，每条记录为一个 dict。
+        记录来自内存缓存，文件未变化时不会重新解析 CSV；返回的记录请勿直接修改。
         """
-        records = []
         try:
-            with open(self.filename, 'r', newline='', encoding="gb2312") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if '结算日期' not in row:
-                        dt = row.get('入库时间', '')
-                        val = ''
-                        if dt:
-                            try:
-                                val = dt.split(' ')[0]
-                            except Exception:
-                                val = ''
-                        row['结算日期'] = val
-                    records.append(row)
+            return list(self._load_records())
         except FileNotFoundError:
+            self.invalidate_cache()
             self.initialize_csv()
             return []
         except Exception as e:
+            self.invalidate_cache()
             self._record_error("读取记录时发生错误", e, {"target": self.filename})
             return []
-        return records
-    
+
+    def get_record(self, order_number: str) -> dict | None:
+        """
+        通过单号索引直接取出一条记录，未找到时返回 None；返回的记录请勿直接修改。
+        """
+        try:
+            records = self._load_records()
+        except FileNotFoundError:
+            self.invalidate_cache()
+            self.initialize_csv()
+            return None
+        except Exception as e:
+            self.invalidate_cache()
+            self._record_error("读取记录时发生错误", e, {"target": self.filename})
+            return None
+        pos = self._index.get(order_number)
+        return records[pos] if pos is not None else None
+
+    def find_by(self, column: str, value: str) -> list[dict]:
+        """
+        返回 column 列等于 value 的全部记录（按表中顺序）；INDEXED_COLUMNS 中的列走二级索引。
+        返回的记录请勿直接修改。
+        """
+        try:
+            records = self._load_records()
+        except FileNotFoundError:
+            self.invalidate_cache()
+            self.initialize_csv()
+            return []
+        except Exception as e:
+            self.invalidate_cache()
+            self._record_error("读取记录时发生错误", e, {"target": self.filename})
+            return []
+        buckets = self._secondary.get(column)
+        if buckets is None:
+            return [r for r in records if r.get(column, '') == value]
+        return [records[pos] for pos in buckets.get(value, ())]
+
+    def records_by_time(self, start: str | None = None, end: str | None = None, descending=True) -> list[dict]:
+        """
+        入库日期在 [start, end]（YYYY-MM-DD，None 表示不限）内的记录，按入库时间排序（默认降序）。
+        走入库时间索引二分查找，不逐行解析日期；入库时间无法识别的记录只在不限日期时返回，排在最早。
+        返回的记录请勿直接修改。
+        """
+        with self._lock:
+            records = self.get_all_records()
+            return [records[pos] for pos in self._by_time.between(start, end, descending)]
+
+    def iter_records(self, columns=None, where=None):
+        """
+        逐条产出记录，每条只包含 columns 指定的列（默认全部列），缺失的列为空字符串。
+        where 为筛选条件：{列名: 值} 表示各列都等于对应值；也可以是接收记录 dict、
+        返回 bool 的函数（只能看到 columns 中的列）。
+        缓存已加载或日志中有未合并的变更时从缓存产出（条件列有索引时走索引），
+        否则直接流式读取 CSV，只解析需要的列，不在内存中保留整张表。
+        """
+        cols = list(columns) if columns else list(self.CSV_HEADER)
+        conditions = where if isinstance(where, dict) else {}
+        predicate = where if callable(where) else None
+        with self._lock:
+            use_cache = self._cache_is_current() or (self.journal is not None and self.journal.size() > 0)
+        source = self._iter_cached(conditions) if use_cache else self._iter_csv(cols, conditions)
+        for r in source:
+            row = {c: r.get(c) or '' for c in cols}
+            if predicate is None or predicate(row):
+                yield row
+
+    def _iter_cached(self, conditions: dict):
+        indexed = [c for c in conditions if c in self._secondary]
+        if indexed:
+            records = self.find_by(indexed[0], conditions[indexed[0]])
+        else:
+            records = self.get_all_records()
+        for r in records:
+            if all((r.get(c) or '') == v for c, v in conditions.items()):
+                yield r
+
+    def _iter_csv(self, cols: list, conditions: dict):
+        try:
+            with open(self.filename, 'r', newline='', encoding="gb2312") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    return
+                positions = {name: i for i, name in enumerate(header)}
+                # 旧表没有“结算日期”列时按入库时间的日期部分补齐，与 _read_csv 一致
+                if '结算日期' not in positions:
+                    in_time = positions.get('入库时间')
+                    positions['结算日期'] = lambda row: _cell(row, in_time).split(' ')[0]
+                checks = [(positions.get(c), v) for c, v in conditions.items()]
+                picks = [(c, positions.get(c)) for c in cols]
+                for row in reader:
+                    if not row:
+                        continue
+                    if any(_cell(row, i) != v for i, v in checks):
+                        continue
+                    yield {c: _cell(row, i) for c, i in picks}
+        except FileNotFoundError:
+            self.initialize_csv()
+        except Exception as e:
+            self._record_error("读取记录时发生错误", e, {"target": self.filename})
+
+    # -------- 统计 --------
+    def numeric_columns(self) -> NumericColumns:
+        """返回当前表金额/数量列的列式数据，位置与 get_all_records() 的顺序一致；请勿修改。"""
+        with self._lock:
+            self.get_all_records()
+            return self._numeric
+
+    def profit_by(self, column: str) -> dict:
+        """按 column 分组汇总盈亏（行情价格 - 结算价），数据格式错误的记录按 0 计。"""
+        with self._lock:
+            if column in self._secondary and self._cache_is_current():
+                # 缓存已加载：按索引分组，直接在列式数据上求和
+                nc = self._numeric
+                ok = mask_and(nc.ok['行情价格'], nc.ok['结算价'])
+                buckets = sorted(self._secondary[column].items(), key=lambda kv: kv[1][0])
+                return {value: nc.sum_at('行情价格', positions, ok) - nc.sum_at('结算价', positions, ok)
+                        for value, positions in buckets}
+        return profit_by_records(self.iter_records(columns=[column, '行情价格', '结算价']), column)
+
+    def count_by(self, column: str) -> dict:
+        """按 column 分组统计记录条数，按各值首次出现的顺序排列。"""
+        if column in self._secondary:
+            with self._lock:
+                self.get_all_records()
+                buckets = sorted(self._secondary[column].items(), key=lambda kv: kv[1][0])
+                return {value: len(positions) for value, positions in buckets}
+        return count_by_records(self.iter_records(columns=[column]), column)
+
+    # -------- 物化汇总 --------
+    def _update_aggregates(self, changes):
+        self._aggregates.apply_changes(changes)
+
+    def _save_aggregates(self):
+        """汇总与磁盘上的文件一致（没有未落盘的修改）时保存，下次打开可直接使用；只读时不保存。"""
+        if self.read_only or (self.writer is not None and self.writer.has_pending()):
+            return
+        signature = self._file_signature()
+        if self._records is not None and self._signature != signature:
+            return
+        try:
+            self._aggregates.save(signature)
+        except Exception as e:
+            self._record_error("保存统计汇总时发生错误", e, {"target": self._aggregates.path})
+
+    def aggregates(self) -> dict:
+        """
+        当前表的物化汇总：{'rows', 'stock_value', 'profit', 'profit_by_product',
+        'profit_by_supplier', 'inbound_by_supplier'}，结构与 cross_table 的各表汇总相同。
+        修改时按差量更新；文件未在外部修改时，重新打开后直接读取保存的汇总，不必解析 CSV。
+        """
+        try:
+            with self._lock:
+                agg = self._aggregates
+                if not self._cache_is_current():
+                    signature = self._file_signature()
+                    if agg.matches(signature) or agg.load(signature):
+                        return agg.summary()
+                    self._load_records()
+                if not agg.valid:
+                    agg.rebuild(self._records)
+                    self._save_aggregates()
+                return agg.summary()
+        except Exception as e:
+            self.invalidate_cache()
+            self._record_error("统计汇总时发生错误", e, {"target": self.filename})
+            agg = TableAggregates(self.filename)
+            agg.rebuild(self.get_all_records())
+            return agg.summary()
+
     def partial_outbound(self, order_number: str, outbound_quantity: int, tracking_number: str, counter: str) -> bool:
         """
         处理分数量出库，更新剩余数量和剩余价值，记录出库信息
         """
-        records = self.get_all_records()
-        found = False
-        
-        for r in records:
-            if r['单号'] == order_number:
-                try:
-                    # 获取当前剩余数量，如果为空则使用商品数量
-                    current_remaining = int(r.get('剩余数量', '') or r.get('商品数量', '0'))
-                    total_quantity = int(r.get('商品数量', '0'))
-                    
-                    # 获取单价，如果为空则计算
-                    unit_price_str = r.get('单价', '')
-                    if unit_price_str:
-                        unit_price = float(unit_price_str)
-                    else:
-                        settlement_price = float(r.get('结算价', '0'))
-                        unit_price = settlement_price / max(total_quantity, 1)
-                        r['单价'] = f"{unit_price:.2f}"
-                    
-                    # 检查出库数量是否合法
-                    if outbound_quantity > current_remaining:
-                        return False
-                    
-                    # 计算新的剩余数量和剩余价值
-                    new_remaining = current_remaining - outbound_quantity
-                    new_remaining_value = new_remaining * unit_price
-                    
-                    # 更新记录
-                    r['剩余数量'] = str(new_remaining)
-                    r['剩余价值'] = f"{new_remaining_value:.2f}"
-                    
-                    # 更新出库状态
-                    if new_remaining == 0:
-                        r['出库状态'] = '全部出库'
-                    else:
-                        r['出库状态'] = '部分出库'
-                    
-                    # 记录出库信息
-                    import time
-                    outbound_time = time.strftime('%Y-%m-%d %H:%M:%S')
-                    outbound_info = f"{outbound_time}|{counter}|{tracking_number}|{outbound_quantity}|{unit_price:.2f}"
-                    
-                    existing_records = r.get('出库记录', '')
-                    if existing_records:
-                        r['出库记录'] = existing_records + ';' + outbound_info
-                    else:
-                        r['出库记录'] = outbound_info
-                    
-                    # 如果是第一次出库，设置出库档口和快递单号
-                    if not r.get('出库档口', ''):
-                        r['出库档口'] = counter
-                    if not r.get('快递单号', ''):
-                        r['快递单号'] = tracking_number
-                    
-                    found = True
-                    break
-                    
-                except (ValueError, TypeError):
-                    return False
-        
-        if not found:
+        old = self.get_record(order_number)
+        if old is None:
+            return False
+        built = build_partial_outbound(old, outbound_quantity, tracking_number, counter)
+        if built is None:
+            return False
+        return self._apply_outbound(order_number, old, *built)
+
+    def full_outbound(self, order_number: str, tracking_number: str, counter: str,
+                      status: str = '全部出库', fields: dict | None = None) -> bool:
+        """
+        整批出库（全部出库或卖出）：剩余数量全部出库并记录出库事件，fields 为要一并修改的其他列（如快递价格）。
+        """
+        old = self.get_record(order_number)
+        if old is None:
             return False
-            
-        temp_file = tempfile.NamedTemporaryFile(
-            "w", newline="", encoding="gb2312", delete=False, dir=self.data_dir
-        )
         try:
-            writer = csv.DictWriter(temp_file, fieldnames=self.CSV_HEADER)
-            writer.writeheader()
-            writer.writerows(records)
-            temp_file.close()
+            check_columns({order_number: fields or {}}, self.CSV_HEADER)
+        except ValueError as col_err:
+            self._record_error("出库时包含未知的列", col_err, {"order": order_number})
+            return False
+        built = build_full_outbound(old, tracking_number, counter, status, fields)
+        if built is None:
+            return False
+        return self._apply_outbound(order_number, old, *built)
+
+    def _apply_outbound(self, order_number: str, old, r: dict, event: dict) -> bool:
+        """追加出库事件并把记录改为 r；任何一步失败都撤销事件和缓存。"""
+        with self._lock:
+            records = self._records
+            pos = self._index.get(order_number)
+            if pos is None or records[pos] is not old:
+                return False
+            size = None
             try:
-                os.replace(temp_file.name, self.filename)
-            except PermissionError as pe:
-                self._record_error("替换CSV文件时权限错误", pe, {"temp": temp_file.name, "target": self.filename})
+                self._check_writable()
+                size = self.outbound.append([event])
+                self._put(pos, r)
+                fields = {k: v for k, v in r.items() if old.get(k) != v}
+                saved = self._save(records, [{'op': 'set', 'id': order_number, 'fields': fields}])
+            except Exception as e:
+                # 写入失败：撤销缓存和出库事件，缓存按磁盘重新加载
+                if size is not None:
+                    self._put(pos, old)
+                    self.outbound.truncate(size)
+                self.invalidate_cache()
+                self._record_error("出库时发生错误", e, {"order": order_number, "target": self.filename})
                 return False
-        finally:
-            if not temp_file.closed:
-                temp_file.close()
-            if os.path.exists(temp_file.name) and temp_file.name != self.filename:
-                try:
-                    os.remove(temp_file.name)
-                except Exception as rm_err:
-                    self._record_error("清理临时文件失败", rm_err, {"temp": temp_file.name})
+            if not saved:
+                self._put(pos, old)
+                self.outbound.truncate(size)
+                return False
+            self._publish([RecordChange('updated', order_number, old, records[pos])])
+            return True
 
-        return True
+    # -------- 出库事件 --------
+    def _legacy_events(self, conditions: dict) -> list[dict]:
+        """
+        主表中尚未迁移的旧版“出库记录”列解析出的出库事件，按 conditions 过滤；只读，不修改数据表。
+        （重复单号只取第一条，与迁移时一致。）
+        """
+        with self._lock:
+            records = self._load_records()
+            if not self._legacy_outbound:
+                return []
+            order = conditions.get('单号')
+            if order is not None:
+                pos = self._index.get(order)
+                items = [] if pos is None else [(order, pos)]
+            else:
+                items = self._index.items()
+            events = []
+            for o, pos in items:
+                text = records[pos].get('出库记录') or ''
+                if text:
+                    events.extend(parse_legacy_outbound(o, text))
+        return [e for e in events if all(e.get(k) == v for k, v in conditions.items())]
+
+    def migrate_outbound_events(self) -> int | None:
+        """
+        把主表中旧版“出库记录”列导入出库事件文件并清空该列，返回导入的事件数，失败时返回 None。
+        这是显式的一次性操作（设置页按钮、归档、SQLite 迁移之外不会调用），读取时从不重写数据表：
+        迁移前先把当前数据完整备份为 data/<表名>.before-outbound-migration-<时间>.csv，
+        并在 diagnostic.log 中记录。同一数据目录中仍只读取该列的旧版程序迁移后看不到出库记录，可从备份恢复。
+        """
+        try:
+            with self._lock:
+                records = self._load_records()
+                if not self._legacy_outbound:
+                    return 0
+                self._check_writable()
+                events = []
+                changes = {}
+                for order, pos in self._index.items():
+                    text = records[pos].get('出库记录') or ''
+                    if text:
+                        events.extend(parse_legacy_outbound(order, text))
+                        changes[order] = {'出库记录': ''}
+                if not changes:
+                    self._legacy_outbound = False
+                    return 0
+                stamp = time.strftime('%Y%m%d_%H%M%S')
+                backup = os.path.splitext(self.filename)[0] + f".before-outbound-migration-{stamp}.csv"
+                with open(backup, 'w', newline='', encoding="gb2312") as f:
+                    writer = csv.DictWriter(f, fieldnames=self.CSV_HEADER)
+                    writer.writeheader()
+                    writer.writerows(dict(r) for r in records)
+                self._log(f"迁移旧版出库记录：{len(changes)} 条记录、{len(events)} 个出库事件，已备份到 {backup}")
+                size = self.outbound.append(events)
+                if not self.update_records(changes):
+                    # 清空失败时撤销本次导入，数据表保持原样
+                    self.outbound.truncate(size)
+                    self._log(f"迁移旧版出库记录失败，已撤销：{self.last_error}")
+                    return None
+                self._legacy_outbound = False
+                self._log("迁移旧版出库记录完成")
+                return len(events)
+        except Exception as e:
+            self._record_error("迁移旧版出库记录时发生错误", e, {"target": self.outbound.path})
+            return None
+
+    def _remove_outbound_events(self, order_numbers):
+        try:
+            if self.outbound.exists():
+                self.outbound.remove_orders(order_numbers)
+        except Exception as e:
+            self._record_error("删除出库事件时发生错误", e, {"target": self.outbound.path})
+
+    def outbound_events(self, **conditions) -> list[dict]:
+        """
+        按条件查询出库事件，例如 outbound_events(单号=...)、outbound_events(快递单号=...)、
+        outbound_events(出库档口=...)；不带条件时返回全部。单号、快递单号、出库档口走索引。
+        尚未迁移的旧版“出库记录”列也解析为事件一并返回（排在前面），不修改数据表。
+        """
+        try:
+            return self._legacy_events(conditions) + self.outbound.find(**conditions)
+        except Exception as e:
+            self._record_error("读取出库事件时发生错误", e, {"target": self.outbound.path})
+            return []
+
+    def outbound_record_text(self, order_number: str) -> str:
+        """按旧版“出库记录”列的格式返回某单号的出库记录。"""
+        return format_outbound_events(self.outbound_events(单号=order_number))
+
+    def export_csv(self, path: str) -> bool:
+        """把当前表导出为 CSV 文件，“出库记录”列由出库事件生成。"""
+        try:
+            grouped = {}
+            for e in self._legacy_events({}) + self.outbound.all():
+                grouped.setdefault(e['单号'], []).append(e)
+            with open(path, 'w', newline='', encoding="gb2312") as f:
+                writer = csv.DictWriter(f, fieldnames=self.CSV_HEADER, extrasaction='ignore')
+                writer.writeheader()
+                for r in self.get_all_records():
+                    row = dict(r)
+                    row['出库记录'] = format_outbound_events(grouped.get(r.get('单号', ''), []))
+                    writer.writerow(row)
+            return True
+        except Exception as e:
+            self._record_error("导出数据时发生错误", e, {"target": path})
+            return False
+
+
+def profit_by_records(records, column: str) -> dict:
+    """按 column 分组汇总 records 的盈亏（行情价格 - 结算价），数据格式错误的记录按 0 计。"""
+    result = {}
+    for r in records:
+        key = r.get(column, '')
+        try:
+            profit = float(r.get('行情价格', '0') or 0) - float(r.get('结算价', '0') or 0)
+        except (ValueError, TypeError):
+            profit = 0
+        result[key] = result.get(key, 0) + profit
+    return result
+
+
+def count_by_records(records, column: str) -> dict:
+    """按 column 分组统计 records 的条数，按各值首次出现的顺序排列。"""
+    result = {}
+    for r in records:
+        key = r.get(column, '')
+        result[key] = result.get(key, 0) + 1
+    return result
+
+
+def _cell(row: list, i) -> str:
+    """取 CSV 行中第 i 列的值；i 为 None 或超出行长度时为空字符串，i 也可以是由整行计算值的函数。"""
+    if callable(i):
+        return i(row)
+    return row[i] if i is not None and i < len(row) else ''
+
+
+def check_columns(changes: dict, header) -> None:
+    """changes（{单号: 更新字段}）中有表头以外的列时抛出 ValueError，表头以外的列不会被保存。"""
+    unknown = sorted({k for fields in changes.values() for k in fields if k not in header})
+    if unknown:
+        raise ValueError(f"未知的列: {', '.join(unknown)}")
+
+
+def build_partial_outbound(record: dict, outbound_quantity: int, tracking_number: str,
+                           counter: str) -> tuple[dict, dict] | None:
+    """
+    根据一次分数量出库计算记录的新内容（剩余数量、剩余价值、出库状态等）及对应的出库事件，
+    返回 (新记录, 出库事件)；数量不足或数据格式错误时返回 None。不修改传入的记录。
+    """
+    r = dict(record)
+    try:
+        # 获取当前剩余数量，如果为空则使用商品数量
+        current_remaining = int(r.get('剩余数量', '') or r.get('商品数量', '0'))
+        total_quantity = int(r.get('商品数量', '0'))
+        
+        # 获取单价，如果为空则计算
+        unit_price_str = r.get('单价', '')
+        if unit_price_str:
+            unit_price = float(unit_price_str)
+        else:
+            settlement_price = float(r.get('结算价', '0'))
+            unit_price = settlement_price / max(total_quantity, 1)
+            r['单价'] = f"{unit_price:.2f}"
+        
+        # 检查出库数量是否合法
+        if outbound_quantity > current_remaining:
+            return None
+        
+        # 计算新的剩余数量和剩余价值
+        new_remaining = current_remaining - outbound_quantity
+        new_remaining_value = new_remaining * unit_price
+        
+        # 更新记录
+        r['剩余数量'] = str(new_remaining)
+        r['剩余价值'] = f"{new_remaining_value:.2f}"
+        
+        # 更新出库状态
+        if new_remaining == 0:
+            r['出库状态'] = '全部出库'
+        else:
+            r['出库状态'] = '部分出库'
+        
+        # 出库信息作为独立的出库事件保存
+        event = {
+            '单号': r.get('单号', ''),
+            '出库时间': time.strftime('%Y-%m-%d %H:%M:%S'),
+            '出库档口': counter,
+            '快递单号': tracking_number,
+            '出库数量': str(outbound_quantity),
+            '单价': f"{unit_price:.2f}",
+        }
+        
+        # 如果是第一次出库，设置出库档口和快递单号
+        if not r.get('出库档口', ''):
+            r['出库档口'] = counter
+        if not r.get('快递单号', ''):
+            r['快递单号'] = tracking_number
+    except (ValueError, TypeError):
+        return None
+    return r, event
+
+
+def build_full_outbound(record: dict, tracking_number: str, counter: str, status: str = '全部出库',
+                        fields: dict | None = None) -> tuple[dict, dict] | None:
+    """
+    整批出库：按剩余数量生成出库事件，出库状态改为 status，出库档口、快递单号为本次的值，再应用 fields。
+    没有剩余数量或数据格式错误时返回 None。
+    """
+    try:
+        remaining = int(record.get('剩余数量', '') or record.get('商品数量', '0'))
+    except (ValueError, TypeError):
+        return None
+    if remaining <= 0:
+        return None
+    built = build_partial_outbound(record, remaining, tracking_number, counter)
+    if built is None:
+        return None
+    r, event = built
+    r.update({'出库状态': status, '出库档口': counter, '快递单号': tracking_number})
+    r.update({k: '' if v is None else str(v) for k, v in (fields or {}).items()})
+    return r, event
+
+
+class InventoryRecord(Record):
+    """库存表的一条记录，列与 InventoryModel.CSV_HEADER 一致。"""
+    __slots__ = ()
+    FIELDS = InventoryModel.CSV_HEADER
+    # 取值在各行间大量重复的列
+    INTERNED = ['货商姓名', '商品名称', '结算日期', '货源', '颜色/配置', '结算状态', '出库状态', '出库档口']
@@ -1,18 +1,27 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
+from outbound_events import format_outbound_events
+from virtual_tree import VirtualTree
+from filter_engine import FilterEngine, compile_filters, FILTER_SYNTAX
+from sort_keys import TableSorter, click_sort, heading_text
 try:
     from tkcalendar import DateEntry
 except ImportError:
     DateEntry = ttk.Entry
 
 class ModifyView(ttk.Frame):
+    # 表单中只读、不参与保存和批量修改的字段；出库记录由出库事件生成
+    READONLY_FIELDS = ("单号", "利润", "出库记录")
+
     def __init__(self, parent, controller):
         super().__init__(parent, padding=10)
         self.controller = controller
         self.selected_order = None
-        self.orig = []   # 原始数据列表（dict）
+        self.orig = {}   # 原始数据：单号 → dict（按表中顺序；重复单号的后续行另行编键）
+        self._orig_pos = {}  # orig 的键 → 位置（与筛选、排序缓存中的行位置一致）
         self.full = []   # 当前显示的数据列表（dict）
+        self._filter = FilterEngine()  # orig 的筛选
         self.batch_mode = False
         # 列定义
         self.columns = [
@@ -21,8 +30,10 @@ class ModifyView(ttk.Frame):
             "佣金","结算价","单价","剩余数量","剩余价值","行情价格","利润","结算状态",
             "出库状态","出库档口","快递单号","快递价格","备注","单号","出库记录"
         ]
-        # 排序状态
+        # 排序状态，及当前排序条件 [(列, 是否升序), ...]（筛选、刷新后沿用）
         self.sort_states = {c: True for c in self.columns}
+        self.sort_spec = []
+        self._sorter = TableSorter()  # orig 的排序键及各排序条件的结果
 
         self.create_widgets()
         self.refresh_list()
@@ -49,22 +60,20 @@ class ModifyView(ttk.Frame):
         self.lbl_batch_preview = ttk.Label(self.batch_controls, text="")
         self.lbl_batch_preview.pack(side=tk.LEFT, padx=10)
 
-        # —— 表格区 ——
-        tree_fr = ttk.Frame(self)
-        tree_fr.pack(fill=tk.BOTH, expand=True)
-        self.tree = ttk.Treeview(
-            tree_fr,
+        # —— 表格区（虚拟滚动，只为可见行创建 Treeview 项） ——
+        self.table = VirtualTree(
+            self, self._row_values,
             columns=self.columns,
             show="headings",
             selectmode="browse"
         )
+        self.table.pack(fill=tk.BOTH, expand=True)
+        self.tree = self.table.tree
         for c in self.columns:
             self.tree.heading(c, text=c, command=lambda c=c: self.sort_by(c))
             self.tree.column(c, width=100, anchor="center")
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        vsb = ttk.Scrollbar(tree_fr, orient="vertical", command=self.tree.yview)
-        vsb.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=vsb.set)
+        # Shift+单击表头：多列排序
+        self.tree.bind("<Shift-Button-1>", self.on_heading_shift_click)
 
         # —— 筛选区 ——
         self.filter_canvas = tk.Canvas(self, height=60)
@@ -87,6 +96,8 @@ class ModifyView(ttk.Frame):
             e.bind("<Return>", lambda ev: self.apply_filters())
             self.filter_entries[c] = e
         # 筛选与清空按钮
+        ttk.Label(self.filter_inner, text=f"支持：{FILTER_SYNTAX}", foreground="gray")\
+            .grid(row=0, column=len(self.columns), columnspan=2, sticky="w", padx=5)
         ttk.Button(self.filter_inner, text="应用筛选", command=self.apply_filters)\
             .grid(row=1, column=len(self.columns), padx=5)
         ttk.Button(self.filter_inner, text="清空筛选条件", command=self.clear_filters)\
@@ -111,7 +122,7 @@ class ModifyView(ttk.Frame):
             ttk.Label(form_fr, text=field).grid(
                 row=row, column=col*2, sticky="e", padx=5, pady=2
             )
-            if field in ("单号","利润"):
+            if field in self.READONLY_FIELDS:
                 w = ttk.Entry(form_fr, width=20, state="readonly")
                 w.grid(row=row, column=col*2+1, sticky="w", padx=5, pady=2)
             elif field == "货商姓名":
@@ -166,7 +177,7 @@ class ModifyView(ttk.Frame):
 
     def start_batch_modify(self):
         self.batch_mode = True
-        cols = [c for c in self.columns if c not in ("单号","利润")]
+        cols = [c for c in self.columns if c not in self.READONLY_FIELDS]
         self.cb_batch_column["values"] = cols
         if cols:
             self.cb_batch_column.current(0)
@@ -202,18 +213,9 @@ class ModifyView(ttk.Frame):
         total = len(self.full)
         if not messagebox.askyesno("确认", f"将修改 {total} 条记录的 '{col}' 为 '{val}'，是否继续？"):
             return
-        success = 0
-        failed = 0
-        errors = []
-        for d in self.full:
-            order = d.get("单号", "")
-            ok, msg = self.controller.handle_modify(order, {col: val})
-            if ok:
-                success += 1
-            else:
-                failed += 1
-                errors.append(msg)
-        self.refresh_list()
+        changes = {d.get("单号", ""): {col: val} for d in self.full}
+        success, errors = self.controller.handle_modify_many(changes)
+        failed = len(errors)
         self.cancel_batch_modify()
         if failed == 0:
             messagebox.showinfo("成功", f"批量修改完成：成功 {success} 条")
@@ -235,42 +237,102 @@ class ModifyView(ttk.Frame):
     def get_datetime_str(self, date_ent, cb_h, cb_m, cb_s):
         return f"{date_ent.get()} {cb_h.get()}:{cb_m.get()}:{cb_s.get()}"
 
+    def _make_row(self, r, events=None) -> dict:
+        d = r.copy()
+        if events is not None:
+            d['出库记录'] = format_outbound_events(events)
+        try:
+            profit = float(d.get('行情价格','0') or 0) - float(d.get('结算价','0') or 0)
+            d['利润'] = f"{profit:.2f}"
+        except:
+            d['利润'] = ''
+        return d
+
     def refresh_list(self):
         # 重新加载原始数据，但不清空筛选条件
         recs = self.controller.model.get_all_records()
-        self.orig = []
+        self.orig = {}
+        # 出库记录列由出库事件生成，一次取出全部事件按单号分组
+        model = self.controller.model
+        grouped = None
+        if hasattr(model, 'outbound_events'):
+            grouped = {}
+            for e in model.outbound_events():
+                grouped.setdefault(e['单号'], []).append(e)
         for r in recs:
-            d = r.copy()
-            try:
-                profit = float(d.get('行情价格','0') or 0) - float(d.get('结算价','0') or 0)
-                d['利润'] = f"{profit:.2f}"
-            except:
-                d['利润'] = ''
-            self.orig.append(d)
-        # 先让 full 等于 orig，再应用当前筛选
-        self.full = list(self.orig)
+            order = r.get('单号', '')
+            d = self._make_row(r, None if grouped is None else grouped.get(order, []))
+            key = order if order and order not in self.orig else ('dup', len(self.orig))
+            self.orig[key] = d
+        self._load_rows()
         self.apply_filters()
 
+    def _load_rows(self):
+        """按 orig 的顺序重建单号 → 位置 的索引及筛选、排序缓存。"""
+        self._orig_pos = {key: i for i, key in enumerate(self.orig)}
+        rows = list(self.orig.values())
+        self._filter.load(rows)
+        self._sorter.load(rows)
+
+    def apply_changes(self, changes):
+        """
+        按记录级变更修补 orig 和 full：只增删改对应单号的行（新记录排在最后），
+        其余行保持原位，滚动位置、选中行和当前排序不变。
+        """
+        model = self.controller.model
+        passes = compile_filters(self._filter_terms())
+        removed = False
+        dropped, added = set(), {}  # full 中要删除的位置；要追加到最后的新行（单号 → 行）
+        for c in changes:
+            d = None
+            old = self.orig.get(c.order)
+            if c.new is not None:
+                events = model.outbound_events(单号=c.order) if hasattr(model, 'outbound_events') else None
+                d = self._make_row(c.new, events)
+                if old is None:
+                    self._orig_pos[c.order] = len(self.orig)
+                self.orig[c.order] = d
+                if not removed:
+                    self._filter.update(self._orig_pos[c.order], d)
+                    self._sorter.update(self._orig_pos[c.order], d)
+            elif self.orig.pop(c.order, None) is not None:
+                removed = True
+            shown = d is not None and passes(d)
+            added.pop(c.order, None)
+            i = self.table.index(old) if old is not None else None
+            if i is not None:
+                if shown:
+                    self.table.replace(i, d)
+                else:
+                    dropped.add(i)
+            elif shown:
+                added[c.order] = d
+        self.table.delete_rows(dropped)
+        self.table.insert_rows(len(self.full), list(added.values()))
+        if removed:
+            self._load_rows()
+        self.table.refresh()
+
+    def _row_values(self, d):
+        return tuple(d.get(c,"") for c in self.columns)
+
     def populate_tree(self):
-        self.tree.delete(*self.tree.get_children())
-        for d in self.full:
-            vals = tuple(d.get(c,"") for c in self.columns)
-            self.tree.insert("", tk.END, values=vals)
+        self.table.set_rows(self.full)
+
+    def _filter_terms(self):
+        terms = []
+        for c, e in self.filter_entries.items():
+            v = e.get().strip().lower()
+            if v:
+                terms.append((c, v))
+        return terms
 
     def apply_filters(self):
-        # 根据 filter_entries 过滤 orig 到 full
-        self.full = []
-        for d in self.orig:
-            ok = True
-            for c, e in self.filter_entries.items():
-                v = e.get().strip().lower()
-                if v and v not in str(d.get(c,"")).lower():
-                    ok = False
-                    break
-            if ok:
-                self.full.append(d)
-        # 如果之前有排序状态，保留当前排序
-        # 找到最后一次点击排序的列（可自行扩展），这里简单不变
+        # 根据 filter_entries 过滤 orig 到 full（在原条件上继续输入时只在上次结果中查找）
+        self.full = self._filter.filter(self._filter_terms())
+        # 保留当前排序（名次已缓存，不必重新比较）
+        if self.sort_spec:
+            self.full = self._sorter.sort(self.full, self.sort_spec)
         self.populate_tree()
 
     def clear_filters(self):
@@ -278,26 +340,36 @@ class ModifyView(ttk.Frame):
             e.delete(0, tk.END)
         self.apply_filters()
 
-    def sort_by(self, col):
+    def sort_by(self, col, multi=False):
+        """单击表头按该列排序（再次单击反向）；multi 为 True（Shift+单击）时追加为次要排序列。"""
         asc = self.sort_states[col]
-        try:
-            self.full.sort(key=lambda x: float(x.get(col,"") or 0), reverse=not asc)
-        except:
-            self.full.sort(key=lambda x: x.get(col,""), reverse=not asc)
-        self.sort_states[col] = not asc
+        self.sort_spec = click_sort(self.sort_spec, col, asc, multi)
+        if not multi:
+            self.sort_states[col] = not asc
+        self.full = self._sorter.sort(self.full, self.sort_spec)
+        for c in self.columns:
+            self.tree.heading(c, text=heading_text(c, self.sort_spec))
         self.populate_tree()
 
+    def on_heading_shift_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != "heading":
+            return None
+        i = int(self.tree.identify_column(event.x)[1:]) - 1
+        if 0 <= i < len(self.columns):
+            self.sort_by(self.columns[i], multi=True)
+        return "break"
+
     def load_record(self):
-        sel = self.tree.selection()
+        sel = self.table.selected_rows()
         if not sel:
             messagebox.showwarning("提示","请选择一条记录加载")
             return
-        vals = self.tree.item(sel[0], "values")
+        vals = self._row_values(sel[0])
         for i, field in enumerate(self.columns):
             w = self.entries[field]
             v = vals[i]
             # 同原有逻辑：设置到各个控件
-            if field in ("单号","利润"):
+            if field in self.READONLY_FIELDS:
                 w.config(state="normal"); w.delete(0,tk.END); w.insert(0,v); w.config(state="readonly")
             elif field == "入库时间":
                 de, cb_h, cb_m, cb_s = w
@@ -333,7 +405,7 @@ class ModifyView(ttk.Frame):
             return
         updated = {}
         for field, w in self.entries.items():
-            if field in ("单号","利润"):
+            if field in self.READONLY_FIELDS:
                 continue
             if field == "入库时间":
                 de, cb_h, cb_m, cb_s = w
@@ -343,8 +415,6 @@ class ModifyView(ttk.Frame):
         success, message = self.controller.handle_modify(self.selected_order, updated)
         if success:
             messagebox.showinfo("提示", message)
-            # 重新加载数据并保留筛选、排序
-            self.refresh_list()
         else:
             messagebox.showerror("错误", f"修改失败: {message}")
 
@@ -365,9 +435,7 @@ class ModifyView(ttk.Frame):
                     cb_h.set("00"); cb_m.set("00"); cb_s.set("00")
                 else:
                     w.config(state="normal"); w.delete(0, tk.END)
-                    if field in ("单号","利润"):
+                    if field in self.READONLY_FIELDS:
                         w.config(state="readonly")
-            # 重新加载数据并保留筛选、排序
-            self.refresh_list()
         else:
             messagebox.showerror("错误","删除失败")
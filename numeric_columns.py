@@ -0,0 +1,103 @@
+from array import array
+from itertools import compress
+from operator import and_, itemgetter
+
+
+def parse_number(value) -> tuple[float, bool, bool]:
+    """
+    解析金额/数量字符串，返回 (数值, 是否可用, 是否为空)。
+    空白按 0 处理且视为可用；无法解析时数值为 0、不可用。
+    """
+    if value is None or value == '':
+        return 0.0, True, True
+    try:
+        return float(value), True, False
+    except (ValueError, TypeError):
+        return 0.0, False, True
+
+
+def mask_and(*masks):
+    """逐位与多个 0/1 掩码；None 表示全选，全部为 None 时返回 None。"""
+    result = None
+    for m in masks:
+        if m is None:
+            continue
+        result = m if result is None else bytearray(map(and_, result, m))
+    return result
+
+
+def take(values, positions):
+    """按位置取出多个元素，返回元组。"""
+    if not positions:
+        return ()
+    if len(positions) == 1:
+        return (values[positions[0]],)
+    return itemgetter(*positions)(values)
+
+
+class NumericColumns:
+    """
+    金额与数量列的列式存储，与记录列表按位置一一对应。
+
+    每列保存为 array('d')，空白和无法解析的值记为 0；
+    ok[列] 为可用掩码（数字或空白为 1），null[列] 为空值掩码（空白或无法解析为 1）。
+    求和与分组汇总直接在数组和掩码上进行，不再逐行解析字符串。
+    """
+    COLUMNS = ['商品数量', '买价', '佣金', '结算价', '单价', '剩余数量', '剩余价值', '行情价格', '快递价格']
+
+    def __init__(self, records=(), columns=None):
+        self.columns = list(columns or self.COLUMNS)
+        self.values = {c: array('d') for c in self.columns}
+        self.ok = {c: bytearray() for c in self.columns}
+        self.null = {c: bytearray() for c in self.columns}
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.values[self.columns[0]]) if self.columns else 0
+
+    def extend(self, records):
+        for r in records:
+            self.append(r)
+
+    def append(self, record: dict):
+        for c in self.columns:
+            v, ok, null = parse_number(record.get(c))
+            self.values[c].append(v)
+            self.ok[c].append(ok)
+            self.null[c].append(null)
+
+    def set(self, pos: int, record: dict):
+        for c in self.columns:
+            v, ok, null = parse_number(record.get(c))
+            self.values[c][pos] = v
+            self.ok[c][pos] = ok
+            self.null[c][pos] = null
+
+    def pop(self):
+        for c in self.columns:
+            self.values[c].pop()
+            self.ok[c].pop()
+            self.null[c].pop()
+
+    def sum(self, column: str, where=None) -> float:
+        """对 column 求和；where 为 0/1 掩码（None 表示全部行）。"""
+        values = self.values[column]
+        return sum(values) if where is None else sum(compress(values, where))
+
+    def positive(self, column: str) -> bytearray:
+        """column 中大于 0 的行的掩码。"""
+        return bytearray(map((0.0).__lt__, self.values[column]))
+
+    def selector(self, positions) -> bytearray:
+        """把位置列表转换为掩码。"""
+        mask = bytearray(len(self))
+        for pos in positions:
+            mask[pos] = 1
+        return mask
+
+    def sum_at(self, column: str, positions, ok=None) -> float:
+        """对 positions 指定的行求和；ok 为可选的可用掩码，掩码为 0 的行跳过。"""
+        values = take(self.values[column], positions)
+        if ok is None:
+            return sum(values)
+        return sum(compress(values, take(ok, positions)))
@@ -0,0 +1,97 @@
+import os
+import time
+import random
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # Linux / macOS
+    msvcrt = None
+
+
+def _try_lock(f) -> bool:
+    """对已打开的文件加非阻塞排他锁，进程退出后系统自动释放。"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        if msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+    except OSError:
+        pass
+    return False
+
+
+class OrderNumberGenerator:
+    """
+    单号生成器，单号格式为：毫秒时间戳(13位) + 序号(3位) + 实例号(2位)。
+
+    同一毫秒内序号递增，序号用完后顺延到下一毫秒，所以同一实例生成的单号严格递增；
+    实例号通过锁定 data/.order_instances/<实例号>.lock 取得，
+    多个程序共用同一个数据目录时各自的单号也不会重复。
+    """
+    SEQ_DIGITS = 3
+    INSTANCE_DIGITS = 2
+
+    def __init__(self, data_dir: str, clock=time.time):
+        self._clock = clock
+        self._mutex = threading.Lock()
+        self._last_ms = 0
+        self._seq = 0
+        self._lock_file = None
+        self.instance_id = self._claim_instance_id(os.path.join(data_dir, '.order_instances'))
+
+    def _claim_instance_id(self, lock_dir: str) -> int:
+        try:
+            os.makedirs(lock_dir, exist_ok=True)
+        except OSError:
+            return random.randrange(10 ** self.INSTANCE_DIGITS)
+        for i in range(10 ** self.INSTANCE_DIGITS):
+            path = os.path.join(lock_dir, f"{i:0{self.INSTANCE_DIGITS}d}.lock")
+            try:
+                f = open(path, 'a+')
+            except OSError:
+                continue
+            if _try_lock(f):
+                self._lock_file = f
+                return i
+            f.close()
+        # 所有实例号都被占用或系统不支持文件锁时，随机选择一个
+        return random.randrange(10 ** self.INSTANCE_DIGITS)
+
+    def next(self) -> str:
+        """生成下一个单号。"""
+        with self._mutex:
+            now = int(self._clock() * 1000)
+            if now > self._last_ms:
+                self._last_ms = now
+                self._seq = 0
+            else:
+                # 同一毫秒或系统时间回拨：沿用上一个时间戳并递增序号
+                self._seq += 1
+                if self._seq >= 10 ** self.SEQ_DIGITS:
+                    self._last_ms += 1
+                    self._seq = 0
+            return (f"{self._last_ms}{self._seq:0{self.SEQ_DIGITS}d}"
+                    f"{self.instance_id:0{self.INSTANCE_DIGITS}d}")
+
+    def close(self):
+        """释放实例号。"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def find_duplicate_orders(records: list[dict]) -> dict:
+    """返回出现不止一次的单号及其出现次数 {单号: 次数}。"""
+    counts = {}
+    for r in records:
+        order = r.get('单号', '')
+        counts[order] = counts.get(order, 0) + 1
+    return {order: n for order, n in counts.items() if n > 1}
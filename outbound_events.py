@@ -0,0 +1,155 @@
+import os
+import csv
+import tempfile
+
+# 出库事件的字段
+EVENT_HEADER = ['单号', '出库时间', '出库档口', '快递单号', '出库数量', '单价']
+
+
+def parse_legacy_outbound(order_number: str, text: str) -> list[dict]:
+    """
+    解析旧版“出库记录”列的字符串：
+    "时间1|档口1|快递单号1|数量1|单价1;时间2|档口2|快递单号2|数量2|单价2"
+    """
+    events = []
+    for item in (text or '').split(';'):
+        if not item.strip():
+            continue
+        parts = item.split('|')
+        if len(parts) < 4:
+            continue
+        parts += [''] * (5 - len(parts))
+        events.append(dict(zip(EVENT_HEADER, [order_number] + parts[:5])))
+    return events
+
+
+def format_outbound_events(events: list[dict]) -> str:
+    """把出库事件拼成旧版“出库记录”列的格式，用于导出。"""
+    return ';'.join(
+        '|'.join(e.get(k, '') for k in ('出库时间', '出库档口', '快递单号', '出库数量', '单价'))
+        for e in events
+    )
+
+
+class OutboundEventStore:
+    """
+    数据表的出库事件流（data/<表名>.outbound.csv），每次出库追加一行，不改写主表。
+
+    内存中按单号、快递单号、出库档口建立索引；
+    文件大小或修改时间变化（例如被其他程序追加）时重新加载。
+    """
+    INDEXED_COLUMNS = ['单号', '快递单号', '出库档口']
+
+    def __init__(self, csv_path: str):
+        self.path = os.path.splitext(csv_path)[0] + ".outbound.csv"
+        self._events = None
+        self._signature = None
+        self._index = {}
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_size, st.st_mtime_ns, st.st_ino)
+        except OSError:
+            return None
+
+    def _index_event(self, pos: int, event: dict):
+        for col in self.INDEXED_COLUMNS:
+            self._index[col].setdefault(event.get(col, ''), []).append(pos)
+
+    def _load(self) -> list[dict]:
+        signature = self._file_signature()
+        if self._events is not None and signature == self._signature:
+            return self._events
+        events = []
+        if signature is not None:
+            with open(self.path, 'r', newline='', encoding="gb2312") as f:
+                for row in csv.DictReader(f):
+                    events.append({k: row.get(k) or '' for k in EVENT_HEADER})
+        self._events = events
+        self._index = {col: {} for col in self.INDEXED_COLUMNS}
+        for pos, e in enumerate(events):
+            self._index_event(pos, e)
+        self._signature = signature
+        return events
+
+    def create(self):
+        """创建只有表头的空事件文件。"""
+        if not self.exists():
+            with open(self.path, 'w', newline='', encoding="gb2312") as f:
+                csv.writer(f).writerow(EVENT_HEADER)
+
+    def append(self, events: list[dict]) -> int:
+        """追加出库事件，返回追加前的文件大小（供 truncate 回滚）。"""
+        self.create()
+        rows = [{k: '' if e.get(k) is None else str(e.get(k)) for k in EVENT_HEADER} for e in events]
+        for row in rows:
+            for v in row.values():
+                v.encode("gb2312")
+        cached = self._events is not None and self._signature == self._file_signature()
+        size = os.path.getsize(self.path)
+        with open(self.path, 'a', newline='', encoding="gb2312") as f:
+            csv.DictWriter(f, fieldnames=EVENT_HEADER).writerows(rows)
+        if cached:
+            for row in rows:
+                self._events.append(row)
+                self._index_event(len(self._events) - 1, row)
+            self._signature = self._file_signature()
+        return size
+
+    def truncate(self, size: int):
+        """撤销 size 之后追加的事件。"""
+        with open(self.path, 'r+b') as f:
+            f.truncate(size)
+        self._events = None
+
+    def all(self) -> list[dict]:
+        return list(self._load())
+
+    def find(self, **conditions) -> list[dict]:
+        """按列值查找事件，例如 find(单号='1001')；有索引的列直接取索引。"""
+        events = self._load()
+        indexed = [c for c in conditions if c in self._index]
+        if indexed:
+            candidates = [events[pos] for pos in self._index[indexed[0]].get(conditions[indexed[0]], ())]
+        else:
+            candidates = events
+        return [e for e in candidates if all(e.get(c, '') == v for c, v in conditions.items())]
+
+    def grouped_by_order(self) -> dict:
+        """返回 {单号: [事件, ...]}。"""
+        events = self._load()
+        return {order: [events[pos] for pos in positions]
+                for order, positions in self._index['单号'].items()}
+
+    def rewrite(self, events: list[dict]):
+        """通过临时文件原子地重写全部事件。"""
+        fd, temp_name = tempfile.mkstemp(prefix=".tmp_outbound_", suffix=".csv",
+                                         dir=os.path.dirname(self.path))
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding="gb2312") as f:
+                writer = csv.DictWriter(f, fieldnames=EVENT_HEADER)
+                writer.writeheader()
+                writer.writerows(events)
+            os.replace(temp_name, self.path)
+        except Exception:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+        self._events = None
+
+    def remove_orders(self, order_numbers):
+        """删除指定单号的全部出库事件。"""
+        targets = set(order_numbers)
+        events = self._load()
+        if not any(o in self._index['单号'] for o in targets):
+            return
+        self.rewrite([e for e in events if e['单号'] not in targets])
+
+    def rename(self, new_csv_path: str):
+        new = OutboundEventStore(new_csv_path)
+        if self.exists() and not new.exists():
+            os.rename(self.path, new.path)
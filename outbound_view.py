@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from tree_rows import insert_row, ProgressiveLoader
 
 # 尝试导入 pypinyin，用于拼音首字母搜索
 try:
@@ -14,7 +15,11 @@ class OutboundView(ttk.Frame):
         self.controller = controller
         self.checked = set()
         self.outbound_quantities = {}  # 存储每个item的出库数量
+        self.all_records = {}
+        # 入库快递单号 → 其中有剩余数量的记录条数（只统计出现多次的快递单号），用于高亮
+        self._stock_by_courier = {}
         self.create_widgets()
+        self._loader = ProgressiveLoader(self.tree)
 
     def create_widgets(self):
         # 顶部标题和搜索框
@@ -238,6 +243,7 @@ class OutboundView(ttk.Frame):
         self.lbl_selected_count.config(text=f"已选中 {len(self.checked)} 条")
 
     def select_all(self):
+        self._loader.finish()
         for it in self.tree.get_children():
             if it not in self.checked:
                 self.checked.add(it)
@@ -263,6 +269,8 @@ class OutboundView(ttk.Frame):
         if not self.checked:
             messagebox.showwarning("提示", "请先勾选至少一条记录！")
             return
+        # 勾选的行可能还在分批加载中，先插完再按行读取单号
+        self._loader.finish()
 
         # 1) 先一次性读取所有被勾选项的单号和出库数量
         order_quantities = []
@@ -321,16 +329,8 @@ class OutboundView(ttk.Frame):
                 
                 # 判断是全部出库还是分数量出库
                 if remaining_qty and qty >= remaining_qty:
-                    # 全部出库
-                    updated = {
-                        '出库状态': '全部出库',
-                        '出库档口': counter,
-                        '快递单号': tracking_number,
-                        '剩余数量': '0',
-                        '剩余价值': '0.00',
-                        '利润': ''
-                    }
-                    if self.controller.model.update_record(order, updated):
+                    # 全部出库（同样记录出库事件）
+                    if self.controller.handle_full_outbound(order, tracking_number, counter):
                         cnt += 1
                 else:
                     # 分数量出库
@@ -340,8 +340,6 @@ class OutboundView(ttk.Frame):
                         messagebox.showwarning("提示", f"单号 {order} 出库失败，可能是数量不足或数据错误！")
                         return
 
-        messagebox.showinfo("提示", f"共处理出库 {cnt} 条记录")
-
         # 3) 清空输入与勾选
         for w in self.entries.values():
             if isinstance(w, ttk.Entry):
@@ -352,27 +350,12 @@ class OutboundView(ttk.Frame):
         self.outbound_quantities.clear()  # 清空出库数量记录
         self._update_selected_count()
 
-        # 4) 最后统一刷新所有页面
+        # 4) 最后统一刷新所有页面：与逐条出库时的刷新请求合并，
+        #    在提示框弹出后的空闲时只重绘一次
         self.controller.refresh_inventory_list()
+        messagebox.showinfo("提示", f"共处理出库 {cnt} 条记录")
 
-    def update_inventory_list(self, recs):
-        # 统计相同"入库快递单号"条数用于高亮
-        counts = {}
-        for r in recs:
-            # 只显示有剩余数量的记录
-            remaining_qty = int(r.get('剩余数量', '') or r.get('商品数量', '0'))
-            if remaining_qty > 0:
-                key = r.get("入库快递单号", "")
-                counts[key] = counts.get(key, 0) + 1
-
-        self.tree.delete(*self.tree.get_children())
-        self.checked.clear()
-        self.outbound_quantities.clear()  # 清空出库数量记录
-        
-        # 保存原始数据用于搜索
-        self.all_records = []
-        
-        # 获取当前显示的列
+    def _display_columns(self):
         display_cols = self.controller.settings_model.get_display_columns('outbound')
         if not display_cols:
             display_cols = ["选中", "单号", "商品名称", "商品数量", "剩余数量", "剩余价值", "颜色/配置", "货商姓名", "入库时间"]
@@ -384,36 +367,151 @@ class OutboundView(ttk.Frame):
                 display_cols.insert(idx, "出库数量")
             else:
                 display_cols.insert(0, "出库数量")
-        
+        return display_cols
+
+    @staticmethod
+    def _remaining(r) -> int:
+        return int(r.get('剩余数量', '') or r.get('商品数量', '0'))
+
+    def _row_values(self, r, display_cols, iid=None):
+        # 根据配置的列构建显示数据；已勾选的行保留勾选和出库数量
+        checked = iid in self.checked
+        vals = []
+        for col in display_cols:
+            if col == "选中":
+                vals.append("☑" if checked else "☐")
+            elif col == "出库数量":
+                vals.append(str(self.outbound_quantities.get(iid, "")) if checked else "")
+            elif col == "剩余数量":
+                vals.append(r.get('剩余数量', '') or r.get('商品数量', ''))
+            elif col == "剩余价值":
+                vals.append(r.get('剩余价值', '') or r.get('结算价', ''))
+            else:
+                vals.append(r.get(col, ""))
+        return tuple(vals)
+
+    def _row_tags(self, r, iid=None):
+        if iid in self.checked or self._stock_by_courier.get(r.get("入库快递单号", ""), 0) > 1:
+            return ("selected",)
+        return ()
+
+    def _matches_search(self, r, search_text: str) -> bool:
+        if not search_text:
+            return True
+        # 检查所有相关字段
+        for field in ["单号", "商品名称", "颜色/配置", "货商姓名", "入库时间", "入库快递单号"]:
+            if search_text in str(r.get(field, "")).lower():
+                return True
+        # 如果启用了拼音搜索，还检查拼音首字母
+        if _HAS_PYPINYIN:
+            for field in ["商品名称", "货商姓名"]:
+                value = r.get(field, "")
+                if value:
+                    pinyin_initials = ''.join([p[0] for p in lazy_pinyin(value)])
+                    if search_text in pinyin_initials.lower():
+                        return True
+        return False
+
+    def update_inventory_list(self, recs):
+        # 统计相同"入库快递单号"条数用于高亮：只有出现多次的快递单号才可能高亮，
+        # 通过索引取出这些快递单号下的记录，统计其中有剩余数量的条数
+        model = self.controller.model
+        counts = {}
+        for key, n in model.count_by("入库快递单号").items():
+            if n > 1:
+                counts[key] = sum(
+                    1 for r in model.find_by("入库快递单号", key)
+                    if self._remaining(r) > 0
+                )
+        self._stock_by_courier = counts
+
+        # 保存原始数据用于搜索：{行 iid（单号）: 记录}，只保存有剩余数量的记录
+        self.all_records = {}
+        seen = set()
         for r in recs:
-            # 只显示有剩余数量的记录
-            remaining_qty = int(r.get('剩余数量', '') or r.get('商品数量', '0'))
-            if remaining_qty <= 0:
+            if self._remaining(r) <= 0:
                 continue
-                
-            # 保存记录用于搜索
-            self.all_records.append(r)
-            
-            tag = ("selected",) if counts.get(r.get("入库快递单号", ""), 0) > 1 else ()
-            # 计算剩余数量和剩余价值
-            remaining_qty_str = r.get('剩余数量', '') or r.get('商品数量', '')
-            remaining_value = r.get('剩余价值', '') or r.get('结算价', '')
-            
-            # 根据配置的列构建显示数据
-            vals = []
-            for col in display_cols:
-                if col == "选中":
-                    vals.append("☐")
-                elif col == "出库数量":
-                    vals.append("")  # 默认为空，选中后才显示
-                elif col == "剩余数量":
-                    vals.append(remaining_qty_str)
-                elif col == "剩余价值":
-                    vals.append(remaining_value)
-                else:
-                    vals.append(r.get(col, ""))
-            
-            self.tree.insert("", tk.END, values=tuple(vals), tags=tag)
+            order = r.get("单号", "")
+            if order and order not in seen:
+                seen.add(order)
+                self.all_records[order] = r
+            else:
+                # 重复单号的行没有固定的 iid，按位置区分
+                self.all_records[("dup", len(self.all_records))] = r
+        self._render()
+
+    def _render(self):
+        """
+        按当前搜索条件整体重绘（第一屏立即显示，其余分批插入）；
+        仍在列表中的行保留勾选和出库数量。
+        """
+        search_text = self.ent_search.get().strip().lower()
+        display_cols = self._display_columns()
+        rows = [(key if isinstance(key, str) else None, r) for key, r in self.all_records.items()
+                if self._matches_search(r, search_text)]
+        kept = {order: r for order, r in rows if order in self.checked}
+        # 出库数量不超过最新的剩余数量
+        self.checked = set(kept)
+        self.outbound_quantities = {it: min(q, self._remaining(kept[it]))
+                                    for it, q in self.outbound_quantities.items() if it in kept}
+
+        def insert(row):
+            order, r = row
+            insert_row(self.tree, tk.END, order, self._row_values(r, display_cols, order), self._row_tags(r, order))
+        self._loader.start(rows, insert)
+        self._update_selected_count()
+
+    def apply_changes(self, changes):
+        """
+        按记录级变更修补列表：只增删改对应单号的行，剩余数量为 0 的行移除；
+        其余行不重绘，勾选、出库数量和滚动位置保持不变。
+        """
+        # 分批加载尚未完成时先插完，避免按单号修补时找不到行
+        self._loader.finish()
+        search_text = self.ent_search.get().strip().lower()
+        display_cols = self._display_columns()
+        deltas = {}   # 受影响的入库快递单号 → 其中有剩余数量的条数的变化
+        for c in changes:
+            for r, delta in ((c.old, -1), (c.new, 1)):
+                if r is not None:
+                    key = r.get("入库快递单号", "")
+                    deltas[key] = deltas.get(key, 0) + (delta if self._remaining(r) > 0 else 0)
+
+            order = c.order
+            if c.new is None or self._remaining(c.new) <= 0:
+                self.all_records.pop(order, None)
+            else:
+                self.all_records[order] = c.new
+            if c.new is None or order not in self.all_records or not self._matches_search(c.new, search_text):
+                if self.tree.exists(order):
+                    self.tree.delete(order)
+                self.checked.discard(order)
+                self.outbound_quantities.pop(order, None)
+                continue
+            if order in self.outbound_quantities:
+                self.outbound_quantities[order] = min(self.outbound_quantities[order], self._remaining(c.new))
+            vals = self._row_values(c.new, display_cols, order)
+            if self.tree.exists(order):
+                self.tree.item(order, values=vals)
+            else:
+                insert_row(self.tree, tk.END, order, vals)
+
+        # 高亮：有剩余数量的条数跨过 1 的快递单号重新标记其全部行，其余只标记本次变更的行
+        model = self.controller.model
+        counts = self._stock_by_courier
+        for key, delta in deltas.items():
+            same = model.find_by("入库快递单号", key)
+            after = sum(1 for r in same if self._remaining(r) > 0)
+            before = counts.get(key, after - delta)
+            counts[key] = after
+            if (before > 1) != (after > 1):
+                rows = [(r.get("单号", ""), r) for r in same]
+            else:
+                rows = [(c.order, c.new) for c in changes
+                        if c.new is not None and c.new.get("入库快递单号", "") == key]
+            for order, r in rows:
+                if self.tree.exists(order):
+                    self.tree.item(order, tags=self._row_tags(r, order))
         self._update_selected_count()
     
     def refresh_columns(self):
@@ -454,97 +552,5 @@ class OutboundView(ttk.Frame):
                 cb.current(0)
                 
     def search_inventory(self):
-        """搜索库存记录"""
-        search_text = self.ent_search.get().strip().lower()
-        if not search_text:
-            # 如果搜索框为空，显示所有记录
-            self.tree.delete(*self.tree.get_children())
-            self.checked.clear()
-            
-            for r in self.all_records:
-                # 获取当前显示的列
-                display_cols = self.controller.settings_model.get_display_columns('outbound')
-                if not display_cols:
-                    display_cols = ["选中", "单号", "商品名称", "商品数量", "剩余数量", "剩余价值", "颜色/配置", "货商姓名", "入库时间"]
-                
-                # 确保"出库数量"列存在
-                if "出库数量" not in display_cols:
-                    if "选中" in display_cols:
-                        idx = display_cols.index("选中") + 1
-                        display_cols.insert(idx, "出库数量")
-                    else:
-                        display_cols.insert(0, "出库数量")
-                
-                # 根据配置的列构建显示数据
-                vals = []
-                for col in display_cols:
-                    if col == "选中":
-                        vals.append("☐")
-                    elif col == "出库数量":
-                        vals.append("")  # 默认为空
-                    elif col == "剩余数量":
-                        vals.append(r.get('剩余数量', '') or r.get('商品数量', ''))
-                    elif col == "剩余价值":
-                        vals.append(r.get('剩余价值', '') or r.get('结算价', ''))
-                    else:
-                        vals.append(r.get(col, ""))
-                vals = tuple(vals)
-                self.tree.insert("", tk.END, values=vals)
-            self._update_selected_count()
-            return
-            
-        # 清空当前显示
-        self.tree.delete(*self.tree.get_children())
-        self.checked.clear()
-        
-        # 搜索所有字段
-        for r in self.all_records:
-            # 检查所有相关字段
-            found = False
-            for field in ["单号", "商品名称", "颜色/配置", "货商姓名", "入库时间", "入库快递单号"]:
-                value = str(r.get(field, "")).lower()
-                if search_text in value:
-                    found = True
-                    break
-                    
-            # 如果启用了拼音搜索，还检查拼音首字母
-            if not found and _HAS_PYPINYIN:
-                for field in ["商品名称", "货商姓名"]:
-                    value = r.get(field, "")
-                    if value:
-                        pinyin_initials = ''.join([p[0] for p in lazy_pinyin(value)])
-                        if search_text in pinyin_initials.lower():
-                            found = True
-                            break
-            
-            if found:
-                # 获取当前显示的列
-                display_cols = self.controller.settings_model.get_display_columns('outbound')
-                if not display_cols:
-                    display_cols = ["选中", "单号", "商品名称", "商品数量", "剩余数量", "剩余价值", "颜色/配置", "货商姓名", "入库时间"]
-                
-                # 确保"出库数量"列存在
-                if "出库数量" not in display_cols:
-                    if "选中" in display_cols:
-                        idx = display_cols.index("选中") + 1
-                        display_cols.insert(idx, "出库数量")
-                    else:
-                        display_cols.insert(0, "出库数量")
-                
-                # 根据配置的列构建显示数据
-                vals = []
-                for col in display_cols:
-                    if col == "选中":
-                        vals.append("☐")
-                    elif col == "出库数量":
-                        vals.append("")  # 默认为空
-                    elif col == "剩余数量":
-                        vals.append(r.get('剩余数量', '') or r.get('商品数量', ''))
-                    elif col == "剩余价值":
-                        vals.append(r.get('剩余价值', '') or r.get('结算价', ''))
-                    else:
-                        vals.append(r.get(col, ""))
-                vals = tuple(vals)
-                self.tree.insert("", tk.END, values=vals)
-                
-        self._update_selected_count()
+        """搜索库存记录（搜索框为空时显示所有记录）"""
+        self._render()
@@ -0,0 +1,100 @@
+import sys
+from collections.abc import Mapping
+
+
+class Record(Mapping):
+    """
+    只读的紧凑记录：各列的值按 FIELDS 的顺序保存在一个元组中，
+    可以像 dict 一样 r['列名']、r.get()、dict(r)、遍历，但不能直接修改。
+
+    子类给出 FIELDS（列名）和 INTERNED（取值重复很多的列，加载时驻留字符串，
+    相同的货商、状态等在所有记录间共用同一个对象）。
+    需要修改时用 updated() 得到新记录，或 dict(r) 复制后再改。
+    """
+    __slots__ = ('_values',)
+    FIELDS = ()
+    INTERNED = ()
+    _POS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(cls.FIELDS)
+        cls._POS = {name: i for i, name in enumerate(cls.FIELDS)}
+        cls._INTERNED_POS = [cls._POS[name] for name in cls.INTERNED if name in cls._POS]
+
+    def __init__(self, values: tuple):
+        self._values = values
+
+    @classmethod
+    def _intern(cls, values: list) -> list:
+        for i in cls._INTERNED_POS:
+            values[i] = sys.intern(values[i])
+        return values
+
+    @classmethod
+    def from_mapping(cls, mapping) -> "Record":
+        """由 dict（或其他记录）构造；缺失或为 None 的列记为空字符串，其余转为字符串。"""
+        if type(mapping) is cls:
+            return mapping
+        get = mapping.get
+        values = ['' if get(k) is None else str(get(k)) for k in cls.FIELDS]
+        return cls(tuple(cls._intern(values)))
+
+    @classmethod
+    def loader(cls, header: list):
+        """
+        返回把 CSV 行（按 header 排列的字符串列表）转换为记录的函数。
+        header 中没有的列、行中缺少的单元格记为空字符串，多余的列忽略。
+        """
+        pos = {name: i for i, name in enumerate(header)}
+        picks = [pos.get(name) for name in cls.FIELDS]
+        width = len(cls.FIELDS)
+        intern = cls._intern
+        if picks == list(range(width)):
+            # 表头与 FIELDS 完全一致：整行直接作为值
+            def load(row):
+                if len(row) != width:
+                    row = (row + [''] * width)[:width]
+                return cls(tuple(intern(row)))
+        else:
+            def load(row):
+                n = len(row)
+                return cls(tuple(intern([row[i] if i is not None and i < n else '' for i in picks])))
+        return load
+
+    def updated(self, fields: dict) -> "Record":
+        """返回修改了 fields 中各列的新记录（None 记为空字符串），原记录不变。"""
+        values = list(self._values)
+        for k, v in fields.items():
+            values[self._POS[k]] = '' if v is None else str(v)
+        return type(self)(tuple(self._intern(values)))
+
+    def as_tuple(self) -> tuple:
+        """按 FIELDS 顺序返回全部值。"""
+        return self._values
+
+    def copy(self) -> dict:
+        """返回可以修改的 dict 副本。"""
+        return dict(zip(self.FIELDS, self._values))
+
+    def __getitem__(self, key):
+        return self._values[self._POS[key]]
+
+    def get(self, key, default=None):
+        i = self._POS.get(key)
+        return default if i is None else self._values[i]
+
+    def __contains__(self, key):
+        return key in self._POS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __reduce__(self):
+        return (type(self), (self._values,))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.copy()!r})"
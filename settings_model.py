@@ -3,6 +3,16 @@ import sys
 import json
 
 class SettingsModel:
+    # 数据存储方式的默认配置
+    DEFAULT_STORAGE = {
+        'backend': 'csv',                 # 'csv' 或 'sqlite'（需先运行 migrate_to_sqlite.py）
+        'journal_mode': False,            # True：修改追加到变更日志，后台合并回 CSV
+        'journal_max_bytes': 1024 * 1024, # 变更日志超过该大小后合并
+        'journal_max_age': 300,           # 最早一条未合并变更超过该秒数后合并
+        'archive_after_days': 0,          # >0：启动时归档入库超过该天数且已全部出库/卖出的记录
+        'async_writes': False             # 需手动开启；True：修改先更新内存，由后台线程合并写入磁盘（写入前崩溃会丢失修改）
+    }
+
     def __init__(self):
         # 确定基础目录：脚本目录或 exe 所在目录
         if getattr(sys, 'frozen', False):
@@ -43,7 +53,8 @@ class SettingsModel:
                 'inbound_quantity': 1,
                 'inbound_price': 0,
                 'outbound_quantity_mode': 'one'  # 'one' 或 'all'
-            }
+            },
+            'storage': dict(self.DEFAULT_STORAGE)
         }
             self._save_settings()
 
@@ -64,6 +75,12 @@ class SettingsModel:
         if 'outbound_quantity_mode' not in self.settings.get('field_defaults', {}):
             self.settings['field_defaults']['outbound_quantity_mode'] = 'one'
             self._save_settings()
+        # 确保存储配置存在
+        storage = self.settings.setdefault('storage', {})
+        missing = {k: v for k, v in self.DEFAULT_STORAGE.items() if k not in storage}
+        if missing:
+            storage.update(missing)
+            self._save_settings()
 
     # --- 供应商 ---
     def get_suppliers(self):
@@ -261,3 +278,15 @@ class SettingsModel:
         """设置出库数量默认值模式：'one'（一件）或 'all'（全部库存）"""
         if mode in ['one', 'all']:
             self.set_field_default('outbound_quantity_mode', mode)
+
+    # -------- 存储配置管理 --------
+    def get_storage_settings(self) -> dict:
+        """获取数据存储配置（存储后端、日志模式及合并阈值）"""
+        storage = dict(self.DEFAULT_STORAGE)
+        storage.update(self.settings.get('storage', {}))
+        return storage
+
+    def set_storage_setting(self, key: str, value):
+        """设置单项数据存储配置"""
+        self.settings.setdefault('storage', {})[key] = value
+        self._save_settings()
@@ -148,6 +148,9 @@ class SettingsView(ttk.Frame):
         ttk.Button(btn_fr, text="重命名表", command=self._on_rename_table).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_fr, text="删除表",    command=self._on_delete_table).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_fr, text="切换表",    command=self._on_switch_table).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_fr, text="检查重复单号", command=self._on_check_duplicates).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_fr, text="归档已出库记录", command=self._on_archive_closed).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_fr, text="迁移旧版出库记录", command=self._on_migrate_outbound).pack(side=tk.LEFT, padx=5)
 
         self._refresh_tables()
         return page
@@ -195,6 +198,52 @@ class SettingsView(ttk.Frame):
         self.controller.switch_table(name)
         self._refresh_tables()
 
+    def _on_check_duplicates(self):
+        # 检查当前使用中的表
+        dups = self.controller.find_duplicate_orders()
+        if not dups:
+            messagebox.showinfo("提示", "当前表没有重复单号")
+            return
+        extra = sum(dups.values()) - len(dups)
+        sample = "\n".join(f"{o}：{n} 条" for o, n in list(dups.items())[:5])
+        if not messagebox.askyesno("发现重复单号",
+                                   f"共 {len(dups)} 个单号重复：\n{sample}\n\n"
+                                   f"是否为其余 {extra} 条记录重新分配单号？（每个单号保留第一条）"):
+            return
+        changes = self.controller.repair_duplicate_orders()
+        if changes is None:
+            messagebox.showerror("错误", "修复失败")
+        else:
+            messagebox.showinfo("提示", f"已为 {len(changes)} 条记录重新分配单号")
+
+    def _on_migrate_outbound(self):
+        # 迁移当前使用中的表
+        if not hasattr(self.controller.model, 'migrate_outbound_events'):
+            messagebox.showinfo("提示", "当前存储方式不需要迁移")
+            return
+        if not messagebox.askyesno("确认", "把当前表“出库记录”列中的旧版数据转为出库事件并清空该列？\n"
+                                   "迁移前会在 data 目录中备份整张表；仍在使用旧版程序的电脑迁移后将看不到这些出库记录。"):
+            return
+        count = self.controller.migrate_outbound_events()
+        if count is None:
+            messagebox.showerror("错误", "迁移失败，数据表未修改")
+        else:
+            messagebox.showinfo("提示", f"已迁移 {count} 条出库记录")
+
+    def _on_archive_closed(self):
+        # 归档当前使用中的表
+        if not hasattr(self.controller.model, 'archive_closed_records'):
+            messagebox.showinfo("提示", "当前存储方式不支持归档")
+            return
+        if not messagebox.askyesno("确认", "把当前表中“全部出库”“卖出”的记录移入按月归档文件？\n"
+                                   "归档后入库、出库页不再显示这些记录，数据查询页按入库日期范围查询。"):
+            return
+        count = self.controller.archive_closed_records()
+        if count is None:
+            messagebox.showerror("错误", "归档失败")
+        else:
+            messagebox.showinfo("提示", f"已归档 {count} 条记录")
+
     # --- 条形码映射页 ---
     def _create_mapping_page(self):
         page = ttk.Frame(self.nb)
@@ -0,0 +1,139 @@
+from array import array
+
+from numeric_columns import parse_number
+from time_index import parse_timestamp, NO_TIME
+
+# 尝试导入 pypinyin，中文按拼音排序；没有安装时按字符编码排序
+try:
+    from pypinyin import lazy_pinyin
+    _HAS_PYPINYIN = True
+except ImportError:
+    _HAS_PYPINYIN = False
+
+
+def column_kind(values) -> str:
+    """列的排序类型：非空值全部是数字为 'num'，全部是时间为 'time'，否则为 'str'。"""
+    values = [v for v in values if v not in (None, '')]
+    if values and all(parse_number(v)[1] for v in values):
+        return 'num'
+    if values and all(parse_timestamp(str(v)) != NO_TIME for v in values):
+        return 'time'
+    return 'str'
+
+
+def collate(value: str) -> str:
+    """字符串的排序键：不分大小写，有 pypinyin 时中文按拼音。"""
+    if _HAS_PYPINYIN and not value.isascii():
+        return ' '.join(lazy_pinyin(value)).lower()
+    return value.lower()
+
+
+def sort_keys(values, kind: str) -> tuple:
+    """按 kind 把一列值转换为 (是否为空, 排序键)；空值及无法识别的值不论升降序都排在最后。"""
+    if kind == 'num':
+        parsed = [parse_number(v) for v in values]
+        return bytearray(null for _, _, null in parsed), [x for x, _, _ in parsed]
+    if kind == 'time':
+        keys = [parse_timestamp(str(v)) for v in values]
+        return bytearray(t == NO_TIME for t in keys), keys
+    return bytearray(v in (None, '') for v in values), [collate(str(v)) for v in values]
+
+
+def click_sort(spec: list, column: str, ascending: bool, multi: bool) -> list:
+    """
+    点击表头后的排序条件 [(列, 是否升序), ...]。
+    单击只按该列排序；按住 Shift 时把该列追加为次要排序列，已在其中时切换它的方向。
+    """
+    if not multi:
+        return [(column, ascending)]
+    spec = list(spec)
+    for i, (c, asc) in enumerate(spec):
+        if c == column:
+            spec[i] = (c, not asc)
+            return spec
+    return spec + [(column, True)]
+
+
+def heading_text(column: str, spec: list) -> str:
+    """表头文字，排序列加上方向箭头，多列排序时再加上序号。"""
+    for i, (c, asc) in enumerate(spec):
+        if c == column:
+            arrow = "▲" if asc else "▼"
+            return f"{column} {arrow}{i + 1 if len(spec) > 1 else ''}"
+    return column
+
+
+class TableSorter:
+    """
+    表格排序。每列的排序键（数值、时间或按拼音的字符串）在加载数据后第一次按该列排序时计算一次，
+    各排序条件的结果（每行的名次，即排列的逆）也缓存起来，再次点击同一表头、筛选后保持排序时不必重新解析和比较。
+    单行修改或追加用 update 修补该行的排序键，名次下次排序时重算。
+    """
+
+    def __init__(self):
+        self.load([])
+
+    def load(self, rows: list):
+        """设置要排序的全部行（复制一份；增删行后需重新调用，单行修改用 update）。"""
+        self.rows = list(rows)
+        self._pos = {id(d): i for i, d in enumerate(rows)}
+        self._keys = {}   # 列名 → 按位置排列的 (是否为空, 排序键)
+        self._kinds = {}  # 列名 → 排序类型
+        self._ranks = {}  # 排序条件 → 各位置在排序结果中的名次
+
+    def update(self, pos: int, row):
+        """把第 pos 行换成 row（pos 等于行数时追加）。"""
+        if pos == len(self.rows):
+            self.rows.append(row)
+        else:
+            self._pos.pop(id(self.rows[pos]), None)
+            self.rows[pos] = row
+        self._pos[id(row)] = pos
+        for column in list(self._keys):
+            v, kind = row.get(column, ""), self._kinds[column]
+            # 新值可能改变整列的类型时丢弃该列的键，下次用到时重算
+            stale = kind == 'str' if v in (None, '') else column_kind([v]) != kind
+            if stale:
+                del self._keys[column]
+                continue
+            empty, keys = self._keys[column]
+            (e,), (k,) = sort_keys([v], kind)
+            if pos == len(keys):
+                empty.append(e)
+                keys.append(k)
+            else:
+                empty[pos], keys[pos] = e, k
+        self._ranks = {}
+
+    def _column_keys(self, column: str) -> tuple:
+        keys = self._keys.get(column)
+        if keys is None:
+            values = [d.get(column, "") for d in self.rows]
+            kind = self._kinds[column] = column_kind(values)
+            keys = self._keys[column] = sort_keys(values, kind)
+        return keys
+
+    def ranks(self, spec) -> array:
+        """spec（[(列, 是否升序), ...]）对应的名次：ranks[位置] 为该行排序后的序号。"""
+        spec = tuple(spec)
+        ranks = self._ranks.get(spec)
+        if ranks is None:
+            order = list(range(len(self.rows)))
+            # 稳定排序：从次要列到主要列依次排序
+            for column, asc in reversed(spec):
+                empty, keys = self._column_keys(column)
+                order.sort(key=keys.__getitem__, reverse=not asc)
+                order.sort(key=empty.__getitem__)
+            ranks = array('q', bytes(8 * len(order)))
+            for n, i in enumerate(order):
+                ranks[i] = n
+            self._ranks[spec] = ranks
+        return ranks
+
+    def sort(self, rows: list, spec) -> list:
+        """按 spec 排序 rows（load 的行中的一部分，如筛选结果），返回新列表；不认识的行排在最后。"""
+        if not spec:
+            return list(rows)
+        ranks, pos = self.ranks(spec), self._pos
+        last = len(ranks)
+        return sorted(rows, key=lambda d: ranks[pos[id(d)]] if id(d) in pos else last)
@@ -0,0 +1,458 @@
+import os
+import sys
+import sqlite3
+import traceback
+import csv
+from model import InventoryModel, build_full_outbound, build_partial_outbound, check_columns
+from outbound_events import EVENT_HEADER, parse_legacy_outbound, format_outbound_events
+
+
+def _to_number(value):
+    """SQL 中使用的数值转换：空值按 0，无法解析时返回 NULL。"""
+    if value is None or value == '':
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class SQLiteInventoryModel:
+    """
+    以本地 SQLite 数据库（data/inventory.db）存储库存记录的模型，
+    方法与 InventoryModel 保持一致，可直接替换使用。
+
+    所有数据表共用一张 records 表，以“表名”列区分；
+    单号、快递单号、入库快递单号、货商姓名、数字条码、入库时间、商品名称均建有索引。
+    出库事件保存在 outbound_events 表中，按单号、快递单号、出库档口建有索引。
+    """
+    CSV_HEADER = InventoryModel.CSV_HEADER
+    INDEXED_COLUMNS = ['单号', '快递单号', '入库快递单号', '货商姓名', '数字条码', '入库时间', '商品名称']
+
+    def __init__(self, table_name="default", db_path=None):
+        if getattr(sys, 'frozen', False):
+            base = os.path.dirname(sys.executable)
+        else:
+            base = os.path.dirname(__file__)
+        self.data_dir = os.path.join(base, 'data')
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.filename = db_path or os.path.join(self.data_dir, 'inventory.db')
+        self.last_error = ""
+        self.conn = sqlite3.connect(self.filename)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.create_function("to_num", 1, _to_number, deterministic=True)
+        self._create_schema()
+        self.set_table(table_name)
+
+    def _record_error(self, context: str, e: Exception, extra: dict | None = None):
+        try:
+            msg = f"{context}: {type(e).__name__}: {e}"
+            if extra:
+                details = "; ".join(f"{k}={v}" for k, v in extra.items())
+                msg = f"{msg}; {details}"
+            self.last_error = msg
+            log_path = os.path.join(self.data_dir, "diagnostic.log")
+            with open(log_path, "a", encoding="utf-8") as lf:
+                lf.write(f"[diagnostic] db={self.filename} table={self.table_name} | {msg}\n")
+                lf.write(traceback.format_exc())
+                lf.write("\n")
+        except Exception:
+            self.last_error = f"{context}: {type(e).__name__}: {e}"
+
+    @staticmethod
+    def _q(column: str) -> str:
+        return '"' + column.replace('"', '""') + '"'
+
+    def _create_schema(self):
+        cols = ", ".join(f"{self._q(c)} TEXT NOT NULL DEFAULT ''" for c in self.CSV_HEADER)
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS records ("
+                f"seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                f"表名 TEXT NOT NULL, {cols})"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS tables (表名 TEXT PRIMARY KEY)")
+            for i, c in enumerate(self.INDEXED_COLUMNS):
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_records_{i} ON records (表名, {self._q(c)})"
+                )
+            event_cols = ", ".join(f"{self._q(c)} TEXT NOT NULL DEFAULT ''" for c in EVENT_HEADER)
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS outbound_events ("
+                f"seq INTEGER PRIMARY KEY AUTOINCREMENT, 表名 TEXT NOT NULL, {event_cols})"
+            )
+            for i, c in enumerate(['单号', '快递单号', '出库档口']):
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_outbound_{i} ON outbound_events (表名, {self._q(c)})"
+                )
+
+    def _row_to_record(self, row) -> dict:
+        return dict(zip(self.CSV_HEADER, row))
+
+    def _select(self, where: str = "", params: tuple = (), limit: int | None = None) -> list[dict]:
+        cols = ", ".join(self._q(c) for c in self.CSV_HEADER)
+        sql = f"SELECT {cols} FROM records WHERE 表名 = ?"
+        if where:
+            sql += f" AND {where}"
+        sql += " ORDER BY seq"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [self._row_to_record(row) for row in self.conn.execute(sql, (self.table_name,) + params)]
+
+    def _values(self, record: dict) -> list:
+        return ['' if record.get(c) is None else str(record.get(c)) for c in self.CSV_HEADER]
+
+    def set_table(self, table_name: str):
+        """切换使用的表，确保表已登记，并导入旧版“出库记录”列中的数据。"""
+        self.table_name = table_name
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO tables (表名) VALUES (?)", (table_name,))
+            legacy = self.conn.execute(
+                "SELECT seq, 单号, 出库记录 FROM records WHERE 表名 = ? AND 出库记录 != '' ORDER BY seq",
+                (table_name,)
+            ).fetchall()
+            for seq, order, text in legacy:
+                self._insert_events(parse_legacy_outbound(order, text))
+                self.conn.execute("UPDATE records SET 出库记录 = '' WHERE seq = ?", (seq,))
+
+    def invalidate_cache(self):
+        """数据库模式下没有额外缓存，保留该方法以兼容 InventoryModel。"""
+
+    def compact(self) -> bool:
+        """合并 WAL 文件到主数据库。"""
+        try:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return True
+        except sqlite3.Error as e:
+            self._record_error("合并WAL文件时发生错误", e)
+            return False
+
+    def close(self):
+        self.compact()
+        self.conn.close()
+
+    def add_record(self, record: dict) -> bool:
+        """追加一条记录到当前表。"""
+        try:
+            with self.conn:
+                self._insert_many([record])
+            return True
+        except sqlite3.Error as e:
+            self._record_error("添加记录时发生错误", e)
+            return False
+
+    def add_records(self, records: list[dict]) -> bool:
+        """在同一个事务中追加多条记录。"""
+        try:
+            with self.conn:
+                self._insert_many(records)
+            return True
+        except sqlite3.Error as e:
+            self._record_error("添加记录时发生错误", e, {"count": len(records)})
+            return False
+
+    def _insert_many(self, records: list[dict]):
+        placeholders = ", ".join("?" for _ in range(len(self.CSV_HEADER) + 1))
+        cols = ", ".join(["表名"] + [self._q(c) for c in self.CSV_HEADER])
+        self.conn.executemany(
+            f"INSERT INTO records ({cols}) VALUES ({placeholders})",
+            [[self.table_name] + self._values(r) for r in records]
+        )
+
+    def _insert_events(self, events: list[dict]):
+        placeholders = ", ".join("?" for _ in range(len(EVENT_HEADER) + 1))
+        cols = ", ".join(["表名"] + [self._q(c) for c in EVENT_HEADER])
+        self.conn.executemany(
+            f"INSERT INTO outbound_events ({cols}) VALUES ({placeholders})",
+            [[self.table_name] + ['' if e.get(c) is None else str(e.get(c)) for c in EVENT_HEADER]
+             for e in events]
+        )
+
+    def replace_table_records(self, records: list[dict], events: list[dict] = ()) -> bool:
+        """在一个事务中用 records 和出库事件 events 替换当前表的全部数据（用于迁移导入）。"""
+        try:
+            with self.conn:
+                self.conn.execute("DELETE FROM records WHERE 表名 = ?", (self.table_name,))
+                self.conn.execute("DELETE FROM outbound_events WHERE 表名 = ?", (self.table_name,))
+                self._insert_many(records)
+                self._insert_events(events)
+            return True
+        except sqlite3.Error as e:
+            self._record_error("导入记录时发生错误", e, {"count": len(records)})
+            return False
+
+    def _first_seq(self, order_number: str):
+        row = self.conn.execute(
+            "SELECT seq FROM records WHERE 表名 = ? AND 单号 = ? ORDER BY seq LIMIT 1",
+            (self.table_name, order_number)
+        ).fetchone()
+        return row[0] if row else None
+
+    def update_record(self, order_number: str, updated_fields: dict) -> bool:
+        """根据单号更新记录（重复单号只更新第一条），返回 True 表示更新成功。"""
+        try:
+            check_columns({order_number: updated_fields}, self.CSV_HEADER)
+        except ValueError as col_err:
+            self._record_error("更新记录时包含未知的列", col_err, {"order": order_number})
+            return False
+        fields = {k: '' if v is None else str(v) for k, v in updated_fields.items()}
+        try:
+            seq = self._first_seq(order_number)
+            if seq is None:
+                return False
+            if fields:
+                assignments = ", ".join(f"{self._q(k)} = ?" for k in fields)
+                with self.conn:
+                    self.conn.execute(
+                        f"UPDATE records SET {assignments} WHERE seq = ?",
+                        list(fields.values()) + [seq]
+                    )
+            return True
+        except sqlite3.Error as e:
+            self._record_error("更新记录时发生错误", e, {"order": order_number})
+            return False
+
+    def delete_record(self, order_number: str) -> bool:
+        """根据单号删除记录，返回 True 表示删除成功。"""
+        try:
+            with self.conn:
+                cur = self.conn.execute(
+                    "DELETE FROM records WHERE 表名 = ? AND 单号 = ?", (self.table_name, order_number)
+                )
+                self.conn.execute(
+                    "DELETE FROM outbound_events WHERE 表名 = ? AND 单号 = ?", (self.table_name, order_number)
+                )
+            return cur.rowcount > 0
+        except sqlite3.Error as e:
+            self._record_error("删除记录时发生错误", e, {"order": order_number})
+            return False
+
+    def update_records(self, changes: dict) -> bool:
+        """批量更新 {单号: 更新字段}，在同一个事务中提交；不存在的单号会被忽略，包含表头以外的列时不做任何修改。"""
+        try:
+            check_columns(changes, self.CSV_HEADER)
+        except ValueError as col_err:
+            self._record_error("批量更新记录时包含未知的列", col_err, {"count": len(changes)})
+            return False
+        try:
+            with self.conn:
+                for order_number, updated_fields in changes.items():
+                    fields = {k: '' if v is None else str(v) for k, v in updated_fields.items()}
+                    seq = self._first_seq(order_number)
+                    if seq is None or not fields:
+                        continue
+                    assignments = ", ".join(f"{self._q(k)} = ?" for k in fields)
+                    self.conn.execute(
+                        f"UPDATE records SET {assignments} WHERE seq = ?",
+                        list(fields.values()) + [seq]
+                    )
+            return True
+        except sqlite3.Error as e:
+            self._record_error("批量更新记录时发生错误", e, {"count": len(changes)})
+            return False
+
+    def delete_records(self, order_numbers) -> bool:
+        """批量删除记录，在同一个事务中提交；不存在的单号会被忽略。"""
+        try:
+            targets = [(self.table_name, o) for o in set(order_numbers)]
+            with self.conn:
+                self.conn.executemany("DELETE FROM records WHERE 表名 = ? AND 单号 = ?", targets)
+                self.conn.executemany("DELETE FROM outbound_events WHERE 表名 = ? AND 单号 = ?", targets)
+            return True
+        except sqlite3.Error as e:
+            self._record_error("批量删除记录时发生错误", e)
+            return False
+
+    def reassign_duplicate_orders(self, new_order) -> list[tuple[str, str]] | None:
+        """修复重复单号：每个单号保留第一条记录，其余改用 new_order() 生成的新单号。"""
+        try:
+            rows = self.conn.execute(
+                "SELECT seq, 单号 FROM records WHERE 表名 = ? AND 单号 IN "
+                "(SELECT 单号 FROM records WHERE 表名 = ? GROUP BY 单号 HAVING COUNT(*) > 1) "
+                "ORDER BY seq",
+                (self.table_name, self.table_name)
+            ).fetchall()
+            seen = set()
+            changes = []
+            with self.conn:
+                for seq, order in rows:
+                    if order in seen:
+                        new = new_order()
+                        self.conn.execute("UPDATE records SET 单号 = ? WHERE seq = ?", (new, seq))
+                        changes.append((order, new))
+                    else:
+                        seen.add(order)
+            return changes
+        except sqlite3.Error as e:
+            self._record_error("修复重复单号时发生错误", e)
+            return None
+
+    def rename_table(self, old_name: str, new_name: str) -> bool:
+        """重命名表，新表名已存在时返回 False。"""
+        try:
+            exists = self.conn.execute("SELECT 1 FROM tables WHERE 表名 = ?", (new_name,)).fetchone()
+            known = self.conn.execute("SELECT 1 FROM tables WHERE 表名 = ?", (old_name,)).fetchone()
+            if exists or not known:
+                return False
+            with self.conn:
+                self.conn.execute("UPDATE tables SET 表名 = ? WHERE 表名 = ?", (new_name, old_name))
+                self.conn.execute("UPDATE records SET 表名 = ? WHERE 表名 = ?", (new_name, old_name))
+                self.conn.execute("UPDATE outbound_events SET 表名 = ? WHERE 表名 = ?", (new_name, old_name))
+            if self.table_name == old_name:
+                self.table_name = new_name
+            return True
+        except sqlite3.Error as e:
+            self._record_error("重命名表时发生错误", e, {"old": old_name, "new": new_name})
+            return False
+
+    def get_all_records(self) -> list[dict]:
+        """读取并返回当前表的所有记录，每条记录为一个 dict。"""
+        try:
+            return self._select()
+        except sqlite3.Error as e:
+            self._record_error("读取记录时发生错误", e)
+            return []
+
+    def get_record(self, order_number: str) -> dict | None:
+        """通过单号索引取出一条记录，未找到时返回 None。"""
+        try:
+            rows = self._select("单号 = ?", (order_number,), limit=1)
+        except sqlite3.Error as e:
+            self._record_error("读取记录时发生错误", e, {"order": order_number})
+            return None
+        return rows[0] if rows else None
+
+    def find_by(self, column: str, value: str) -> list[dict]:
+        """返回 column 列等于 value 的全部记录（按表中顺序）。"""
+        if column not in self.CSV_HEADER:
+            return []
+        try:
+            return self._select(f"{self._q(column)} = ?", (value,))
+        except sqlite3.Error as e:
+            self._record_error("读取记录时发生错误", e, {"column": column})
+            return []
+
+    def iter_records(self, columns=None, where=None):
+        """
+        逐条产出记录，只查询 columns 指定的列；where 为 {列名: 值} 时作为 SQL 条件，
+        为函数时在读取后逐条判断。
+        """
+        cols = [c for c in (columns or self.CSV_HEADER) if c in self.CSV_HEADER]
+        conditions = where if isinstance(where, dict) else {}
+        predicate = where if callable(where) else None
+        sql = f"SELECT {', '.join(self._q(c) for c in cols)} FROM records WHERE 表名 = ?"
+        for c in conditions:
+            sql += f" AND {self._q(c)} = ?"
+        sql += " ORDER BY seq"
+        try:
+            cursor = self.conn.execute(sql, (self.table_name,) + tuple(conditions.values()))
+            for values in cursor:
+                row = dict(zip(cols, values))
+                if predicate is None or predicate(row):
+                    yield row
+        except sqlite3.Error as e:
+            self._record_error("读取记录时发生错误", e)
+
+    def profit_by(self, column: str) -> dict:
+        """按 column 分组汇总盈亏（行情价格 - 结算价），数据格式错误的记录按 0 计。"""
+        col = self._q(column)
+        sql = (
+            f"SELECT {col}, SUM(CASE WHEN to_num(行情价格) IS NULL OR to_num(结算价) IS NULL "
+            f"THEN 0 ELSE to_num(行情价格) - to_num(结算价) END) "
+            f"FROM records WHERE 表名 = ? GROUP BY {col} ORDER BY MIN(seq)"
+        )
+        try:
+            return {k: v for k, v in self.conn.execute(sql, (self.table_name,))}
+        except sqlite3.Error as e:
+            self._record_error("统计盈亏时发生错误", e, {"column": column})
+            return {}
+
+    def count_by(self, column: str) -> dict:
+        """按 column 分组统计记录条数。"""
+        col = self._q(column)
+        sql = f"SELECT {col}, COUNT(*) FROM records WHERE 表名 = ? GROUP BY {col} ORDER BY MIN(seq)"
+        try:
+            return {k: v for k, v in self.conn.execute(sql, (self.table_name,))}
+        except sqlite3.Error as e:
+            self._record_error("统计条数时发生错误", e, {"column": column})
+            return {}
+
+    def partial_outbound(self, order_number: str, outbound_quantity: int, tracking_number: str, counter: str) -> bool:
+        """处理分数量出库，更新剩余数量和剩余价值，记录出库信息"""
+        old = self.get_record(order_number)
+        if old is None:
+            return False
+        built = build_partial_outbound(old, outbound_quantity, tracking_number, counter)
+        if built is None:
+            return False
+        return self._apply_outbound(order_number, old, *built)
+
+    def full_outbound(self, order_number: str, tracking_number: str, counter: str,
+                      status: str = '全部出库', fields: dict | None = None) -> bool:
+        """整批出库（全部出库或卖出），剩余数量全部出库并记录出库事件"""
+        old = self.get_record(order_number)
+        if old is None:
+            return False
+        try:
+            check_columns({order_number: fields or {}}, self.CSV_HEADER)
+        except ValueError as col_err:
+            self._record_error("出库时包含未知的列", col_err, {"order": order_number})
+            return False
+        built = build_full_outbound(old, tracking_number, counter, status, fields)
+        if built is None:
+            return False
+        return self._apply_outbound(order_number, old, *built)
+
+    def _apply_outbound(self, order_number: str, old: dict, new: dict, event: dict) -> bool:
+        fields = {k: v for k, v in new.items() if old.get(k) != v}
+        try:
+            seq = self._first_seq(order_number)
+            with self.conn:
+                if fields:
+                    assignments = ", ".join(f"{self._q(k)} = ?" for k in fields)
+                    self.conn.execute(
+                        f"UPDATE records SET {assignments} WHERE seq = ?",
+                        list(fields.values()) + [seq]
+                    )
+                self._insert_events([event])
+            return True
+        except sqlite3.Error as e:
+            self._record_error("出库时发生错误", e, {"order": order_number})
+            return False
+
+    def outbound_events(self, **conditions) -> list[dict]:
+        """按条件查询出库事件，例如 outbound_events(快递单号=...)；不带条件时返回全部。"""
+        sql = f"SELECT {', '.join(self._q(c) for c in EVENT_HEADER)} FROM outbound_events WHERE 表名 = ?"
+        params = [self.table_name]
+        for c, v in conditions.items():
+            if c not in EVENT_HEADER:
+                return []
+            sql += f" AND {self._q(c)} = ?"
+            params.append(v)
+        try:
+            return [dict(zip(EVENT_HEADER, row)) for row in self.conn.execute(sql + " ORDER BY seq", params)]
+        except sqlite3.Error as e:
+            self._record_error("读取出库事件时发生错误", e)
+            return []
+
+    def outbound_record_text(self, order_number: str) -> str:
+        """按旧版“出库记录”列的格式返回某单号的出库记录。"""
+        return format_outbound_events(self.outbound_events(单号=order_number))
+
+    def export_csv(self, path: str) -> bool:
+        """把当前表导出为 CSV 文件，“出库记录”列由出库事件生成。"""
+        grouped = {}
+        for e in self.outbound_events():
+            grouped.setdefault(e['单号'], []).append(e)
+        try:
+            with open(path, 'w', newline='', encoding="gb2312") as f:
+                writer = csv.DictWriter(f, fieldnames=self.CSV_HEADER)
+                writer.writeheader()
+                for r in self.get_all_records():
+                    r['出库记录'] = format_outbound_events(grouped.get(r['单号'], []))
+                    writer.writerow(r)
+            return True
+        except Exception as e:
+            self._record_error("导出数据时发生错误", e, {"target": path})
+            return False
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试物化汇总：按差量更新、随表保存、文件未变化时重新打开不解析 CSV"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel, profit_by_records, count_by_records
+from aggregates import TableAggregates
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, supplier, product, settle, market):
+    return make_record(order, '2', 货商姓名=supplier, 商品名称=product, 结算价=settle, 剩余价值=settle, 行情价格=market)
+
+
+def _expected(records):
+    stock = sum(float(r['结算价'] or 0) for r in records if r['出库状态'] != '卖出')
+    return {
+        'rows': len(records),
+        'stock_value': stock,
+        'profit_by_product': profit_by_records(records, '商品名称'),
+        'profit_by_supplier': profit_by_records(records, '货商姓名'),
+        'inbound_by_supplier': count_by_records(records, '货商姓名'),
+    }
+
+
+def _check(model):
+    summary = model.aggregates()
+    expected = _expected(model.get_all_records())
+    for k, v in expected.items():
+        assert summary[k] == v, (k, summary[k], v)
+
+
+def test_aggregates():
+    print("=== 测试物化汇总 ===")
+    for journal in (False, True):
+        table = "test_aggregates"
+        model = fresh_model(table, journal_mode=journal)
+        assert model.add_records([_make_record("1", "A", "X", "10", "15"),
+                                  _make_record("2", "B", "Y", "20", "18"),
+                                  _make_record("3", "A", "X", "30", "40")])
+        _check(model)
+
+        # 增删改、分数量出库后按差量更新
+        assert model.update_record("1", {'货商姓名': 'C', '行情价格': '12'})
+        assert model.partial_outbound("3", 1, "SF1", "档口A")
+        assert model.update_records({"2": {'出库状态': '卖出'}, "3": {'商品名称': 'Z'}})
+        assert model.delete_record("1")
+        _check(model)
+        assert model.aggregates()['profit_by_supplier'] == {'B': -2.0, 'A': 10.0}
+        model.close()
+
+        # 重新打开：文件未变化时直接读取保存的汇总，不解析 CSV
+        reopened = InventoryModel(table, journal_mode=journal)
+        reopened._read_csv = lambda: (_ for _ in ()).throw(AssertionError("不应整表解析"))
+        assert reopened.aggregates() == model.aggregates()
+        assert reopened._records is None
+
+        # 文件在外部被修改后重新统计
+        assert model.add_record(_make_record("4", "D", "W", "5", "9"))
+        model.close()
+        fresh = InventoryModel(table, journal_mode=journal)
+        os.remove(TableAggregates(fresh.filename).path)
+        assert InventoryModel(table, journal_mode=journal).aggregates()['inbound_by_supplier'] == {'B': 1, 'A': 1, 'D': 1}
+        assert reopened.aggregates()['inbound_by_supplier'] == {'B': 1, 'A': 1, 'D': 1}
+        _check(fresh)
+        fresh.close()
+    print("✓ 物化汇总测试通过")
+
+
+if __name__ == "__main__":
+    test_aggregates()
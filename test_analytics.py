@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试分组统计：时间分段、按列分组汇总、按出库时间统计出库事件"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from controller import InventoryController
+from analytics import time_bucket, group_by, outbound_rows
+from numeric_columns import NumericColumns
+import group_by_report
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, supplier, product, day, settle, market, qty='2'):
+    return make_record(order, qty, 货商姓名=supplier, 商品名称=product, 入库时间=f"{day} 10:00:00",
+                       结算价=settle, 单价='5', 剩余价值=settle, 行情价格=market)
+
+
+def test_time_bucket():
+    print("=== 测试时间分段 ===")
+    assert time_bucket("2024-03-05 10:00:00", 'day') == "2024-03-05"
+    assert time_bucket("2024-03-05", 'month') == "2024-03"
+    assert time_bucket("2024-12-30 08:00", 'week') == "2025-W01"
+    assert time_bucket("", 'month') == "未知"
+    assert time_bucket("2024/03/05", 'day') == "未知"
+    print("✓ 时间分段正确")
+
+
+def test_group_by():
+    print("=== 测试分组汇总 ===")
+    records = [_make_record("1", "A", "X", "2024-01-03", "10", "15"),
+               _make_record("2", "B", "X", "2024-01-20", "20", "18"),
+               _make_record("3", "A", "X", "2024-02-01", "30", "40"),
+               _make_record("4", "A", "Y", "2024-02-09", "abc", "50")]
+    cols, data = group_by(records, NumericColumns(records), ['货商姓名'], '入库时间', 'month',
+                          ['结算价', '利润'], ['sum', 'avg'])
+    assert cols == ['入库月', '货商姓名', '条数', '结算价合计', '结算价平均', '利润合计', '利润平均']
+    assert data == [
+        ('2024-01', 'A', '1', '10.00', '10.00', '5.00', '5.00'),
+        ('2024-01', 'B', '1', '20.00', '20.00', '-2.00', '-2.00'),
+        # 无法解析的结算价不计入合计和平均，但仍计入条数
+        ('2024-02', 'A', '2', '30.00', '30.00', '10.00', '10.00'),
+    ], data
+
+    cols, data = group_by(records, NumericColumns(records), ['商品名称'], measures=['商品数量'])
+    assert cols == ['商品名称', '条数', '商品数量合计']
+    assert data == [('X', '3', '6.00'), ('Y', '1', '2.00')], data
+    print("✓ 分组汇总正确")
+
+
+def test_outbound_grouping():
+    print("=== 测试按出库时间统计 ===")
+    events = [{'单号': '1', '出库时间': '2024-03-01 09:00', '出库档口': '档口A', '出库数量': '2', '单价': '5'},
+              {'单号': '2', '出库时间': '2024-03-02 09:00', '出库档口': '档口B', '出库数量': '1', '单价': '7'},
+              {'单号': '9', '出库时间': '2024-03-02 09:00', '出库档口': '档口B', '出库数量': '1', '单价': '7'}]
+    records = {'1': {'商品名称': 'X'}, '2': {'商品名称': 'X'}}
+    rows = outbound_rows(events, records.get)
+    assert len(rows) == 2  # 找不到记录的事件跳过
+    cols, data = group_by(rows, NumericColumns(rows, ['出库数量', '出库金额']), ['商品名称', '出库档口'],
+                          '出库时间', 'month', ['出库数量', '出库金额'])
+    assert cols == ['出库月', '商品名称', '出库档口', '条数', '出库数量合计', '出库金额合计']
+    assert data == [('2024-03', 'X', '档口A', '1', '2.00', '10.00'),
+                    ('2024-03', 'X', '档口B', '1', '1.00', '7.00')], data
+
+    # 通过控制器：出库事件来自模型，日期范围按出库日期筛选
+    table = "test_analytics"
+    model = fresh_model(table)
+    assert model.add_records([_make_record("1", "A", "X", "2024-01-03", "10", "15"),
+                              _make_record("2", "B", "Y", "2024-01-20", "20", "18")])
+    assert model.partial_outbound("1", 1, "SF1", "档口A")
+    assert model.partial_outbound("2", 2, "SF2", "档口B")
+    controller = InventoryController(model, None)
+    spec = {'group_cols': ['商品名称'], 'time_field': '出库时间', 'unit': 'day',
+            'measures': ['出库数量'], 'funcs': ['sum']}
+    cols, data = controller.grouped_summary(spec)
+    assert [row[1:] for row in data] == [('X', '1', '1.00'), ('Y', '1', '2.00')], data
+    assert controller.grouped_summary(spec, start="2099-01-01")[1] == []
+
+    # 整批出库（全部出库、卖出）同样记录出库事件，计入按出库时间的统计
+    assert model.add_record(_make_record("3", "A", "Z", "2024-01-21", "30", "40", qty='3'))
+    assert model.full_outbound("1", "SF3", "档口B")
+    assert model.full_outbound("3", "SF4", "档口A", '卖出', {'快递价格': '12'})
+    assert model.get_record("1")['剩余数量'] == '0' and model.get_record("1")['出库状态'] == '全部出库'
+    assert model.get_record("3")['出库状态'] == '卖出' and model.get_record("3")['快递价格'] == '12'
+    assert not model.full_outbound("1", "SF5", "档口B")  # 已没有剩余数量
+    spec = {'group_cols': ['出库档口'], 'time_field': '出库时间', 'unit': 'month',
+            'measures': ['出库数量'], 'funcs': ['sum']}
+    assert [row[1:] for row in controller.grouped_summary(spec)[1]] == [('档口A', '2', '4.00'), ('档口B', '2', '3.00')]
+    assert [e['单号'] for e in model.outbound_events(快递单号="SF4")] == ["3"]
+
+    # 按入库时间统计直接用模型的列式数据
+    spec = {'group_cols': ['货商姓名'], 'time_field': None, 'measures': ['结算价'], 'funcs': ['sum']}
+    assert controller.grouped_summary(spec)[1] == [('A', '2', '40.00'), ('B', '1', '20.00')]
+    model.close()
+    print("✓ 按出库时间统计正确")
+
+
+def test_group_by_report():
+    # 各汇总方式结果一致（耗时见 python group_by_report.py）
+    results = group_by_report.main(2000)
+    expected = results['逐行累加'][1]
+    for _, totals in results.values():
+        assert [[[round(x, 6) for x in part] for part in t] for t in totals] == \
+               [[[round(x, 6) for x in part] for part in t] for t in expected]
+
+
+if __name__ == "__main__":
+    test_time_bucket()
+    test_group_by()
+    test_outbound_grouping()
+    test_group_by_report()
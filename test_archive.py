@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试已关闭记录的按月归档及按日期范围查询"""
+
+import os
+import sys
+import shutil
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from controller import InventoryController
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, in_time, status, market='10', settle='4'):
+    return make_record(order, 货商姓名='A', 入库时间=in_time, 商品名称=f"商品{order}",
+                       行情价格=market, 结算价=settle, 出库状态=status)
+
+
+def test_archive_closed_records():
+    print("=== 测试归档 ===")
+    model = fresh_model("test_archive")
+    assert model.add_records([
+        _make_record("1", "2024-01-05 10:00:00", "全部出库"),
+        _make_record("2", "2024-01-20 10:00:00", "未出库"),
+        _make_record("3", "2024-02-03 09:00:00", "卖出"),
+        _make_record("4", "2024-03-01 09:00:00", "全部出库"),
+        _make_record("5", "", "卖出"),
+    ])
+    # 只归档入库日期早于 2024-03-01 的已关闭记录
+    assert model.archive_closed_records("2024-03-01") == 3
+    assert [r['单号'] for r in model.get_all_records()] == ["2", "4"]
+    assert [r['单号'] for r in InventoryModel("test_archive").get_all_records()] == ["2", "4"]
+    assert model.archived_months() == ["2024-01", "2024-02", "undated"]
+    assert model.archive_closed_records() == 1
+    assert model.archive_closed_records() == 0
+
+    # 按日期范围只读取重叠的月份
+    assert model.archived_months("2024-02-01", "2024-02-28") == ["2024-02"]
+    assert model.archived_months("2025-01-01") == []
+    assert [r['单号'] for r in model.iter_archived("2024-01-10", "2024-03-31")] == ["3", "4"]
+    assert sorted(r['单号'] for r in model.iter_archived()) == ["1", "3", "4", "5"]
+
+    # 控制器在查询时合并主表和归档
+    ctrl = InventoryController(model, None)
+    assert sorted(r['单号'] for r in ctrl.records_in_range()) == ["1", "2", "3", "4", "5"]
+    assert sorted(r['单号'] for r in ctrl.records_in_range("2024-01-01", "2024-01-31")) == ["1", "2"]
+    assert ctrl._profit_by('货商姓名') == {'A': 30.0}
+    assert ctrl._profit_by('货商姓名', "2024-02-01", "2024-02-29") == {'A': 6.0}
+
+    # 表改名时归档分区随表移动
+    if os.path.exists(os.path.join(model.data_dir, "test_archive_renamed.csv")):
+        os.remove(os.path.join(model.data_dir, "test_archive_renamed.csv"))
+    shutil.rmtree(os.path.join(model.data_dir, "test_archive_renamed"), ignore_errors=True)
+    assert model.rename_table("test_archive", "test_archive_renamed")
+    model.set_table("test_archive_renamed")
+    assert sorted(r['单号'] for r in model.iter_archived()) == ["1", "3", "4", "5"]
+    assert model.rename_table("test_archive_renamed", "test_archive")
+    print("✓ 归档测试通过")
+
+
+if __name__ == "__main__":
+    test_archive_closed_records()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试后台写入队列：修改立即生效，写入线程合并落盘"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from write_queue import WriteQueue
+from test_helpers import fresh_model, make_record
+
+
+def _fresh_model(table, **kwargs):
+    return fresh_model(table, async_writes=True, **kwargs)
+
+
+def test_write_queue_coalesces():
+    print("=== 测试写入队列合并 ===")
+    batches = []
+    wq = WriteQueue(batches.append, delay=0.05)
+    for i in range(5):
+        wq.submit([i])
+    assert wq.has_pending()
+    assert wq.flush()
+    assert batches == [[0, 1, 2, 3, 4]] and wq.status == 'idle'
+
+    # 写入失败时保留变更并报告错误，下次重试时一起写入
+    errors = []
+    fail = [True]
+    def flush(ops):
+        if fail[0]:
+            raise OSError("网络盘不可用")
+        batches.append(ops)
+    wq = WriteQueue(flush, on_error=errors.append, delay=0.01, retry_interval=60)
+    wq.submit(['a'])
+    wq.submit(['b'])
+    for _ in range(200):
+        if errors:
+            break
+        time.sleep(0.01)
+    assert wq.status == 'error' and "网络盘不可用" in wq.error and isinstance(errors[0], OSError)
+    fail[0] = False
+    wq.submit(['c'])
+    assert wq.close()
+    assert batches[-1] == ['a', 'b', 'c'] and wq.status == 'idle'
+    print("✓ 写入队列测试通过")
+
+
+def test_async_model_writes():
+    print("=== 测试异步写入模型 ===")
+    for journal in (False, True):
+        table = f"test_async_{int(journal)}"
+        model = _fresh_model(table, journal_mode=journal)
+        assert model.add_records([make_record("1", 商品名称="A"), make_record("2", 商品名称="B")])
+        assert model.update_record("1", {'商品名称': "A2"})
+        assert model.delete_record("2")
+        # 内存中的修改立即可见
+        assert [r['商品名称'] for r in model.get_all_records()] == ["A2"]
+        assert model.flush()
+        assert model.write_status() == ('idle', '')
+        assert [r['商品名称'] for r in InventoryModel(table, journal_mode=journal).get_all_records()] == ["A2"]
+
+        # 连续修改在后台合并写入，close 时全部落盘
+        for i in range(20):
+            assert model.add_record(make_record(str(100 + i), 商品名称=f"P{i}"))
+        model.close()
+        assert len(InventoryModel(table, journal_mode=journal).get_all_records()) == 21
+    print("✓ 异步写入模型测试通过")
+
+
+if __name__ == "__main__":
+    test_write_queue_coalesces()
+    test_async_model_writes()
@@ -7,6 +7,7 @@ import os
 from model import InventoryModel
 from settings_model import SettingsModel
 from controller import InventoryController
+from test_helpers import fresh_model
 
 def test_bulk_import():
     """测试批量入库功能"""
@@ -109,8 +110,38 @@ def test_bulk_import():
     
     return True
 
+def test_bulk_inbound_batch():
+    """测试批量入库一次性写入"""
+    model = fresh_model("test_bulk_batch")
+    controller = InventoryController(model, SettingsModel())
+
+    writes = []
+    original_add_records = model.add_records
+    model.add_records = lambda records: writes.append(len(records)) or original_add_records(records)
+
+    rows = [
+        {'货商姓名': '测试货商', '商品名称': f'商品{i}', '买价': '10', '佣金': '2',
+         '商品数量': '3', '入库快递单号': 'JD999'}
+        for i in range(50)
+    ]
+    rows.append({'商品名称': '坏数据', '买价': 'abc', '商品数量': '1'})
+    rows.append({'商品名称': '', '买价': '1', '商品数量': '1'})
+
+    success, errors = controller.handle_inbound_batch(rows)
+    assert success == 50 and len(errors) == 2
+    assert writes == [50]
+
+    records = model.get_all_records()
+    assert len(records) == 50
+    assert len({r['单号'] for r in records}) == 50, "同一批次单号不应重复"
+    assert records[0]['结算价'] == '12.00' and records[0]['单价'] == '4.00'
+    assert InventoryModel("test_bulk_batch").get_all_records() == records
+    print("✓ 批量入库一次性写入测试通过")
+
+
 if __name__ == "__main__":
     try:
+        test_bulk_inbound_batch()
         success = test_bulk_import()
         sys.exit(0 if success else 1)
     except Exception as e:
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试批量修改/删除：全部变更只写入一次"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from settings_model import SettingsModel
+from controller import InventoryController
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order):
+    return make_record(order, '4', 商品名称=f"商品{order}", 买价='10', 佣金='2', 剩余数量='2', 出库状态='部分出库')
+
+
+def test_bulk_modify_and_delete():
+    print("=== 测试批量修改 ===")
+    model = fresh_model("test_bulk_modify")
+    for i in range(5):
+        assert model.add_record(_make_record(str(8000 + i)))
+
+    writes = []
+    original_save = model._save
+    model._save = lambda records, ops: writes.append(len(ops)) or original_save(records, ops)
+
+    controller = InventoryController(model, SettingsModel())
+    changes = {str(8000 + i): {'佣金': '6'} for i in range(5)}
+    changes['8003'] = {'买价': 'abc'}
+    changes['9999'] = {'备注': 'x'}
+    success, errors = controller.handle_modify_many(changes)
+    assert success == 4 and len(errors) == 2
+    assert writes == [4]
+
+    # 逐行重新计算结算价、单价、剩余价值
+    rec = model.get_record("8000")
+    assert (rec['结算价'], rec['单价'], rec['剩余价值']) == ("16.00", "4.00", "8.00")
+    assert model.get_record("8003")['结算价'] == ''
+
+    # 批量删除同样只写入一次，重复单号一并删除
+    assert model.add_record(_make_record("8001"))
+    assert model.delete_records(["8001", "8002", "9999"])
+    assert writes == [4, 2]
+    assert [r['单号'] for r in model.get_all_records()] == ["8000", "8003", "8004"]
+    assert InventoryModel("test_bulk_modify").get_all_records() == model.get_all_records()
+    print("✓ 批量修改测试通过")
+
+
+if __name__ == "__main__":
+    test_bulk_modify_and_delete()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试记录级变更通知，以及刷新时只修补受影响的行"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from controller import InventoryController
+from test_refresh_debounce import _FakeView, _make_record
+from test_helpers import fresh_model
+
+
+def test_model_events():
+    print("=== 测试记录级变更通知 ===")
+    for journal in (False, True):
+        model = fresh_model("test_change_events", journal_mode=journal)
+        events = []
+        model.changes.subscribe(events.extend)
+
+        assert model.add_records([_make_record("1"), _make_record("2")])
+        assert [(c.kind, c.order, c.old) for c in events] == [("inserted", "1", None), ("inserted", "2", None)]
+        assert events[0].new == model.get_record("1")
+
+        events.clear()
+        before = model.get_record("1")
+        assert model.update_record("1", {'备注': "已检查"})
+        assert [(c.kind, c.order) for c in events] == [("updated", "1")]
+        assert events[0].old is before and events[0].new['备注'] == "已检查"
+
+        events.clear()
+        assert model.partial_outbound("2", 2, "SF001", "档口A")
+        assert events[0].kind == "updated" and events[0].new['剩余数量'] == '3'
+
+        events.clear()
+        assert model.update_records({"1": {'备注': "批量"}, "2": {'备注': "批量"}})
+        assert [c.order for c in events] == ["1", "2"]
+
+        # 修改单号拆成删除旧单号、新增新单号
+        events.clear()
+        assert model.update_record("2", {'单号': "5"})
+        assert [(c.kind, c.order) for c in events] == [("deleted", "2"), ("inserted", "5")]
+        assert model.update_record("5", {'单号': "2"})
+
+        events.clear()
+        assert model.delete_record("1")
+        assert [(c.kind, c.order, c.new) for c in events] == [("deleted", "1", None)]
+        assert events[0].old['备注'] == "批量"
+
+        # 重复单号无法按单号定位，改为整表变化
+        events.clear()
+        if not journal:
+            assert model.add_records([_make_record("2")])
+            assert [c.kind for c in events] == ["reset"]
+        events.clear()
+        model.set_table("test_change_events")
+        assert [c.kind for c in events] == ["reset"]
+        model.close()
+    print("✓ 记录级变更通知测试通过")
+
+
+def test_incremental_refresh():
+    print("=== 测试增量刷新 ===")
+    model = fresh_model("test_change_refresh")
+    assert model.add_records([_make_record(str(i)) for i in range(5)])
+    controller = InventoryController(model, None)
+    view = _FakeView()
+    controller.view = view
+
+    # 首次刷新整体重绘
+    controller.refresh_inventory_list()
+    view.root.run_idle()
+    assert view.inbound_page.repaints == 1 and not view.inbound_page.patches
+
+    # 之后的修改只把变更交给各页修补，不整体重绘
+    assert controller.handle_partial_outbound("3", 1, "SF001", "档口A")
+    assert controller.handle_delete("4")
+    view.root.run_idle()
+    for page in (view.inbound_page, view.outbound_page, view.modify_page):
+        assert page.repaints == 1
+        assert [(c.kind, c.order) for c in page.patches[-1]] == [("updated", "3"), ("deleted", "4")]
+
+    # 文件在外部被修改后重新解析，整体重绘
+    other = InventoryModel("test_change_refresh")
+    assert other.update_record("0", {'备注': "外部修改"})
+    controller.refresh_inventory_list()
+    view.root.run_idle()
+    assert view.inbound_page.repaints == 2
+
+    # 切换表是整表变化
+    controller.switch_table("test_change_refresh")
+    view.root.run_idle()
+    assert view.inbound_page.repaints == 3 and len(view.inbound_page.patches) == 1
+    print("✓ 增量刷新测试通过")
+
+
+if __name__ == "__main__":
+    test_model_events()
+    test_incremental_refresh()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试跨表并行汇总"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from cross_table import summarize_table, summarize_tables, merge_summaries
+from model import InventoryModel
+from aggregates import TableAggregates
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, supplier, name, market, settle, status='未出库'):
+    return make_record(order, 货商姓名=supplier, 商品名称=name, 入库时间='2024-05-01 10:00:00',
+                       行情价格=market, 结算价=settle, 出库状态=status)
+
+
+def _fresh_table(table, records):
+    model = fresh_model(table)
+    assert model.add_records(records)
+
+
+def test_cross_table_summary():
+    print("=== 测试跨表汇总 ===")
+    _fresh_table("test_cross_a", [_make_record("1", "A", "X", "10", "4"),
+                                  _make_record("2", "B", "Y", "8", "5", "卖出")])
+    _fresh_table("test_cross_b", [_make_record("3", "A", "Y", "6", "7"),
+                                  _make_record("4", "C", "Z", "", "2")])
+    tables = ["test_cross_a", "test_cross_b"]
+    summaries = summarize_tables(tables, max_workers=2)
+    assert [s['表名'] for s in summaries] == tables
+    assert summaries == [summarize_table(t) for t in tables]
+
+    total = merge_summaries(summaries)
+    assert total['rows'] == 4
+    assert total['stock_value'] == 13.0
+    assert total['profit'] == 6.0 + 3.0 - 1.0 - 2.0
+    assert total['profit_by_product'] == {'X': 6.0, 'Y': 2.0, 'Z': -2.0}
+    assert total['profit_by_supplier'] == {'A': 5.0, 'B': 3.0, 'C': -2.0}
+    assert total['inbound_by_supplier'] == {'A': 2, 'B': 1, 'C': 1}
+    # 日期范围之外的记录不计入
+    assert summarize_table("test_cross_a", start="2024-06-01")['rows'] == 0
+    print("✓ 跨表汇总测试通过")
+
+
+def test_summary_is_read_only():
+    print("=== 测试汇总不写文件 ===")
+    _fresh_table("test_cross_ro", [_make_record("1", "A", "X", "10", "4")])
+    model = InventoryModel("test_cross_ro")
+    agg_path = TableAggregates(model.filename).path
+    if os.path.exists(agg_path):
+        os.remove(agg_path)
+    before = os.stat(model.filename).st_mtime_ns
+    assert summarize_table("test_cross_ro")['rows'] == 1
+    assert os.stat(model.filename).st_mtime_ns == before
+    assert not os.path.exists(agg_path)
+
+    # 不存在的表不会被创建
+    missing = fresh_model("test_cross_missing")
+    os.remove(missing.filename)
+    assert summarize_table("test_cross_missing")['rows'] == 0
+    assert not os.path.exists(missing.filename)
+
+    # 只读模型拒绝修改
+    ro = InventoryModel("test_cross_ro", read_only=True)
+    assert not ro.add_record(_make_record("2", "B", "Y", "1", "1"))
+    assert not ro.update_record("1", {'备注': 'x'})
+    assert InventoryModel("test_cross_ro").get_record("1")['备注'] == ''
+    # 出库、迁移、归档在写出库事件或归档文件之前就失败
+    assert not ro.partial_outbound("1", 1, "SF1", "档口A")
+    assert "只读" in ro.last_error
+    assert ro.archive_closed_records() is None
+    assert not ro.rename_table("test_cross_ro", "test_cross_ro2")
+    writer = InventoryModel("test_cross_ro")
+    assert writer.get_record("1")['剩余数量'] == '1'
+    assert not os.path.exists(writer.outbound.path)
+    print("✓ 汇总不写文件测试通过")
+
+
+if __name__ == "__main__":
+    test_cross_table_summary()
+    test_summary_is_read_only()
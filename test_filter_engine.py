@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试筛选引擎：结果与逐行匹配一致，收窄条件时只在上次结果中查找，筛选表达式走索引"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from filter_engine import FilterEngine, compile_filters, parse_term
+
+
+def _rows():
+    names = ["iPhone 15", "iPhone 15 Pro", "华为 Mate", "小米 14", "IPHONE SE"]
+    return [{'单号': str(i), '商品名称': names[i % len(names)], '货商姓名': f"货商{i % 3}", '结算价': i * 10,
+             '入库时间': f"2025-03-{i % 28 + 1:02d} 10:00:00" if i % 7 else "", '备注': "" if i % 4 else "急" if i % 8 else "急..."}
+            for i in range(50)]
+
+
+def _expected(rows, terms):
+    match = compile_filters(terms)
+    return [r for r in rows if match(r)]
+
+
+def test_filter_results():
+    print("=== 测试筛选结果 ===")
+    rows = _rows()
+    engine = FilterEngine()
+    engine.load(rows)
+    for terms in ([], [('商品名称', 'iphone')], [('商品名称', 'iphone 15')], [('商品名称', 'iphone 15'), ('货商姓名', '1')],
+                  [('商品名称', 'mate')], [('结算价', '10')], [('商品名称', 'iphone')]):
+        assert engine.filter(terms) == _expected(rows, terms), terms
+    print("✓ 筛选结果正确")
+
+
+def test_narrowing_reuses_result():
+    print("=== 测试收窄条件复用上次结果 ===")
+    rows = _rows()
+    engine = FilterEngine()
+    engine.load(rows)
+    engine.filter([('商品名称', 'iphone')])
+    # 收窄时只检查上次结果中的行：把上次结果之外的行改成也能匹配，结果中不会出现
+    engine._lower['商品名称'][2] = "iphone 15 (不应出现)"
+    got = engine.filter([('商品名称', 'iphone 15')])
+    assert all(r['单号'] != '2' for r in got)
+    assert got == _expected(rows, [('商品名称', 'iphone 15')])
+    # 放宽条件时重新扫描全部行
+    assert any(r['单号'] == '2' for r in engine.filter([('商品名称', 'iphone 1')]))
+    # 重新加载后丢弃缓存的小写列和结果
+    engine.load(rows)
+    assert engine.filter([('商品名称', 'iphone 15')]) == _expected(rows, [('商品名称', 'iphone 15')])
+    print("✓ 收窄条件测试通过")
+
+
+def test_expressions():
+    print("=== 测试筛选表达式 ===")
+    assert parse_term('>100') == ('range', 'num', (100.0, True), None)
+    assert parse_term('0..50') == ('range', 'num', (0.0, False), (50.0, False))
+    assert parse_term('=iphone 15') == ('eq', 'iphone 15')
+    assert parse_term('a.b') == ('sub', 'a.b')
+    # 为空写作 =，单独的 empty 是普通子串
+    assert parse_term('=') == ('empty', True)
+    assert parse_term('!empty') == ('empty', False)
+    assert parse_term('empty') == ('sub', 'empty')
+    # 两端不是数值或时间的 .. 不是区间
+    assert parse_term('a..b') == ('sub', 'a..b')
+    assert parse_term('...') == ('sub', '...')
+    rows = _rows()
+    engine = FilterEngine()
+    engine.load(rows)
+    cases = {
+        ('结算价', '>100'): lambda r: r['结算价'] > 100,
+        ('结算价', '<=0'): lambda r: r['结算价'] <= 0,
+        ('结算价', '100..200'): lambda r: 100 <= r['结算价'] <= 200,
+        ('结算价', '..30'): lambda r: r['结算价'] <= 30,
+        ('商品名称', '=iphone 15'): lambda r: r['商品名称'] == "iPhone 15",
+        ('商品名称', '=iphone 15|华为'): lambda r: r['商品名称'] in ("iPhone 15", "华为 Mate"),
+        ('备注', '='): lambda r: r['备注'] == "",
+        ('备注', '!empty'): lambda r: r['备注'] != "",
+        ('备注', '...'): lambda r: "..." in r['备注'],
+        ('入库时间', '2025-03-02..2025-03-03'): lambda r: r['入库时间'][:10] in ("2025-03-02", "2025-03-03"),
+        ('入库时间', '>2025-03-26'): lambda r: r['入库时间'][:10] > "2025-03-26",
+        ('入库时间', '<2025-03-02'): lambda r: r['入库时间'] != "" and r['入库时间'][:10] < "2025-03-02",
+    }
+    for term, want in cases.items():
+        expected = [r for r in rows if want(r)]
+        assert engine.filter([term]) == expected == _expected(rows, [term]), term
+    assert engine.filter([('备注', '...')])  # ... 是子串，不是空的字符串区间
+    # 与子串条件组合，结果仍按原顺序
+    terms = [('结算价', '>=100'), ('商品名称', 'iphone')]
+    assert engine.filter(terms) == _expected(rows, terms)
+    # 表达式变化时不复用上一次的结果
+    engine.filter([('结算价', '>300')])
+    assert engine.filter([('结算价', '>30')]) == _expected(rows, [('结算价', '>30')])
+    print("✓ 筛选表达式测试通过")
+
+
+def test_update():
+    print("=== 测试单行修补 ===")
+    rows = _rows()
+    engine = FilterEngine()
+    engine.load(rows)
+    terms = [[('商品名称', '=iphone 15')], [('商品名称', 'mate')], [('结算价', '>400')]]
+    for t in terms:
+        engine.filter(t)  # 先生成各列的副本和索引
+    rows[0] = dict(rows[0], 商品名称="华为 Mate", 结算价=999)
+    engine.update(0, rows[0])
+    rows.append(dict(rows[1], 单号='50'))
+    engine.update(50, rows[50])
+    for t in terms:
+        assert engine.filter(t) == _expected(rows, t), t
+    print("✓ 单行修补测试通过")
+
+
+if __name__ == "__main__":
+    test_filter_results()
+    test_narrowing_reuses_result()
+    test_expressions()
+    test_update()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""各测试共用的数据表和记录构造函数"""
+
+import os
+import sys
+import glob
+import shutil
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from journal import ChangeJournal
+from outbound_events import OutboundEventStore
+from aggregates import TableAggregates
+
+
+def fresh_model(table, **kwargs):
+    """删除数据表及其出库事件、日志、汇总、迁移备份和归档文件后重新打开（kwargs 传给 InventoryModel）。"""
+    model = InventoryModel(table)
+    paths = (model.filename, OutboundEventStore(model.filename).path,
+             TableAggregates(model.filename).path) + ChangeJournal(model.filename).paths()
+    paths += tuple(glob.glob(model.filename[:-4] + ".before-outbound-migration-*.csv"))
+    for p in paths:
+        if os.path.exists(p):
+            os.remove(p)
+    shutil.rmtree(os.path.join(model.data_dir, table), ignore_errors=True)
+    return InventoryModel(table, **kwargs)
+
+
+def make_record(order, qty='1', **fields):
+    """单号为 order 的一条记录：商品数量、剩余数量为 qty，未出库，其余列为空；fields 按列名覆盖。"""
+    rec = {k: '' for k in InventoryModel.CSV_HEADER}
+    rec.update({'单号': order, '商品数量': qty, '剩余数量': qty, '出库状态': '未出库'})
+    rec.update(fields)
+    return rec
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试日志模式：修改追加到变更日志，回放及合并回 CSV"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from test_helpers import fresh_model, make_record
+
+
+def _fresh_model(table, **kwargs):
+    return fresh_model(table, journal_mode=True, **kwargs)
+
+
+def _make_record(order, name):
+    return make_record(order, '4', 商品名称=name, 结算价='40.00', 单价='10.00')
+
+
+def test_journal_replay_and_compact():
+    print("=== 测试日志模式 ===")
+    model = _fresh_model("test_journal", journal_max_bytes=10 ** 9, journal_max_age=10 ** 9)
+    csv_size = os.path.getsize(model.filename)
+
+    for i in range(3):
+        assert model.add_record(_make_record(str(5000 + i), f"商品{i}"))
+    assert model.update_record("5000", {'备注': '改过'})
+    assert model.partial_outbound("5001", 1, "YT001", "档口B")
+    assert model.delete_record("5002")
+
+    # 修改只写入日志，CSV 保持不变
+    assert os.path.getsize(model.filename) == csv_size
+    assert model.journal.size() > 0
+
+    # 新实例从 CSV + 日志回放得到相同结果
+    replayed = InventoryModel("test_journal", journal_mode=True)
+    assert replayed.get_all_records() == model.get_all_records()
+    assert replayed.find_by('快递单号', 'YT001') == model.find_by('快递单号', 'YT001')
+    assert [r['单号'] for r in replayed.find_by('快递单号', 'YT001')] == ["5001"]
+    assert replayed.get_record("5001")['剩余数量'] == '3'
+    assert replayed.get_record("5002") is None
+
+    # 合并后日志清空，普通模式也能读到全部数据
+    assert model.compact()
+    assert model.journal.size() == 0
+    plain = InventoryModel("test_journal")
+    assert plain.get_all_records() == model.get_all_records()
+
+    # 合并途中崩溃：已写回 CSV 的变更再回放一遍结果不变
+    assert model.update_record("5000", {'备注': '再改'})
+    model.journal.rotate()
+    expected = model.get_all_records()
+    records = list(expected)
+    model._write_all(records)
+    again = InventoryModel("test_journal", journal_mode=True)
+    assert again.get_all_records() == expected
+    print("✓ 日志模式测试通过")
+
+
+def test_journal_background_compaction():
+    print("=== 测试后台合并 ===")
+    model = _fresh_model("test_journal_bg", journal_max_bytes=1, journal_max_age=10 ** 9)
+    assert model.add_record(_make_record("6000", "商品X"))
+    model.close()
+    assert model.journal.size() == 0
+    assert [r['单号'] for r in InventoryModel("test_journal_bg").get_all_records()] == ["6000"]
+    print("✓ 后台合并测试通过")
+
+
+if __name__ == "__main__":
+    test_journal_replay_and_compact()
+    test_journal_background_compaction()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试 InventoryModel 的内存记录缓存"""
+
+import os
+import sys
+import csv
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, name):
+    return make_record(order, '3', 商品名称=name, 结算价='30.00', 单价='10.00')
+
+
+def test_record_cache():
+    print("=== 测试记录缓存 ===")
+    model = fresh_model("test_cache")
+    assert model.add_record(_make_record("1001", "商品A"))
+    assert model.add_record(_make_record("1002", "商品B"))
+
+    first = model.get_all_records()
+    assert [r['单号'] for r in first] == ["1001", "1002"]
+
+    # 文件未变化时不重新解析
+    model._read_csv = lambda: (_ for _ in ()).throw(AssertionError("不应重新解析CSV"))
+    again = model.get_all_records()
+    assert [r['单号'] for r in again] == ["1001", "1002"]
+    del model._read_csv
+
+    # 写操作就地更新缓存，且不影响调用方已持有的旧记录
+    assert model.update_record("1001", {'备注': '已检查'})
+    assert first[0]['备注'] == ''
+    assert model.get_all_records()[0]['备注'] == '已检查'
+    assert model.partial_outbound("1002", 1, "SF001", "档口A")
+    assert model.get_all_records()[1]['剩余数量'] == '2'
+    assert model.delete_record("1001")
+    assert [r['单号'] for r in model.get_all_records()] == ["1002"]
+
+    # 外部修改文件后自动重新加载
+    time.sleep(0.01)
+    with open(model.filename, 'a', newline='', encoding="gb2312") as f:
+        csv.DictWriter(f, fieldnames=InventoryModel.CSV_HEADER).writerow(_make_record("1003", "商品C"))
+    assert [r['单号'] for r in model.get_all_records()] == ["1002", "1003"]
+
+    # 另一个模型实例读到的内容与缓存一致
+    other = InventoryModel("test_cache")
+    assert other.get_all_records() == model.get_all_records()
+    print("✓ 记录缓存测试通过")
+
+
+def test_order_index():
+    print("=== 测试单号索引 ===")
+    model = fresh_model("test_index")
+    for i in range(5):
+        assert model.add_record(_make_record(str(2000 + i), f"商品{i}"))
+
+    assert model.get_record("2003")['商品名称'] == "商品3"
+    assert model.get_record("9999") is None
+
+    # 删除后索引位置随之更新
+    assert model.delete_record("2001")
+    assert model.get_record("2001") is None
+    assert model.get_record("2004")['商品名称'] == "商品4"
+    assert model.update_record("2004", {'备注': '末尾'})
+    assert model.get_all_records()[-1]['备注'] == '末尾'
+
+    # 修改单号后可以用新单号查到
+    assert model.update_record("2002", {'单号': '3002'})
+    assert model.get_record("2002") is None
+    assert model.get_record("3002")['商品名称'] == "商品2"
+
+    # 重复单号：索引指向第一条，删除时全部移除
+    assert model.add_record(_make_record("2000", "重复商品"))
+    assert model.get_record("2000")['商品名称'] == "商品0"
+    assert model.delete_record("2000")
+    assert all(r['单号'] != "2000" for r in model.get_all_records())
+    print("✓ 单号索引测试通过")
+
+
+def _assert_secondary_consistent(model):
+    records = model.get_all_records()
+    for col in InventoryModel.INDEXED_COLUMNS:
+        for value in {r.get(col, '') for r in records}:
+            assert model.find_by(col, value) == [r for r in records if r.get(col, '') == value], (col, value)
+    expected = {}
+    for r in records:
+        expected[r['货商姓名']] = expected.get(r['货商姓名'], 0) + 1
+    assert list(model.count_by('货商姓名').items()) == list(expected.items())
+
+
+def test_secondary_index():
+    print("=== 测试二级索引 ===")
+    model = fresh_model("test_secondary")
+    for i in range(6):
+        rec = _make_record(str(4000 + i), f"商品{i % 2}")
+        rec.update({'货商姓名': f"货商{i % 3}", '入库快递单号': f"JD{i // 2}"})
+        assert model.add_record(rec)
+    _assert_secondary_consistent(model)
+    assert [r['单号'] for r in model.find_by('入库快递单号', 'JD1')] == ["4002", "4003"]
+    assert model.find_by('快递单号', 'SF404') == []
+
+    assert model.update_record("4000", {'货商姓名': '货商9', '快递单号': 'SF1'})
+    assert model.partial_outbound("4004", 1, "SF1", "档口A")
+    _assert_secondary_consistent(model)
+    assert [r['单号'] for r in model.find_by('快递单号', 'SF1')] == ["4000", "4004"]
+
+    assert model.update_records({"4001": {'商品名称': '新品'}, "4005": {'单号': '5005'}})
+    assert model.delete_record("4003")
+    _assert_secondary_consistent(model)
+
+    # 外部修改后重新加载，索引随之重建
+    reloaded = InventoryModel("test_secondary")
+    assert reloaded.find_by('商品名称', '新品')[0]['单号'] == "4001"
+    # 未建索引的列退化为扫描
+    assert len(model.find_by('出库状态', '未出库')) == 4
+    print("✓ 二级索引测试通过")
+
+
+def test_iter_records():
+    print("=== 测试流式读取 ===")
+    model = fresh_model("test_iter")
+    for i in range(6):
+        rec = _make_record(str(7000 + i), f"商品{i % 3}")
+        rec.update({'货商姓名': f"货商{i % 2}", '行情价格': str(40 + i)})
+        assert model.add_record(rec)
+
+    # 未加载缓存时直接流式读取 CSV，不解析整张表
+    stream = InventoryModel("test_iter")
+    stream._read_csv = lambda: (_ for _ in ()).throw(AssertionError("不应整表解析"))
+    rows = list(stream.iter_records(columns=['单号', '行情价格'], where={'货商姓名': '货商1'}))
+    assert rows == [{'单号': '7001', '行情价格': '41'}, {'单号': '7003', '行情价格': '43'},
+                    {'单号': '7005', '行情价格': '45'}]
+    big = list(stream.iter_records(columns=['单号'], where=lambda r: r['单号'] >= '7004'))
+    assert big == [{'单号': '7004'}, {'单号': '7005'}]
+    assert stream.profit_by('商品名称') == {'商品0': 23.0, '商品1': 25.0, '商品2': 27.0}
+    assert stream._records is None
+
+    # 缓存已加载时结果一致
+    assert list(model.iter_records(columns=['单号', '行情价格'], where={'货商姓名': '货商1'})) == rows
+    assert len(list(model.iter_records())) == 6
+    print("✓ 流式读取测试通过")
+
+
+if __name__ == "__main__":
+    test_record_cache()
+    test_order_index()
+    test_secondary_index()
+    test_iter_records()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试金额/数量列的列式存储"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from numeric_columns import NumericColumns, mask_and
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, supplier, market, settle, ship=''):
+    return make_record(order, '2', 货商姓名=supplier, 行情价格=market, 结算价=settle, 快递价格=ship)
+
+
+def _same_columns(a: NumericColumns, b: NumericColumns):
+    for c in a.columns:
+        assert list(a.values[c]) == list(b.values[c]), c
+        assert a.ok[c] == b.ok[c] and a.null[c] == b.null[c], c
+
+
+def test_numeric_columns():
+    print("=== 测试列式数值 ===")
+    rows = [_make_record("1", "A", "30", "20", "5"), _make_record("2", "B", "", "abc"),
+            _make_record("3", "A", "12.5", "10")]
+    nc = NumericColumns(rows)
+    assert nc.sum('行情价格') == 42.5
+    assert nc.sum('结算价') == 30.0
+    assert list(nc.ok['结算价']) == [1, 0, 1]
+    assert list(nc.null['行情价格']) == [0, 1, 0]
+    ok = mask_and(nc.ok['行情价格'], nc.ok['结算价'])
+    assert nc.sum('行情价格', ok) == 42.5
+    assert nc.sum_at('行情价格', [0, 2], ok) - nc.sum_at('结算价', [0, 2], ok) == 12.5
+    assert nc.sum('快递价格', nc.selector([0])) == 5.0
+    assert list(nc.positive('结算价')) == [1, 0, 1]
+
+    # 模型在增删改后保持列式数据与记录一致
+    model = fresh_model("test_numeric")
+    assert model.add_records(rows)
+    assert model.update_record("2", {'结算价': '8'})
+    assert model.add_record(_make_record("4", "C", "9", "3"))
+    assert model.delete_record("1")
+    _same_columns(model.numeric_columns(), NumericColumns(model.get_all_records()))
+    assert model.profit_by('货商姓名') == {'B': -8.0, 'A': 2.5, 'C': 6.0}
+    assert InventoryModel("test_numeric").profit_by('货商姓名') == model.profit_by('货商姓名')
+    print("✓ 列式数值测试通过")
+
+
+if __name__ == "__main__":
+    test_numeric_columns()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试单号生成器及重复单号修复"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from order_number import OrderNumberGenerator, find_duplicate_orders
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, name):
+    return make_record(order, 商品名称=name)
+
+
+def test_order_number_generator():
+    print("=== 测试单号生成器 ===")
+    data_dir = tempfile.mkdtemp()
+    # 固定时钟：同一毫秒内大量生成，且时间回拨也保持递增
+    ticks = iter([1700000000.0] * 2500 + [1699999999.0] * 10)
+    gen = OrderNumberGenerator(data_dir, clock=lambda: next(ticks))
+    orders = [gen.next() for _ in range(2510)]
+    assert len(set(orders)) == len(orders)
+    assert [int(o) for o in orders] == sorted(int(o) for o in orders)
+    assert all(len(o) == 18 for o in orders)
+
+    # 共用数据目录的第二个实例拿到不同的实例号
+    other = OrderNumberGenerator(data_dir, clock=lambda: 1700000000.0)
+    assert other.instance_id != gen.instance_id
+    assert other.next() not in orders
+    gen.close()
+    other.close()
+    print("✓ 单号生成器测试通过")
+
+
+def test_repair_duplicate_orders():
+    print("=== 测试重复单号修复 ===")
+    model = fresh_model("test_dup_orders")
+    for order, name in [("1", "A"), ("1", "B"), ("2", "C"), ("1", "D")]:
+        assert model.add_record(_make_record(order, name))
+    assert find_duplicate_orders(model.get_all_records()) == {"1": 3}
+
+    gen = OrderNumberGenerator(tempfile.mkdtemp())
+    changes = model.reassign_duplicate_orders(gen.next)
+    assert [old for old, _ in changes] == ["1", "1"]
+    records = InventoryModel("test_dup_orders").get_all_records()
+    assert find_duplicate_orders(records) == {}
+    assert [r['商品名称'] for r in records] == ["A", "B", "C", "D"]
+    assert model.get_record("1")['商品名称'] == "A"
+    assert model.get_record(changes[1][1])['商品名称'] == "D"
+    assert model.reassign_duplicate_orders(gen.next) == []
+    gen.close()
+    print("✓ 重复单号修复测试通过")
+
+
+if __name__ == "__main__":
+    test_order_number_generator()
+    test_repair_duplicate_orders()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试出库事件流：分批出库不再拼接“出库记录”字符串，旧版出库记录只在显式迁移时（先备份）清空"""
+
+import os
+import csv
+import sys
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, legacy=''):
+    return make_record(order, '10', 商品名称=f"商品{order}", 结算价='100', 单价='10.00', 出库记录=legacy)
+
+
+def test_outbound_events():
+    print("=== 测试出库事件 ===")
+    model = fresh_model("test_outbound_events")
+    # 旧版数据：出库记录保存在主表的字符串列中
+    legacy = "2024-01-01 10:00:00|档口A|SF001|2|10.00;2024-01-02 10:00:00|档口B|SF002|1|10.00"
+    assert model.add_record(_make_record("100", legacy))
+    assert model.add_record(_make_record("200"))
+
+    # 查询时解析旧版字符串，但不改写数据表
+    with open(model.filename, 'rb') as f:
+        before = f.read()
+    assert [e['快递单号'] for e in model.outbound_events(单号="100")] == ["SF001", "SF002"]
+    assert model.get_record("100")['出库记录'] == legacy
+    with open(model.filename, 'rb') as f:
+        assert f.read() == before
+
+    # 新的出库只追加事件，不改写出库记录列
+    assert model.partial_outbound("200", 3, "SF002", "档口A")
+    assert model.partial_outbound("200", 1, "SF003", "档口C")
+    assert model.get_record("200")['出库记录'] == ''
+    assert model.get_record("200")['剩余数量'] == '6'
+    assert [e['单号'] for e in model.outbound_events(快递单号="SF002")] == ["100", "200"]
+    assert [e['出库数量'] for e in model.outbound_events(出库档口="档口A")] == ["2", "3"]
+    assert not model.partial_outbound("200", 99, "SF004", "档口C")
+    assert len(model.outbound_events(单号="200")) == 2
+
+    # 其他实例读到同样的事件
+    other = InventoryModel("test_outbound_events")
+    assert other.outbound_events() == model.outbound_events()
+
+    # 导出时生成旧版格式的出库记录列
+    path = os.path.join(tempfile.mkdtemp(), "export.csv")
+    assert model.export_csv(path)
+    with open(path, newline='', encoding="gb2312") as f:
+        rows = {r['单号']: r for r in csv.DictReader(f)}
+    assert rows["100"]['出库记录'] == legacy
+    assert rows["200"]['出库记录'].count(';') == 1 and "|档口C|SF003|1|10.00" in rows["200"]['出库记录']
+
+    # 显式迁移：先备份整表，再导入事件并清空旧版列，查询结果不变
+    events = model.outbound_events()
+    assert model.migrate_outbound_events() == 2
+    assert model.get_record("100")['出库记录'] == ''
+    key = lambda e: (e['单号'], e['出库时间'], e['快递单号'])
+    assert sorted(model.outbound_events(), key=key) == sorted(events, key=key)
+    assert model.migrate_outbound_events() == 0
+    prefix = os.path.basename(model.filename)[:-4] + ".before-outbound-migration-"
+    backups = [n for n in os.listdir(model.data_dir) if n.startswith(prefix)]
+    assert len(backups) == 1
+    with open(os.path.join(model.data_dir, backups[0]), newline='', encoding="gb2312") as f:
+        assert {r['单号']: r for r in csv.DictReader(f)}["100"]['出库记录'] == legacy
+    os.remove(os.path.join(model.data_dir, backups[0]))
+
+    # 删除记录时一并删除其出库事件
+    assert model.delete_record("100")
+    assert model.outbound_events(单号="100") == []
+    assert len(model.outbound_events()) == 2
+    print("✓ 出库事件测试通过")
+
+
+def test_outbound_write_failure():
+    print("=== 测试出库写入失败 ===")
+    model = fresh_model("test_outbound_failure")
+    assert model.add_record(_make_record("300"))
+
+    def disk_full(records):
+        raise OSError(28, "No space left on device")
+    model._write_temp = disk_full
+    assert not model.partial_outbound("300", 5, "SF300", "档口A")
+    assert "No space left" in model.last_error
+    del model._write_temp
+    # 缓存与磁盘一致，出库事件已撤销
+    assert model.get_record("300")['剩余数量'] == '10'
+    assert InventoryModel("test_outbound_failure").get_record("300")['剩余数量'] == '10'
+    assert model.outbound_events(单号="300") == []
+    assert model.partial_outbound("300", 5, "SF300", "档口A")
+    assert len(model.outbound_events(单号="300")) == 1
+    print("✓ 出库写入失败测试通过")
+
+
+if __name__ == "__main__":
+    test_outbound_events()
+    test_outbound_write_failure()
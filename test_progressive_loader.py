@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试分批加载：第一屏同步插入、其余按时间片插入、新的加载取消旧的、finish 同步插完"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from tree_rows import ProgressiveLoader, insert_row
+
+
+class _FakeTreeview:
+    """记录行和 after() 回调的 Treeview 替身（测试环境没有显示器）。"""
+
+    def __init__(self):
+        self.rows = []
+        self.jobs = {}
+        self.count = 0
+        self.selected = ()
+        self.top = 0.0
+
+    def exists(self, iid):
+        return iid in self.rows
+
+    def insert(self, parent, index, iid=None, values=(), tags=()):
+        self.rows.append(iid)
+        return iid
+
+    def delete(self, *iids):
+        self.rows = [r for r in self.rows if r not in iids]
+
+    def get_children(self):
+        return tuple(self.rows)
+
+    def yview(self):
+        return (self.top, 1.0)
+
+    def yview_moveto(self, top):
+        self.top = top
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, iids):
+        self.selected = tuple(iids)
+
+    def focus(self, *args):
+        return ''
+
+    def after(self, ms, func):
+        self.count += 1
+        self.jobs[self.count] = func
+        return self.count
+
+    def after_cancel(self, job):
+        del self.jobs[job]
+
+    def run_jobs(self):
+        while self.jobs:
+            job = min(self.jobs)
+            self.jobs.pop(job)()
+
+
+def test_progressive_loader():
+    print("=== 测试分批加载 ===")
+    tree = _FakeTreeview()
+    loader = ProgressiveLoader(tree, first=10, slice_ms=1000)
+    done = []
+    loader.start((str(i) for i in range(1000)), lambda o: insert_row(tree, "end", o, ()), lambda: done.append(1))
+    # 第一屏同步插入，其余等待 after()
+    assert tree.rows == [str(i) for i in range(10)] and loader.running and not done
+    tree.run_jobs()
+    assert len(tree.rows) == 1000 and not loader.running and done == [1]
+    print("✓ 分批加载测试通过")
+
+
+def test_cancel_and_finish():
+    print("=== 测试取消与同步插完 ===")
+    tree = _FakeTreeview()
+    tree.rows = ["a", "b"]
+    tree.selected = ("b",)
+    tree.top = 0.5
+    loader = ProgressiveLoader(tree, first=2)
+    loader.start(["x", "y", "z"], lambda o: insert_row(tree, "end", o, ()))
+    # 新的加载取消未完成的旧加载，旧的行不会再插入
+    loader.start(["b", "c", "d"], lambda o: insert_row(tree, "end", o, ()))
+    assert len(tree.jobs) == 1 and tree.rows == ["b", "c"]
+    loader.finish()
+    assert tree.rows == ["b", "c", "d"] and not tree.jobs and not loader.running
+    # 加载完成后恢复第一次加载前的滚动位置和选中行
+    assert tree.top == 0.5 and tree.selected == ("b",)
+    loader.finish()  # 没有进行中的加载时无操作
+    print("✓ 取消与同步插完测试通过")
+
+
+if __name__ == "__main__":
+    test_progressive_loader()
+    test_cancel_and_finish()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试紧凑记录（InventoryRecord）及字符串驻留"""
+
+import os
+import csv
+import sys
+import pickle
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel, InventoryRecord
+import memory_report
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, supplier, status='未出库'):
+    return make_record(order, 货商姓名=supplier, 商品名称="手机", 出库状态=status)
+
+
+def test_record_mapping():
+    print("=== 测试紧凑记录 ===")
+    r = InventoryRecord.from_mapping({'单号': 1, '货商姓名': '张三', '备注': None})
+    assert r['单号'] == '1' and r.get('备注') == '' and r.get('不存在', 'x') == 'x'
+    assert '货商姓名' in r and '不存在' not in r
+    assert list(r) == InventoryModel.CSV_HEADER and len(r) == len(InventoryModel.CSV_HEADER)
+    assert dict(r) == r.copy() and r == r.copy()
+    try:
+        r['单号'] = '2'
+        assert False, "记录应为只读"
+    except TypeError:
+        pass
+    r2 = r.updated({'单号': '2'})
+    assert r['单号'] == '1' and r2['单号'] == '2'
+    assert pickle.loads(pickle.dumps(r)) == r
+    print("✓ 紧凑记录测试通过")
+
+
+def test_model_loads_compact_records():
+    print("=== 测试模型加载紧凑记录 ===")
+    model = fresh_model("test_record")
+    assert model.add_records([_make_record("1", "张三"), _make_record("2", "张三", "卖出")])
+    assert model.update_record("2", {'备注': "已付款"})
+    records = InventoryModel("test_record").get_all_records()
+    assert all(type(r) is InventoryRecord for r in records)
+    assert all(type(r) is InventoryRecord for r in model.get_all_records())
+    # 取值重复的列共用同一个字符串对象
+    assert records[0]['货商姓名'] is records[1]['货商姓名']
+    assert model.get_record("2")['备注'] == "已付款"
+
+    # 没有“结算日期”列的旧表按入库时间补齐
+    header = [c for c in InventoryModel.CSV_HEADER if c != '结算日期']
+    with open(model.filename, 'w', newline='', encoding="gb2312") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerow(['3' if c == '单号' else '2024-05-06 10:00:00' if c == '入库时间' else '' for c in header])
+    assert model.get_record("3")['结算日期'] == "2024-05-06"
+    print("✓ 模型加载紧凑记录测试通过")
+
+
+def test_memory_report():
+    before, after = memory_report.main(2000)
+    assert after < before
+
+
+if __name__ == "__main__":
+    test_record_mapping()
+    test_model_loads_compact_records()
+    test_memory_report()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试库存列表刷新的合并：多次请求在空闲时只重新加载一次"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from controller import InventoryController
+from test_helpers import fresh_model, make_record
+
+
+class _FakeRoot:
+    def __init__(self):
+        self.idle = []
+
+    def after_idle(self, func):
+        self.idle.append(func)
+
+    def run_idle(self):
+        idle, self.idle = self.idle, []
+        for func in idle:
+            func()
+
+
+class _FakePage:
+    def __init__(self):
+        self.repaints = 0
+        self.patches = []
+
+    def update_inventory_list(self, recs):
+        self.repaints += 1
+
+    def refresh_list(self):
+        self.repaints += 1
+
+    def apply_changes(self, changes):
+        self.patches.append(list(changes))
+
+
+class _FakeCombo:
+    def get(self):
+        return "按商品统计盈亏"
+
+
+class _FakeDataPage:
+    cb = _FakeCombo()
+    columns = []
+
+
+class _FakeView:
+    def __init__(self):
+        self.root = _FakeRoot()
+        self.outbound_page = _FakePage()
+        self.inbound_page = _FakePage()
+        self.modify_page = _FakePage()
+        self.data_page = _FakeDataPage()
+
+
+def _make_record(order):
+    return make_record(order, '5', 商品名称="商品", 结算价='50', 单价='10.00')
+
+
+def test_refresh_coalesced():
+    print("=== 测试刷新合并 ===")
+    model = fresh_model("test_refresh")
+    assert model.add_records([_make_record(str(i)) for i in range(40)])
+
+    controller = InventoryController(model, None)
+    view = _FakeView()
+    controller.view = view
+    for i in range(40):
+        assert controller.handle_partial_outbound(str(i), 1, "SF001", "档口A")
+    controller.refresh_inventory_list()
+    # 41 次请求只安排了一次空闲刷新，执行前不重绘
+    assert len(view.root.idle) == 1
+    assert view.outbound_page.repaints == 0
+    view.root.run_idle()
+    assert view.outbound_page.repaints == 1 and view.inbound_page.repaints == 1
+    # 刷新完成后的新请求重新安排
+    controller.refresh_inventory_list()
+    assert len(view.root.idle) == 1
+    print("✓ 刷新合并测试通过")
+
+
+if __name__ == "__main__":
+    test_refresh_coalesced()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试表格排序：按列类型比较，空值排在最后，多列排序，筛选结果沿用缓存的名次"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from sort_keys import TableSorter, click_sort, column_kind, heading_text
+
+
+def _rows():
+    return [
+        {'单号': '1', '结算价': '100', '入库时间': '2025-03-02 09:00:00', '货商姓名': 'b'},
+        {'单号': '2', '结算价': '9.5', '入库时间': '2025-03-10', '货商姓名': 'a'},
+        {'单号': '3', '结算价': '', '入库时间': '', '货商姓名': 'b'},
+        {'单号': '4', '结算价': '20', '入库时间': '2025-02-28 23:00:00', '货商姓名': 'a'},
+        {'单号': '5', '结算价': '9.5', '入库时间': '2025-03-01', '货商姓名': 'B'},
+    ]
+
+
+def _orders(rows):
+    return [r['单号'] for r in rows]
+
+
+def test_column_sort():
+    print("=== 测试按列类型排序 ===")
+    rows = _rows()
+    assert column_kind([r['结算价'] for r in rows]) == 'num'
+    assert column_kind([r['入库时间'] for r in rows]) == 'time'
+    assert column_kind([r['货商姓名'] for r in rows]) == 'str'
+    sorter = TableSorter()
+    sorter.load(rows)
+    # 数值按大小而不是按字符串比较，空值不论升降序都在最后
+    assert _orders(sorter.sort(rows, [('结算价', True)])) == ['2', '5', '4', '1', '3']
+    assert _orders(sorter.sort(rows, [('结算价', False)])) == ['1', '4', '2', '5', '3']
+    assert _orders(sorter.sort(rows, [('入库时间', True)])) == ['4', '5', '1', '2', '3']
+    # 多列排序：货商（不分大小写）升序，同一货商按结算价降序
+    spec = [('货商姓名', True), ('结算价', False)]
+    assert _orders(sorter.sort(rows, spec)) == ['4', '2', '1', '5', '3']
+    # 筛选结果（部分行）沿用同一名次
+    assert _orders(sorter.sort([rows[4], rows[0], rows[1]], spec)) == ['2', '1', '5']
+    # 名次已缓存：改动数据但不重新加载时结果不变，重新加载后按新值排序
+    rows[0]['结算价'] = '1'
+    assert _orders(sorter.sort(rows, [('结算价', True)]))[0] == '2'
+    sorter.load(rows)
+    assert _orders(sorter.sort(rows, [('结算价', True)]))[0] == '1'
+    print("✓ 按列类型排序测试通过")
+
+
+def test_update():
+    print("=== 测试单行修补 ===")
+    rows = _rows()
+    sorter = TableSorter()
+    sorter.load(rows)
+    spec = [('货商姓名', True), ('结算价', False)]
+    sorter.sort(rows, spec)
+    rows[1] = dict(rows[1], 结算价='5')
+    sorter.update(1, rows[1])
+    rows.append({'单号': '6', '结算价': '1000', '入库时间': '', '货商姓名': 'a'})
+    sorter.update(5, rows[5])
+    assert _orders(sorter.sort(rows, spec)) == ['6', '4', '2', '1', '5', '3']
+    # 改成非数字后该列按字符串排序
+    rows[0] = dict(rows[0], 结算价='abc')
+    sorter.update(0, rows[0])
+    assert _orders(sorter.sort(rows, [('结算价', True)])) == _orders(_loaded(rows).sort(rows, [('结算价', True)]))
+    print("✓ 单行修补测试通过")
+
+
+def _loaded(rows):
+    sorter = TableSorter()
+    sorter.load(rows)
+    return sorter
+
+
+def test_click_sort():
+    print("=== 测试表头点击 ===")
+    spec = click_sort([], '货商姓名', True, False)
+    assert spec == [('货商姓名', True)]
+    spec = click_sort(spec, '结算价', True, True)
+    assert spec == [('货商姓名', True), ('结算价', True)]
+    spec = click_sort(spec, '结算价', True, True)
+    assert spec == [('货商姓名', True), ('结算价', False)]
+    assert heading_text('结算价', spec) == "结算价 ▼2" and heading_text('单号', spec) == "单号"
+    assert click_sort(spec, '单号', False, False) == [('单号', False)]
+    assert heading_text('单号', [('单号', False)]) == "单号 ▼"
+    print("✓ 表头点击测试通过")
+
+
+if __name__ == "__main__":
+    test_column_sort()
+    test_update()
+    test_click_sort()
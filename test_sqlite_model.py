@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试 SQLite 存储后端及 CSV 迁移工具"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from model import InventoryModel
+from sqlite_model import SQLiteInventoryModel
+from settings_model import SettingsModel
+from migrate_to_sqlite import migrate_all_tables
+from test_helpers import fresh_model, make_record
+
+
+class _Settings:
+    """只提供迁移工具需要的两个方法"""
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def get_tables(self):
+        return self.tables
+
+    def get_storage_settings(self):
+        return dict(SettingsModel.DEFAULT_STORAGE)
+
+
+def _make_record(order, name, supplier, market, settle):
+    return make_record(order, '2', 商品名称=name, 货商姓名=supplier, 结算价=settle, 行情价格=market)
+
+
+def test_sqlite_model_and_migration():
+    print("=== 测试 SQLite 存储 ===")
+    db_path = os.path.join(tempfile.mkdtemp(), "inventory.db")
+
+    csv_model = InventoryModel("test_sqlite_src")
+    for r in csv_model.get_all_records():
+        csv_model.delete_record(r['单号'])
+    csv_model.add_record(_make_record("7000", "商品A", "张三", "30", "20"))
+    csv_model.add_record(_make_record("7001", "商品A", "李四", "15", "abc"))
+    legacy = _make_record("7002", "商品B", "张三", "", "8")
+    legacy['出库记录'] = "2024-01-01 10:00:00|档口A|SF001|1|4.00"
+    csv_model.add_record(legacy)
+
+    counts = migrate_all_tables(_Settings(["test_sqlite_src"]), db_path=db_path)
+    assert counts == {"test_sqlite_src": 3}
+
+    model = SQLiteInventoryModel("test_sqlite_src", db_path=db_path)
+    # 源 CSV 保持不变，导入的记录中旧版出库记录列已转为出库事件
+    assert csv_model.get_record("7002")['出库记录'] == legacy['出库记录']
+    assert model.get_all_records() == [dict(r, 出库记录='') for r in csv_model.get_all_records()]
+    assert model.get_record("7001")['货商姓名'] == "李四"
+    assert [e['快递单号'] for e in model.outbound_events(单号="7002")] == ["SF001"]
+
+    # 统计结果与 CSV 模型一致
+    assert model.profit_by('商品名称') == csv_model.profit_by('商品名称')
+    assert model.count_by('货商姓名') == {"张三": 2, "李四": 1}
+    assert model.find_by('货商姓名', '张三') == [dict(r, 出库记录='') for r in csv_model.find_by('货商姓名', '张三')]
+    assert list(model.iter_records(['单号'], {'货商姓名': '张三'})) == [{'单号': '7000'}, {'单号': '7002'}]
+
+    # 增删改及分数量出库
+    assert model.add_record(_make_record("7003", "商品C", "王五", "5", "4"))
+    assert model.update_record("7003", {'备注': '数据库'})
+    assert model.get_record("7003")['备注'] == '数据库'
+    assert model.partial_outbound("7000", 1, "SF100", "档口C")
+    assert model.get_record("7000")['剩余数量'] == '1'
+    assert model.get_record("7000")['出库状态'] == '部分出库'
+    assert model.get_record("7000")['出库记录'] == ''
+    assert [e['单号'] for e in model.outbound_events(快递单号="SF100")] == ["7000"]
+    assert not model.partial_outbound("7000", 5, "SF100", "档口C")
+    assert model.delete_record("7002")
+    assert model.get_record("7002") is None
+    assert model.update_records({"7000": {'备注': '批量'}, "7003": {'备注': '批量'}, "9999": {'备注': 'x'}})
+    assert model.get_record("7003")['备注'] == '批量'
+    assert model.full_outbound("7003", "SF200", "档口D", '卖出')
+    assert model.get_record("7003")['出库状态'] == '卖出' and model.get_record("7003")['剩余数量'] == '0'
+    assert [e['出库数量'] for e in model.outbound_events(快递单号="SF200")] == ["2"]
+    # 表头以外的列：两种存储都拒绝整次修改并记录原因
+    for m in (model, csv_model):
+        assert not m.update_record("7000", {'备注': '不应写入', '不存在的列': 'x'})
+        assert "不存在的列" in m.last_error
+        assert not m.update_records({"7000": {'备注': '不应写入'}, "7001": {'不存在的列': 'x'}})
+        assert m.get_record("7000")['备注'] != '不应写入'
+    assert model.delete_records(["7003", "9999"])
+    assert [r['单号'] for r in model.get_all_records()] == ["7000", "7001"]
+
+    # 表切换与重命名
+    assert model.rename_table("test_sqlite_src", "test_sqlite_renamed")
+    assert model.table_name == "test_sqlite_renamed"
+    model.set_table("test_sqlite_other")
+    assert model.get_all_records() == []
+    assert not model.rename_table("test_sqlite_other", "test_sqlite_renamed")
+    model.close()
+    print("✓ SQLite 存储测试通过")
+
+
+def test_migration_includes_archive():
+    print("=== 测试迁移归档记录 ===")
+    db_path = os.path.join(tempfile.mkdtemp(), "inventory.db")
+    source = fresh_model("test_sqlite_archived")
+    closed = dict(_make_record("7100", "商品A", "张三", "30", "20"), 入库时间="2024-01-05 10:00:00", 出库状态="全部出库")
+    assert source.add_records([closed, _make_record("7101", "商品B", "李四", "15", "10")])
+    assert source.archive_closed_records() == 1
+    assert [r['单号'] for r in source.get_all_records()] == ["7101"]
+
+    # SQLite 没有归档分区，归档记录一并导入主表
+    assert migrate_all_tables(_Settings(["test_sqlite_archived"]), db_path=db_path) == {"test_sqlite_archived": 2}
+    model = SQLiteInventoryModel("test_sqlite_archived", db_path=db_path)
+    assert [r['单号'] for r in model.get_all_records()] == ["7101", "7100"]
+    assert model.get_record("7100")['出库状态'] == "全部出库"
+    model.close()
+    print("✓ 迁移归档记录测试通过")
+
+
+if __name__ == "__main__":
+    test_sqlite_model_and_migration()
+    test_migration_includes_archive()
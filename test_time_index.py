@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试入库时间索引：增删改后保持有序、按日期范围二分查找、默认时间倒序"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from archive import in_date_range, records_in_range
+from time_index import TimeIndex, parse_timestamp, NO_TIME
+from test_helpers import fresh_model, make_record
+
+
+def _make_record(order, in_time):
+    return make_record(order, 入库时间=in_time, 商品名称='X')
+
+
+def _expected(records, start=None, end=None):
+    """逐行解析日期、稳定排序得到的结果（时间相同时按表中倒序）。"""
+    hits = [(parse_timestamp(r['入库时间']), pos, r) for pos, r in enumerate(records)
+            if (not (start or end) or parse_timestamp(r['入库时间']) != NO_TIME) and in_date_range(r, start, end)]
+    return [r['单号'] for _, _, r in sorted(hits, key=lambda h: (h[0], h[1]), reverse=True)]
+
+
+def test_parse_timestamp():
+    print("=== 测试时间解析 ===")
+    assert parse_timestamp("1970-01-02") == 86400
+    assert parse_timestamp("1970-01-01 01:02") == 3720
+    assert parse_timestamp("1970-01-01 00:00:05") == 5
+    assert parse_timestamp("") == NO_TIME
+    assert parse_timestamp(None) == NO_TIME
+    assert parse_timestamp("2024/01/01") == NO_TIME
+    print("✓ 时间解析正确")
+
+
+def test_time_index():
+    print("=== 测试入库时间索引 ===")
+    records = [_make_record("1", "2024-03-05 10:00:00"), _make_record("2", "2024-01-01"),
+               _make_record("3", "2024-03-05 10:00:00"), _make_record("4", ""),
+               _make_record("5", "2024-02-29 23:59")]
+    index = TimeIndex(records)
+    assert list(index.positions) == [3, 1, 4, 0, 2]
+    assert index.between(descending=True) == [2, 0, 4, 1, 3]
+    assert index.between("2024-02-01", "2024-02-29") == [4]
+    assert index.between(end="2024-02-01") == [1]  # 无法识别的时间不落入有范围的查询
+    index.discard(0, records[0])
+    index.add(0, _make_record("1", "2023-12-31"))
+    assert list(index.positions) == [3, 0, 1, 4, 2]
+    print("✓ 入库时间索引正确")
+
+
+def test_model_records_by_time():
+    print("=== 测试模型按入库时间取记录 ===")
+    for journal in (False, True):
+        table = "test_time_index"
+        model = fresh_model(table, journal_mode=journal)
+        assert model.add_records([_make_record("1", "2024-03-05 10:00:00"), _make_record("2", "2024-01-01"),
+                                  _make_record("3", "2024-03-05 10:00:00"), _make_record("4", "坏数据")])
+        assert model.add_record(_make_record("5", "2024-02-10 08:00"))
+        assert model.update_record("2", {'入库时间': '2024-04-01 09:00:00'})
+        assert model.update_records({"1": {'入库时间': '2023-12-01'}, "3": {'备注': 'x'}})
+        assert model.delete_record("5")
+        records = model.get_all_records()
+        for start, end in ((None, None), ("2024-01-01", None), (None, "2024-03-05"), ("2024-03-05", "2024-03-05")):
+            got = [r['单号'] for r in model.records_by_time(start, end)]
+            assert got == _expected(records, start, end), (start, end, got)
+        # 重新加载后索引与增量维护的结果一致
+        model.invalidate_cache()
+        assert [r['单号'] for r in model.records_by_time()] == ["2", "3", "1", "4"]
+        assert [r['单号'] for r in records_in_range(model, by_time=True)] == ["2", "3", "1", "4"]
+        model.close()
+    print("✓ 模型按入库时间取记录正确")
+
+
+if __name__ == "__main__":
+    test_parse_timestamp()
+    test_time_index()
+    test_model_records_by_time()
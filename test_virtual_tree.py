@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""测试虚拟滚动表格：行池大小固定，滚动、增删行时重新绑定可见行，选中行随数据保持"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from virtual_tree import VirtualTree, _row_key
+
+
+class _FakeTreeview:
+    """只记录项和值的 Treeview 替身（测试环境没有显示器）。"""
+
+    def __init__(self):
+        self.items = {}
+        self.count = 0
+        self.selected = ()
+        self.focused = ''
+
+    def insert(self, parent, index, **kw):
+        self.count += 1
+        iid = f"I{self.count}"
+        self.items[iid] = {}
+        return iid
+
+    def item(self, iid, **kw):
+        self.items[iid].update(kw)
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.items[iid]
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, iids):
+        self.selected = (iids,) if isinstance(iids, str) else tuple(iids)
+
+    def focus(self, *args):
+        if args:
+            self.focused = args[0]
+        return self.focused
+
+    def cget(self, option):
+        return "extended"
+
+
+class _FakeScrollbar:
+    def set(self, first, last):
+        self.range = (first, last)
+
+
+def _make_table(visible=5):
+    table = VirtualTree.__new__(VirtualTree)
+    table.values = lambda d: (d['单号'],)
+    table.tags = None
+    table.key = _row_key
+    table.rows = []
+    table._pos = {}
+    table.top = 0
+    table._pool = []
+    table._visible = visible
+    table._selected = set()
+    table.tree = _FakeTreeview()
+    table.vsb = _FakeScrollbar()
+    return table
+
+
+def _shown(table):
+    return [table.tree.items[iid]['values'][0] for iid in table._pool]
+
+
+def test_virtual_tree():
+    print("=== 测试虚拟滚动表格 ===")
+    table = _make_table()
+    rows = [{'单号': str(i)} for i in range(100)]
+    table.set_rows(rows)
+    # 只为可见的 5 行创建项
+    assert _shown(table) == ['0', '1', '2', '3', '4'] and len(table.tree.items) == 5
+
+    table.yview('moveto', '0.5')
+    assert _shown(table)[0] == '50'
+    table.yview('scroll', '1', 'pages')
+    assert _shown(table)[0] == '55'
+    assert table.vsb.range == (0.55, 0.6)
+
+    # 选中行按单号记录，滚动后仍选中同一行
+    target = rows[56]
+    table.tree.selection_set([table._pool[1]])
+    table._on_select()
+    assert table.selected_rows() == [target]
+    table.yview('scroll', '-1', 'units')
+    assert table.row_at(table.tree.selection()[0]) is target
+
+    # 在可见区域上方插入时屏幕内容不动；删除选中行后不再选中
+    table.insert(0, {'单号': 'new'})
+    table.refresh()
+    assert _shown(table)[0] == '54'
+    table.delete(table.index(target))
+    table.refresh()
+    assert table.tree.selection() == () and '56' not in _shown(table)
+
+    # 滚到末尾、行数少于行池时收缩
+    table.yview('moveto', '1.0')
+    assert _shown(table)[-1] == '99' and len(_shown(table)) == 5
+    table.set_rows([{'单号': 'a'}, {'单号': 'b'}])
+    assert _shown(table) == ['a', 'b'] and len(table.tree.items) == 2
+    print("✓ 虚拟滚动表格测试通过")
+
+
+def test_keyboard_scroll():
+    print("=== 测试方向键滚动 ===")
+    table = _make_table()
+    rows = [{'单号': str(i)} for i in range(20)]
+    table.set_rows(rows)
+    table.tree.focus(table._pool[2])
+    # 可见区域内的移动交给 Treeview
+    assert table._move_focus(1) is None
+    table.tree.focus(table._pool[4])
+    assert table._move_focus(1) == "break"
+    assert _shown(table)[0] == '1' and table.selected_rows() == [rows[5]]
+    assert table.row_at(table.tree.focus()) is rows[5]
+    print("✓ 方向键滚动测试通过")
+
+
+if __name__ == "__main__":
+    test_virtual_tree()
+    test_keyboard_scroll()
@@ -0,0 +1,75 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+# 入库时间无法识别的记录的键：排在最早，不落入任何有下限的日期范围
+NO_TIME = -(1 << 62)
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_timestamp(value) -> int:
+    """
+    'YYYY-MM-DD'、'YYYY-MM-DD HH:MM'、'YYYY-MM-DD HH:MM:SS' 转换为整数秒（按 UTC 计，只用于排序和比较），
+    无法识别时返回 NO_TIME。
+    """
+    try:
+        return int((datetime.fromisoformat(value) - _EPOCH).total_seconds())
+    except (ValueError, TypeError):
+        return NO_TIME
+
+
+def day_bounds(start: str | None = None, end: str | None = None) -> tuple:
+    """入库日期范围 [start, end]（YYYY-MM-DD，None 表示不限）对应的 (起始秒, 结束秒)。"""
+    lo = parse_timestamp(start) if start else None
+    hi = parse_timestamp(end) + 86399 if end else None
+    return lo, hi
+
+
+class TimeIndex:
+    """
+    按时间列（默认入库时间）排序的索引，与记录列表按位置对应。
+
+    keys 为升序的整数秒，positions 为对应的记录位置，时间相同的按位置升序。
+    按日期范围取记录用二分查找，按时间排序的结果直接顺序（或倒序）读出，不再逐行解析日期。
+    """
+
+    def __init__(self, records=(), column='入库时间'):
+        self.column = column
+        pairs = sorted((parse_timestamp(r.get(column)), pos) for pos, r in enumerate(records))
+        self.keys = array('q', [k for k, _ in pairs])
+        self.positions = array('q', [pos for _, pos in pairs])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _find(self, key: int, pos: int) -> int:
+        lo = bisect_left(self.keys, key)
+        hi = bisect_right(self.keys, key, lo)
+        return bisect_left(self.positions, pos, lo, hi)
+
+    def add(self, pos: int, record: dict):
+        key = parse_timestamp(record.get(self.column))
+        i = self._find(key, pos)
+        self.keys.insert(i, key)
+        self.positions.insert(i, pos)
+
+    def discard(self, pos: int, record: dict):
+        key = parse_timestamp(record.get(self.column))
+        i = self._find(key, pos)
+        if i < len(self.positions) and self.positions[i] == pos and self.keys[i] == key:
+            del self.keys[i]
+            del self.positions[i]
+
+    def between(self, start: str | None = None, end: str | None = None, descending=False) -> list:
+        """
+        入库日期在 [start, end]（YYYY-MM-DD，None 表示不限）内的记录位置，按时间升序（descending 时降序）。
+        时间无法识别的记录（排在最早）只在不限日期时包括，与归档的 undated 分区一致。
+        """
+        lo, hi = day_bounds(start, end)
+        i = 0 if lo is None else bisect_left(self.keys, lo)
+        j = len(self.keys) if hi is None else bisect_right(self.keys, hi)
+        if lo is None and hi is not None:
+            # 只有上限时同样排除无法识别的时间
+            i = bisect_right(self.keys, NO_TIME)
+        positions = self.positions[i:j]
+        return list(reversed(positions)) if descending else list(positions)
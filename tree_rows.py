@@ -0,0 +1,102 @@
+import time
+from contextlib import contextmanager
+
+
+def insert_row(tree, index, order: str, values, tags=()) -> str:
+    """
+    以单号作为 iid 插入一行，返回 iid。
+    单号为空或已在表中（重复单号）时由 Treeview 自动分配 iid，这些行只能整体重绘。
+    """
+    iid = order if order and not tree.exists(order) else None
+    return tree.insert("", index, iid=iid, values=values, tags=tags)
+
+
+def capture_view(tree):
+    """记下 Treeview 的滚动位置、选中行和焦点，返回恢复它们的函数（按 iid，即单号对应）。"""
+    top = tree.yview()[0]
+    selection = tree.selection()
+    focus = tree.focus()
+
+    def restore():
+        alive = [iid for iid in selection if tree.exists(iid)]
+        if alive:
+            tree.selection_set(alive)
+        if focus and tree.exists(focus):
+            tree.focus(focus)
+        tree.yview_moveto(top)
+    return restore
+
+
+@contextmanager
+def preserved_view(tree):
+    """整体重绘 Treeview 时保留滚动位置、选中行和焦点。"""
+    restore = capture_view(tree)
+    yield
+    restore()
+
+
+class ProgressiveLoader:
+    """
+    分批重绘 Treeview：清空后先同步插入第一屏（first 行），其余行通过 after() 按时间片继续插入，
+    每片最多占用 slice_ms 毫秒，期间界面保持响应。全部插入后恢复滚动位置、选中行并调用 done()。
+
+    加载未完成时再次调用 start()（新的查询或筛选）会取消上一次加载；
+    需要按 iid 修补行之前调用 finish()，把剩余的行同步插完。
+    """
+
+    def __init__(self, tree, first=100, slice_ms=15):
+        self.tree = tree
+        self.first = first
+        self.slice_ms = slice_ms
+        self._job = None
+        self._rows = None
+        self._insert = None
+        self._done = None
+        self._restore = None
+
+    @property
+    def running(self) -> bool:
+        return self._rows is not None
+
+    def start(self, rows, insert, done=None):
+        """清空表格，分批对 rows 的每一项调用 insert(行)。"""
+        if self.running:
+            # 上一次加载被取消：沿用它开始前记下的滚动位置和选中行
+            self._cancel_job()
+        else:
+            self._restore = capture_view(self.tree)
+        self.tree.delete(*self.tree.get_children())
+        self._rows = iter(rows)
+        self._insert = insert
+        self._done = done
+        self._step(count=self.first)
+
+    def finish(self):
+        """同步插入尚未插入的行。"""
+        if self.running:
+            self._cancel_job()
+            self._step()
+
+    def _cancel_job(self):
+        if self._job is not None:
+            self.tree.after_cancel(self._job)
+            self._job = None
+
+    def _step(self, count=None, deadline=None):
+        """插入 count 行或直到 deadline（perf_counter 秒）为止，都为 None 时插完剩余的行。"""
+        self._job = None
+        insert = self._insert
+        for n, row in enumerate(self._rows, 1):
+            insert(row)
+            if (count is not None and n >= count) or (deadline is not None and time.perf_counter() >= deadline):
+                self._job = self.tree.after(1, self._next_slice)
+                return
+        self._rows = self._insert = None
+        restore, done = self._restore, self._done
+        self._restore = self._done = None
+        restore()
+        if done is not None:
+            done()
+
+    def _next_slice(self):
+        self._step(deadline=time.perf_counter() + self.slice_ms / 1000)
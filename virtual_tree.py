@@ -0,0 +1,202 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+def _row_key(row):
+    """行的标识：有单号时为单号，否则为行对象本身的 id。"""
+    return row.get('单号') or id(row)
+
+
+class VirtualTree(ttk.Frame):
+    """
+    虚拟滚动表格：Treeview 中只保留与窗口高度相当的一组项（行池），
+    滚动时把 rows[top:top + 池大小] 的值重新绑定到这些项上，显示成本只与窗口高度有关，与结果行数无关。
+
+    rows 与调用方共用同一个列表：整体替换时调用 set_rows，逐行修改用 insert / replace / delete，
+    成批增删用 insert_rows / delete_rows（只重建一次位置索引），改完后调用 refresh。选中行按 key(行)（默认单号）记录，滚动或重绘后保持。
+    表头、列宽、标签样式、双击等仍通过 self.tree 设置。
+    """
+
+    def __init__(self, parent, values, tags=None, key=_row_key, **tree_options):
+        super().__init__(parent)
+        self.values = values
+        self.tags = tags
+        self.key = key
+        self.rows = []
+        self._pos = {}  # key(行) → 在 rows 中的位置
+        self.top = 0
+        self._pool = []
+        self._visible = 1
+        self._selected = set()
+
+        self.tree = ttk.Treeview(self, **tree_options)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", lambda e: self._scroll_by(-1 if e.delta > 0 else 1, 3))
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-1, 3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(1, 3))
+        self.tree.bind("<Up>", lambda e: self._move_focus(-1))
+        self.tree.bind("<Down>", lambda e: self._move_focus(1))
+        self.tree.bind("<Prior>", lambda e: self._move_focus(-self._visible))
+        self.tree.bind("<Next>", lambda e: self._move_focus(self._visible))
+
+    # -------- 数据 --------
+    def set_rows(self, rows: list):
+        """整体替换显示的行，滚动位置（行号）和选中行保持不变。"""
+        self.rows = rows
+        self._reindex()
+        self.refresh()
+
+    def _reindex(self, start: int = 0):
+        """重建 rows[start:] 的位置索引。"""
+        key, pos = self.key, self._pos
+        if start == 0:
+            pos.clear()
+        for i in range(start, len(self.rows)):
+            pos[key(self.rows[i])] = i
+
+    def index(self, row) -> int | None:
+        """row（按对象本身比较）在 rows 中的位置，不在时返回 None。"""
+        i = self._pos.get(self.key(row))
+        if i is None:
+            return None
+        if i < len(self.rows) and self.rows[i] is row:
+            return i
+        # 键重复时只索引了最后一行，退回逐行查找
+        for i, r in enumerate(self.rows):
+            if r is row:
+                return i
+        return None
+
+    def insert(self, index: int, row):
+        self.insert_rows(index, [row])
+
+    def insert_rows(self, index: int, rows: list):
+        """在 index 处插入多行。"""
+        if not rows:
+            return
+        self.rows[index:index] = rows
+        # 插在可见区域上方时顺移起始行，屏幕上的内容保持不动
+        if index < self.top:
+            self.top += len(rows)
+        self._reindex(index)
+
+    def replace(self, index: int, row):
+        old = self.rows[index]
+        self.rows[index] = row
+        if self._pos.get(self.key(old)) == index:
+            del self._pos[self.key(old)]
+        self._pos[self.key(row)] = index
+
+    def delete(self, index: int):
+        self.delete_rows([index])
+
+    def delete_rows(self, indexes):
+        """删除多行（indexes 为位置的集合）。"""
+        indexes = set(indexes)
+        if not indexes:
+            return
+        self.top -= sum(1 for i in indexes if i < self.top)
+        self.rows[:] = [r for i, r in enumerate(self.rows) if i not in indexes]
+        self._reindex()
+
+    def row_at(self, iid):
+        """池中的项 iid 当前对应的行。"""
+        try:
+            return self.rows[self.top + self._pool.index(iid)]
+        except (ValueError, IndexError):
+            return None
+
+    def selected_rows(self) -> list:
+        """选中的行（按 rows 中的顺序）。"""
+        if not self._selected:
+            return []
+        return [r for r in self.rows if self.key(r) in self._selected]
+
+    # -------- 显示 --------
+    def refresh(self):
+        """按 top 重新绑定行池的值并更新滚动条。"""
+        n = len(self.rows)
+        self.top = max(0, min(self.top, n - self._visible))
+        window = self.rows[self.top:self.top + self._visible]
+        while len(self._pool) < len(window):
+            self._pool.append(self.tree.insert("", tk.END))
+        while len(self._pool) > len(window):
+            self.tree.delete(self._pool.pop())
+        selected = []
+        for iid, row in zip(self._pool, window):
+            self.tree.item(iid, values=self.values(row), tags=self.tags(row) if self.tags else ())
+            if self.key(row) in self._selected:
+                selected.append(iid)
+        if tuple(selected) != self.tree.selection():
+            self.tree.selection_set(selected)
+        if n:
+            self.vsb.set(self.top / n, min(1.0, (self.top + len(window)) / n))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def see(self, index: int):
+        """滚动到第 index 行可见。"""
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self._visible:
+            self.top = index - self._visible + 1
+        self.refresh()
+
+    def yview(self, *args):
+        """滚动条的回调：('moveto', 比例) 或 ('scroll', 数量, 'units' / 'pages')。"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+            self.refresh()
+        elif args[0] == "scroll":
+            step = self._visible if args[2] == "pages" else 1
+            self._scroll_by(int(args[1]), step)
+
+    def _scroll_by(self, direction: int, step: int):
+        self.top += direction * step
+        self.refresh()
+        return "break"
+
+    def _on_resize(self, event):
+        if self._pool and self.tree.bbox(self._pool[0]):
+            _, header, _, row_height = self.tree.bbox(self._pool[0])
+        else:
+            header = 25
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - header) // max(row_height, 1))
+        if visible != self._visible:
+            self._visible = visible
+            self.refresh()
+
+    def _on_select(self, event=None):
+        # 可见区域内以 Treeview 的选中状态为准，区域外的选中行保留（单选时清除）
+        shown = {self.key(r) for r in self.rows[self.top:self.top + len(self._pool)]}
+        chosen = {self.key(r) for r in map(self.row_at, self.tree.selection()) if r is not None}
+        if str(self.tree.cget("selectmode")) == "browse" and chosen:
+            self._selected = chosen
+        else:
+            self._selected = (self._selected - shown) | chosen
+
+    def _move_focus(self, delta: int):
+        """方向键、翻页键移出可见区域时滚动一行（一页）并选中目标行。"""
+        focus = self.tree.focus()
+        if focus not in self._pool:
+            return None
+        current = self.top + self._pool.index(focus)
+        target = max(0, min(current + delta, len(self.rows) - 1))
+        if self.top <= target < self.top + len(self._pool) and abs(delta) == 1:
+            return None  # 区域内的移动交给 Treeview 处理
+        self.see(target)
+        iid = self._pool[target - self.top]
+        self._selected = {self.key(self.rows[target])}
+        self.tree.selection_set(iid)
+        self.tree.focus(iid)
+        return "break"
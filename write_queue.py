@@ -0,0 +1,107 @@
+import time
+import threading
+
+
+class WriteQueue:
+    """
+    单个后台写入线程：submit 立即返回，线程稍等片刻后把这段时间内的全部提交合并为一次写入。
+
+    flush_fn(ops) 执行实际写入，ops 为自上次成功写入以来提交的全部变更（按提交顺序）；
+    flush_fn 抛出异常时这批变更保留下来，隔 retry_interval 秒后连同新的变更一起重试，
+    并在写入线程中调用 on_error(异常)。
+    status 为 'idle'（已全部写入）、'pending'（等待写入）、'writing' 或 'error'。
+    """
+
+    def __init__(self, flush_fn, on_error=None, delay=0.2, retry_interval=5.0):
+        self._flush_fn = flush_fn
+        self.on_error = on_error
+        self.delay = delay
+        self.retry_interval = retry_interval
+        self._pending = []
+        self._dirty = False
+        self._writing = False
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+        # 保证写入线程与 flush() 不会同时写
+        self._write_lock = threading.Lock()
+        self.status = 'idle'
+        self.error = ''
+
+    def submit(self, ops: list):
+        """提交一批变更，由写入线程合并后写入。"""
+        with self._cond:
+            self._pending.extend(ops)
+            self._dirty = True
+            if self.status != 'error':
+                self.status = 'pending'
+            self._closed = False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def has_pending(self) -> bool:
+        """是否还有未写入（或正在写入）的变更。"""
+        with self._cond:
+            return self._dirty or self._writing
+
+    def _drain(self) -> bool:
+        with self._cond:
+            if not self._dirty:
+                return True
+            ops, self._pending = self._pending, []
+            self._dirty = False
+            self._writing = True
+            if self.status != 'error':
+                self.status = 'writing'
+        try:
+            self._flush_fn(ops)
+        except Exception as e:
+            with self._cond:
+                self._pending[:0] = ops
+                self._dirty = True
+                self._writing = False
+                self.status = 'error'
+                self.error = f"{type(e).__name__}: {e}"
+            if self.on_error is not None:
+                self.on_error(e)
+            return False
+        with self._cond:
+            self._writing = False
+            self.status = 'pending' if self._dirty else 'idle'
+            self.error = ''
+            self._cond.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            # 稍等片刻，让连续扫码等一阵修改合并为一次写入
+            time.sleep(self.delay)
+            with self._write_lock:
+                ok = self._drain()
+            if not ok:
+                with self._cond:
+                    if not self._closed:
+                        self._cond.wait(self.retry_interval)
+
+    def flush(self) -> bool:
+        """在调用线程中立即写入全部待写变更，返回是否成功。"""
+        with self._write_lock:
+            return self._drain()
+
+    def close(self) -> bool:
+        """停止写入线程并同步写入剩余变更，返回是否成功。"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+        return self.flush()